@@ -0,0 +1,147 @@
+"""Resumable backfills that schema migrations schedule instead of running.
+
+Some migrations add columns or tables whose values for existing rows have to
+be read from files: the SHA-256 of every finished download (migration 7),
+the EXIF header of every photo (migration 11). Inside the boot-time migration
+transaction that would hold the write lock for as long as the library takes
+to read. Those steps only add a row to the backfill table naming the job and
+the highest row id it covers; rows written later are handled by the code
+that writes them.
+
+run_pending() works through the scheduled jobs BATCH rows at a time. The
+files are read outside any transaction, and each batch is written together
+with the job's new position in one short transaction, so an interrupted run
+carries on after the last committed batch. sync/backfill.py runs it; start.sh
+starts that once after the migrations.
+"""
+import logging
+import os
+from datetime import datetime
+
+from sqlalchemy import DateTime, bindparam, text
+
+from . import db
+
+logger = logging.getLogger('homehub.backfill')
+
+BATCH = 50
+
+
+# ---------------------- media_file (migration 7) ----------------------
+
+def _load_downloads(conn, after, until):
+    return conn.execute(text(
+        "SELECT j.id, j.url, j.fmt, j.quality, m.filepath, COALESCE(j.finished_at, j.created_at) "
+        "FROM download_job j JOIN media m ON m.id = j.media_id "
+        "WHERE j.id > :after AND j.id <= :until AND j.status = 'done' AND m.status = 'done' "
+        "AND m.filepath IS NOT NULL AND m.filepath != '' ORDER BY j.id LIMIT :n"
+    ), {'after': after, 'until': until, 'n': BATCH}).fetchall()
+
+
+def _read_download(row):
+    from .downloads import MEDIA_FOLDER
+    from .media_index import canonical_key, file_checksum, variant_key
+    _, url, fmt, quality, filepath, finished_at = row
+    path = os.path.join(MEDIA_FOLDER, filepath)
+    try:
+        size, checksum = os.path.getsize(path), file_checksum(path)
+    except OSError:
+        return None
+    return {'k': canonical_key(url), 'v': variant_key(fmt, quality), 'f': filepath, 's': size, 'c': checksum,
+            't': finished_at}
+
+
+# Newest download wins, as in index_download(); an entry indexed since then is newer than any of these
+_STORE_DOWNLOAD = text(
+    "INSERT INTO media_file (source_key, variant, filepath, size, checksum, hits, created_at) "
+    "VALUES (:k, :v, :f, :s, :c, 0, :t) "
+    "ON CONFLICT (source_key, variant) DO UPDATE SET filepath = excluded.filepath, size = excluded.size, "
+    "checksum = excluded.checksum, created_at = excluded.created_at WHERE excluded.created_at >= media_file.created_at"
+)
+
+
+def _store_downloads(conn, entries):
+    conn.execute(_STORE_DOWNLOAD, entries)
+
+
+# ---------------------- photo metadata (migration 11) ----------------------
+
+def _load_photos(conn, after, until):
+    return conn.execute(text(
+        "SELECT id, filename FROM photo WHERE id > :after AND id <= :until ORDER BY id LIMIT :n"
+    ), {'after': after, 'until': until, 'n': BATCH}).fetchall()
+
+
+def _read_photo(row):
+    from .photo_timeline import read_metadata
+    from .thumbnails import PHOTOS_FOLDER
+    photo_id, filename = row
+    return {**read_metadata(os.path.join(PHOTOS_FOLDER, filename)), 'id': photo_id}
+
+
+_PHOTO_ROW = text("SELECT album, sort_time FROM photo WHERE id = :id").columns(sort_time=DateTime)
+_STORE_PHOTO = text(
+    "UPDATE photo SET taken_at = :taken_at, camera = :camera, width = :width, height = :height, "
+    "has_gps = :has_gps, sort_time = :sort_time WHERE id = :id"
+).bindparams(bindparam('taken_at', type_=DateTime), bindparam('sort_time', type_=DateTime))
+
+
+def _store_photos(conn, entries):
+    """Write the EXIF fields and move each photo to the bucket of its taken-at month."""
+    from .photo_timeline import bump_bucket
+    for meta in entries:
+        row = conn.execute(_PHOTO_ROW, {'id': meta['id']}).first()
+        if row is None:
+            continue  # deleted since it was read
+        album, old = row
+        sort_time = meta['taken_at'] or old
+        conn.execute(_STORE_PHOTO, {**meta, 'sort_time': sort_time})
+        if sort_time != old:
+            if old is not None:
+                bump_bucket(conn, album, old, -1)
+            bump_bucket(conn, album, sort_time, 1)
+
+
+# name -> (load the next rows after an id, read one row's files or None to skip it, write a batch)
+JOBS = {
+    'media_file': (_load_downloads, _read_download, _store_downloads),
+    'photo_metadata': (_load_photos, _read_photo, _store_photos),
+}
+
+
+def run(name, engine=None):
+    """Run one scheduled job to completion, a batch per transaction. Returns the rows written."""
+    engine = engine or db.engine
+    load, read, store = JOBS[name]
+    written = 0
+    while True:
+        with engine.connect() as conn:
+            job = conn.execute(text(
+                "SELECT position, until_id FROM backfill WHERE name = :n AND finished_at IS NULL"
+            ), {'n': name}).first()
+            if job is None:
+                return written
+            rows = load(conn, *job)
+        if not rows:
+            with engine.begin() as conn:
+                conn.execute(text("UPDATE backfill SET finished_at = :t WHERE name = :n"),
+                             {'t': datetime.utcnow(), 'n': name})
+            logger.info("Backfill %s finished", name)
+            return written
+        entries = [entry for entry in map(read, rows) if entry is not None]
+        with engine.begin() as conn:
+            if entries:
+                store(conn, entries)
+            conn.execute(text("UPDATE backfill SET position = MAX(position, :p) WHERE name = :n"),
+                         {'p': rows[-1][0], 'n': name})
+        written += len(entries)
+
+
+def run_pending(engine=None):
+    """Run every unfinished job in the order migrations scheduled them. Returns {name: rows written}."""
+    engine = engine or db.engine
+    with engine.connect() as conn:
+        names = conn.execute(text(
+            "SELECT name FROM backfill WHERE finished_at IS NULL ORDER BY scheduled_at, name"
+        )).scalars().all()
+    return {name: run(name, engine) for name in names if name in JOBS}
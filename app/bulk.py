@@ -0,0 +1,69 @@
+"""Set-based bulk deletes shared by the reminder and expense routes.
+
+delete_owned() resolves the submitted ids, their dates and their owners with
+one SELECT ... WHERE id IN (...) per chunk, keeps the ids the user may delete
+(admins, or the row's owner) and removes them with chunked DELETE statements.
+delete_matching() removes everything that matches a filter in one statement.
+Both return the affected dates, e.g. for the calendar to redraw those days.
+
+Statements go straight to the database; nothing is loaded into the session.
+"""
+from collections import namedtuple
+
+from sqlalchemy import delete, func, select
+
+from .models import db
+
+# Well under SQLite's bound-parameter limit (999 on older builds)
+CHUNK_SIZE = 500
+
+BulkDelete = namedtuple('BulkDelete', ['ids', 'dates', 'found'])
+# ids: deleted ids; dates: their dates; found: {id: (date, owner)} for every submitted id that exists
+
+
+def _chunks(seq, size=CHUNK_SIZE):
+    for i in range(0, len(seq), size):
+        yield seq[i:i + size]
+
+
+def _clean_ids(ids):
+    out = []
+    seen = set()
+    for raw in ids:
+        if isinstance(raw, bool):
+            continue
+        try:
+            i = int(raw)
+        except (TypeError, ValueError):
+            continue
+        if i not in seen:
+            seen.add(i)
+            out.append(i)
+    return out
+
+
+def delete_owned(model, ids, owner_column, user, admin_aliases):
+    """Delete rows of model with the given ids that `user` may delete. Does not commit."""
+    id_list = _clean_ids(ids)
+    found = {}
+    for chunk in _chunks(id_list):
+        rows = db.session.execute(
+            select(model.id, model.date, owner_column).where(model.id.in_(chunk))
+        )
+        for rid, d, owner in rows:
+            found[rid] = (d, owner)
+    is_admin = user in admin_aliases
+    allowed = [i for i in id_list if i in found and (is_admin or user == (found[i][1] or ''))]
+    for chunk in _chunks(allowed):
+        db.session.execute(delete(model).where(model.id.in_(chunk)), execution_options={'synchronize_session': False})
+    return BulkDelete(allowed, {found[i][0] for i in allowed if found[i][0]}, found)
+
+
+def delete_matching(model, *criteria):
+    """Delete every row of model matching criteria in one statement. Returns (count, first_date, last_date)."""
+    count, first, last = db.session.execute(
+        select(func.count(), func.min(model.date), func.max(model.date)).where(*criteria)
+    ).one()
+    if count:
+        db.session.execute(delete(model).where(*criteria), execution_options={'synchronize_session': False})
+    return count, first, last
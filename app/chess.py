@@ -0,0 +1,141 @@
+"""Chess: local game page plus in-memory state for remote multiplayer games."""
+from flask import render_template, request, jsonify, current_app, session
+import secrets
+import time
+
+from .routes import main_bp
+
+@main_bp.route('/games/chess')
+def chess_game():
+    """Chess game with AI and multiplayer"""
+    config = current_app.config['HOMEHUB_CONFIG']
+    game_id = request.args.get('game_id')
+
+    # If accessed with game_id, it's a remote game link (no auth required, no nav)
+    is_remote_link = game_id is not None
+    is_authed = session.get('user_id') is not None
+
+    # Render standalone template for remote links, otherwise use full template with nav
+    template = 'chess_standalone.html' if is_remote_link else 'chess.html'
+
+    return render_template(template,
+                         config=config,
+                         is_authed=is_authed,
+                         game_id=game_id)
+
+# Remote Chess Game Storage
+# Format: {game_id: {'fen': fen_string, 'white_player': session_id, 'black_player': session_id,
+#                    'current_turn': 'w'/'b', 'last_activity': timestamp, 'moves': []}}
+remote_chess_games = {}
+
+def cleanup_old_games():
+    """Remove games older than 24 hours"""
+    cutoff_time = time.time() - (24 * 60 * 60)
+    games_to_remove = [gid for gid, game in remote_chess_games.items()
+                       if game['last_activity'] < cutoff_time]
+    for gid in games_to_remove:
+        del remote_chess_games[gid]
+
+@main_bp.route('/api/chess/create', methods=['POST'])
+def create_remote_chess_game():
+    """Create a new remote chess game"""
+    cleanup_old_games()
+
+    data = request.json
+    player_token = data.get('player_token')  # Unique token from client
+
+    # Generate secure game ID
+    game_id = secrets.token_urlsafe(16)
+
+    # Initialize game state - CREATOR IS ALWAYS WHITE
+    remote_chess_games[game_id] = {
+        'fen': 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1',  # Starting position
+        'white_player': player_token,  # Creator is always white
+        'black_player': None,  # Second player will be black
+        'current_turn': 'w',
+        'last_activity': time.time(),
+        'moves': [],
+        'game_over': False,
+        'result': None
+    }
+
+    print(f"[CHESS] Created game {game_id}, creator (WHITE): {player_token[:12]}..., total games: {len(remote_chess_games)}")
+
+    return jsonify({
+        'success': True,
+        'game_id': game_id,
+        'player_color': 'white'  # Creator is always white
+    })
+
+@main_bp.route('/api/chess/game/<game_id>', methods=['GET'])
+def get_chess_game(game_id):
+    """Get current game state"""
+    cleanup_old_games()
+
+    print(f"[CHESS] Get game request for {game_id}, total games: {len(remote_chess_games)}, games: {list(remote_chess_games.keys())}")
+
+    if game_id not in remote_chess_games:
+        print(f"[CHESS] Game {game_id} not found!")
+        return jsonify({'success': False, 'error': 'Game not found'}), 404
+
+    game = remote_chess_games[game_id]
+    player_token = request.args.get('player_token')
+
+    # SIMPLE LOGIC: Player 1 (creator) = White, Player 2 = Black
+    if game['white_player'] == player_token:
+        # This is Player 1 (creator)
+        player_color = 'white'
+        print(f"[CHESS] Player 1 (WHITE/creator): {player_token[:12]}")
+    else:
+        # This is Player 2 (joiner) - assign to black
+        if game['black_player'] != player_token:
+            game['black_player'] = player_token
+            print(f"[CHESS] Player 2 (BLACK/joiner) assigned: {player_token[:12]}")
+        player_color = 'black'
+
+    return jsonify({
+        'success': True,
+        'fen': game['fen'],
+        'current_turn': game['current_turn'],
+        'moves': game['moves'],
+        'player_color': player_color,
+        'players_connected': game['white_player'] is not None and game['black_player'] is not None,
+        'game_over': game['game_over'],
+        'result': game['result']
+    })
+
+@main_bp.route('/api/chess/game/<game_id>/move', methods=['POST'])
+def submit_chess_move(game_id):
+    """Submit a move to a remote game"""
+    cleanup_old_games()
+
+    if game_id not in remote_chess_games:
+        return jsonify({'success': False, 'error': 'Game not found'}), 404
+
+    game = remote_chess_games[game_id]
+    data = request.json
+    player_token = data.get('player_token')
+
+    # Verify it's the player's turn
+    player_color = None
+    if game['white_player'] == player_token:
+        player_color = 'w'
+    elif game['black_player'] == player_token:
+        player_color = 'b'
+    else:
+        return jsonify({'success': False, 'error': 'You are not a player in this game'}), 403
+
+    if game['current_turn'] != player_color:
+        return jsonify({'success': False, 'error': 'Not your turn'}), 400
+
+    # Update game state
+    game['fen'] = data['fen']
+    game['current_turn'] = data['turn']
+    game['moves'].append(data['move'])
+    game['last_activity'] = time.time()
+
+    if data.get('game_over'):
+        game['game_over'] = True
+        game['result'] = data.get('result')
+
+    return jsonify({'success': True})
@@ -1,6 +1,8 @@
 import yaml
 import os
 import hashlib
+import threading
+import time
 
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 CONFIG_PATH = os.path.join(BASE_DIR, 'config.yml')
@@ -41,3 +43,67 @@ def load_config():
     theme.setdefault('sidebar_link_color', 'rgba(255,255,255,0.95)')
     theme.setdefault('sidebar_link_border_color', 'rgba(255,255,255,0.18)')
     return config
+
+
+# ---------------------- Cached config service ----------------------
+# load_config() parses YAML and rebuilds defaults every call. get_config() keeps the
+# parsed result in memory and only reloads when config.yml's (mtime, inode, size)
+# changes, polling the file at most once per check interval.
+DEFAULT_CHECK_INTERVAL = 2.0  # seconds between stat() calls on config.yml
+
+_config_lock = threading.Lock()
+_config_cache = {
+    'config': None,
+    'signature': None,
+    'generation': 0,
+    'checked_at': 0.0,
+}
+
+
+def _config_signature():
+    st = os.stat(CONFIG_PATH)
+    return (st.st_mtime_ns, st.st_ino, st.st_size)
+
+
+def _check_interval(config):
+    """Seconds between config.yml stat checks (env overrides config.yml)."""
+    raw = os.environ.get('HOMEHUB_CONFIG_CHECK_INTERVAL')
+    if raw in (None, ''):
+        raw = (config or {}).get('config_check_interval', DEFAULT_CHECK_INTERVAL)
+    try:
+        return max(0.0, float(raw))
+    except (TypeError, ValueError):
+        return DEFAULT_CHECK_INTERVAL
+
+
+def get_config(force=False):
+    """Return the parsed config, reloading only when config.yml changed on disk.
+
+    If a reload fails (file removed or invalid YAML mid-edit) the last good config
+    is kept. The very first load raises like load_config() does.
+    """
+    now = time.monotonic()
+    cached = _config_cache['config']
+    if not force and cached is not None and now - _config_cache['checked_at'] < _check_interval(cached):
+        return cached
+    with _config_lock:
+        cached = _config_cache['config']
+        if not force and cached is not None and now - _config_cache['checked_at'] < _check_interval(cached):
+            return cached
+        try:
+            signature = _config_signature()
+            if force or cached is None or signature != _config_cache['signature']:
+                config = load_config()
+                _config_cache['config'] = config
+                _config_cache['signature'] = signature
+                _config_cache['generation'] += 1
+        except Exception:
+            if _config_cache['config'] is None:
+                raise
+        _config_cache['checked_at'] = now
+        return _config_cache['config']
+
+
+def config_generation():
+    """Monotonic counter bumped on every config reload; lets other caches invalidate."""
+    return _config_cache['generation']
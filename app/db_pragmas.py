@@ -0,0 +1,76 @@
+"""Connection-level SQLite tuning.
+
+The web workers, the media download threads and the Radicale sync service all
+write data/app.db concurrently. On the default rollback journal, writers block
+readers, which shows up as "database is locked" errors. Every new SQLAlchemy
+connection therefore gets these pragmas. Defaults can be overridden from the
+`sqlite:` section of config.yml, e.g.
+
+    sqlite:
+      busy_timeout: 10000
+      mmap_size: 0        # disable memory-mapped I/O
+"""
+from sqlalchemy import event
+
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',         # readers no longer block on a writer (persistent per DB file)
+    'busy_timeout': 5000,          # ms to wait for a lock instead of failing immediately
+    'synchronous': 'NORMAL',       # safe with WAL; fsync at checkpoints instead of every commit
+    'mmap_size': 268435456,        # 256 MiB of memory-mapped reads
+    'cache_size': -16000,          # negative = KiB, so ~16 MiB page cache per connection
+    'temp_store': 'MEMORY',
+}
+
+# Applied first: journal_mode needs busy_timeout already set if another process holds a lock
+_ORDER = ('busy_timeout', 'journal_mode', 'synchronous', 'mmap_size', 'cache_size', 'temp_store')
+_ALLOWED_WORDS = {
+    'journal_mode': {'DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL', 'OFF'},
+    'synchronous': {'OFF', 'NORMAL', 'FULL', 'EXTRA'},
+    'temp_store': {'DEFAULT', 'FILE', 'MEMORY'},
+}
+
+
+def sqlite_pragmas(config=None):
+    """Return the pragma dict: DEFAULT_PRAGMAS overlaid with config.yml's `sqlite:` section.
+
+    Unknown keys and invalid values are ignored so a typo cannot stop the app from booting.
+    """
+    pragmas = dict(DEFAULT_PRAGMAS)
+    overrides = (config or {}).get('sqlite') or {}
+    if not isinstance(overrides, dict):
+        return pragmas
+    for key, value in overrides.items():
+        if key not in DEFAULT_PRAGMAS or value is None:
+            continue
+        if key in _ALLOWED_WORDS:
+            value = str(value).upper()
+            if value not in _ALLOWED_WORDS[key]:
+                continue
+        else:
+            try:
+                value = int(value)
+            except (TypeError, ValueError):
+                continue
+        pragmas[key] = value
+    return pragmas
+
+
+def apply_pragmas(dbapi_connection, pragmas):
+    """Run the PRAGMA statements on a raw sqlite3 connection."""
+    cur = dbapi_connection.cursor()
+    try:
+        for key in _ORDER:
+            if key in pragmas:
+                cur.execute(f"PRAGMA {key}={pragmas[key]}")
+    finally:
+        cur.close()
+
+
+def install_pragmas(engine, pragmas):
+    """Apply pragmas to every connection the engine opens from now on."""
+    if engine.dialect.name != 'sqlite':
+        return
+
+    @event.listens_for(engine, 'connect')
+    def _on_connect(dbapi_connection, connection_record):
+        apply_pragmas(dbapi_connection, pragmas)
@@ -0,0 +1,109 @@
+"""Live progress of running media downloads, shared without touching the database.
+
+The scheduler process (app/downloads.py) keeps a ProgressRegistry in memory and
+publishes it as a small JSON file in the data directory. Publishes are throttled
+and written atomically. The web process reads that file through read_progress(),
+which re-parses it only when its mtime changes. /media/events streams it to
+browsers over Server-Sent Events, and /media/status/<id> merges it into the
+polling fallback. Only terminal states (done, error, cancelled) reach the
+Media table.
+"""
+import json
+import os
+import re
+import threading
+import time
+
+PROGRESS_FILE = 'download_progress.json'
+PUBLISH_INTERVAL = 0.5  # seconds; minimum gap between file writes while downloads report progress
+STALE_AFTER = 30.0  # seconds; a file not rewritten for this long means no scheduler is running
+
+# "[download]  12.3% of ~ 50.00MiB at  1.23MiB/s ETA 00:35 (frag 3/20)"
+_LINE_RE = re.compile(
+    r"\[download\]\s+(?P<percent>\d+(?:\.\d+)?)%"
+    r"(?:\s+of\s+~?\s*(?P<size>\S+))?"
+    r"(?:\s+at\s+(?P<speed>\S+))?"
+    r"(?:\s+ETA\s+(?P<eta>\S+))?"
+)
+
+
+def parse_progress_line(line):
+    """Return {'percent', 'size', 'speed', 'eta'} for a yt-dlp progress line, else None."""
+    match = _LINE_RE.search(line)
+    if not match:
+        return None
+    info = match.groupdict()
+    info['percent'] = float(info['percent'])
+    for key in ('size', 'speed', 'eta'):
+        if info[key] in (None, 'Unknown', 'N/A'):
+            info[key] = None
+    return info
+
+
+def progress_path(data_dir):
+    return os.path.join(data_dir, PROGRESS_FILE)
+
+
+class ProgressRegistry:
+    """Scheduler-side registry: media id -> progress dict, published to progress_path()."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._last_publish = 0.0
+
+    def update(self, media_id, force=False, **fields):
+        with self._lock:
+            self._entries.setdefault(str(media_id), {}).update(fields)
+        self.publish(force=force)
+
+    def remove(self, media_id):
+        with self._lock:
+            self._entries.pop(str(media_id), None)
+        self.publish(force=True)
+
+    def publish(self, force=False):
+        """Write the registry out unless the last write was under PUBLISH_INTERVAL ago."""
+        now = time.monotonic()
+        # Write and replace under the lock: download threads publish concurrently, and an older
+        # snapshot must never replace a newer one
+        with self._lock:
+            if not force and now - self._last_publish < PUBLISH_INTERVAL:
+                return
+            self._last_publish = now
+            payload = json.dumps({'downloads': self._entries})
+            tmp = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            try:
+                with open(tmp, 'w') as fh:
+                    fh.write(payload)
+                os.replace(tmp, self.path)
+            except OSError:
+                pass
+
+
+_read_lock = threading.Lock()
+_read_cache = {}  # path -> (mtime_ns, downloads)
+
+
+def read_progress(data_dir):
+    """Web-side view: {media id (str): progress dict}. Empty if the scheduler is not publishing."""
+    path = progress_path(data_dir)
+    try:
+        st = os.stat(path)
+    except OSError:
+        return {}
+    if time.time() - st.st_mtime > STALE_AFTER:
+        return {}
+    with _read_lock:
+        cached = _read_cache.get(path)
+        if cached and cached[0] == st.st_mtime_ns:
+            return cached[1]
+    try:
+        with open(path) as fh:
+            downloads = json.load(fh).get('downloads') or {}
+    except (OSError, ValueError):
+        return {}
+    with _read_lock:
+        _read_cache[path] = (st.st_mtime_ns, downloads)
+    return downloads
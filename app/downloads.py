@@ -0,0 +1,352 @@
+"""Media download queue and scheduler.
+
+The /media route only records a DownloadJob. DownloadScheduler runs in its own
+process (sync/media_downloader.py, started by start.sh) so downloads survive web
+worker restarts. It claims queued jobs by priority, runs yt-dlp for each within
+the `media_downloads` limits from config.yml, and records the outcome in
+Media.status:
+
+    media_downloads:
+      max_concurrent: 2   # downloads at once
+      per_host: 1         # downloads at once from the same site
+      max_attempts: 3     # runs before a job that keeps getting interrupted is failed
+
+On start it re-queues jobs left 'running' by a crash. On SIGTERM it stops
+claiming work, kills the running yt-dlp processes and re-queues their jobs;
+yt-dlp resumes from the partial files. cancel() works from the web process: it
+marks the job cancelled and the scheduler kills the download on its next poll.
+
+Live progress (percent, speed, ETA) is not written to the database; it goes to
+the ProgressRegistry in app/download_progress.py, which /media/events streams.
+"""
+import logging
+import os
+import signal
+import subprocess
+import threading
+from datetime import datetime
+from urllib.parse import urlsplit
+
+from .download_progress import ProgressRegistry, parse_progress_line, progress_path
+from .media_index import index_download
+from .models import db, Media, DownloadJob
+
+logger = logging.getLogger('homehub.downloads')
+
+MEDIA_FOLDER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'media')
+
+DEFAULT_LIMITS = {'max_concurrent': 2, 'per_host': 1, 'max_attempts': 3}
+POLL_INTERVAL = 2.0  # seconds between queue checks
+QUEUED = 'Queued'  # Media.progress while the job waits for a slot
+ACTIVE = ('queued', 'running')
+# Lines yt-dlp prints once the file is in place (see build_command)
+FILE_MARKER = 'HOMEHUB_FILE '
+ID_MARKER = 'HOMEHUB_ID '
+
+
+def download_limits(config):
+    """DEFAULT_LIMITS overlaid with config.yml's `media_downloads:` section (invalid values ignored)."""
+    limits = dict(DEFAULT_LIMITS)
+    overrides = (config or {}).get('media_downloads') or {}
+    if isinstance(overrides, dict):
+        for key in DEFAULT_LIMITS:
+            try:
+                limits[key] = max(1, int(overrides[key]))
+            except (KeyError, TypeError, ValueError):
+                pass
+    return limits
+
+
+def host_of(url):
+    host = (urlsplit(url).hostname or '').lower()
+    return host[4:] if host.startswith('www.') else host
+
+
+def build_command(url, fmt, quality, output_tmpl):
+    cmd = ["yt-dlp", "-o", output_tmpl, "--newline"]
+    # Report the final path and video id; --print implies --quiet, so ask for progress explicitly
+    cmd += ["--progress", "--print", f"after_move:{FILE_MARKER}%(filepath)s",
+            "--print", f"after_move:{ID_MARKER}%(extractor_key)s:%(id)s"]
+    if fmt == 'mp3':
+        cmd += ["-x", "--audio-format", "mp3"]
+    else:
+        # Prefer bestvideo+bestaudio with mp4 fallback, honoring selected quality
+        selected = quality or 'best'
+        if selected == 'best':
+            # best available up to original, prefer mp4 mux else fallback
+            fmt_string = "bestvideo[ext=mp4]+bestaudio[ext=m4a]/bestvideo+bestaudio/best"
+        else:
+            # Use user-provided filter, but still add fallbacks and prefer mp4 container when possible
+            fmt_string = f"{selected}/bestvideo[ext=mp4]+bestaudio[ext=m4a]/best"
+        cmd += ["-f", fmt_string]
+        # Merge into mp4 when possible without re-encoding
+        cmd += ["--merge-output-format", "mp4"]
+    return cmd + [url]
+
+
+def enqueue(media, fmt='mp4', quality='best', priority=0):
+    """Queue a download for a flushed Media row and mark it pending (caller commits)."""
+    job = DownloadJob(
+        media_id=media.id,
+        url=media.url,
+        host=host_of(media.url),
+        fmt=fmt,
+        quality=quality,
+        output_base=f"media_{int(datetime.utcnow().timestamp())}_{media.id}",
+        priority=priority,
+    )
+    media.status = 'pending'
+    media.progress = QUEUED
+    db.session.add(job)
+    return job
+
+
+def cancel(media_id):
+    """Cancel queued or running downloads for media_id (caller commits). Returns True if one was active."""
+    jobs = DownloadJob.query.filter(DownloadJob.media_id == media_id, DownloadJob.status.in_(ACTIVE)).all()
+    for job in jobs:
+        job.status = 'cancelled'
+        job.finished_at = datetime.utcnow()
+    m = db.session.get(Media, media_id)
+    if jobs and m:
+        m.status = 'cancelled'
+        m.progress = None
+    return bool(jobs)
+
+
+def is_output(fname, base):
+    """Whether fname is one of the files yt-dlp writes for output base (base.mp4, base.mp4.part, base.f137.webm).
+
+    A bare prefix match would also take media_<ts>_17.mp4 for base media_<ts>_1.
+    """
+    return fname == base or fname.startswith(base + '.')
+
+
+def _remove_outputs(base):
+    if not base:
+        return
+    try:
+        for fname in os.listdir(MEDIA_FOLDER):
+            if is_output(fname, base):
+                os.remove(os.path.join(MEDIA_FOLDER, fname))
+    except OSError:
+        pass
+
+
+def _saved_file(base, final_path):
+    """File name of a finished download: the path yt-dlp reported, else the first file with the job's prefix."""
+    if final_path and os.path.dirname(os.path.abspath(final_path)) == MEDIA_FOLDER and os.path.isfile(final_path):
+        return os.path.basename(final_path)
+    # Older yt-dlp builds without --print after_move
+    return next((f for f in sorted(os.listdir(MEDIA_FOLDER)) if is_output(f, base)
+                 and not f.endswith('.part')), None)
+
+
+class DownloadScheduler:
+    """Runs queued DownloadJobs with bounded concurrency. One instance per deployment."""
+
+    def __init__(self, app):
+        self.app = app
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._running = {}  # job id -> {'host', 'proc', 'reason', 'thread'}
+        self.progress = ProgressRegistry(progress_path(app.config['HOMEHUB_DATA_DIR']))
+
+    def limits(self):
+        from .config import get_config
+        return download_limits(get_config())
+
+    # ---- lifecycle ----
+
+    def recover(self):
+        """Re-queue jobs a previous scheduler left running; fail those out of attempts."""
+        max_attempts = self.limits()['max_attempts']
+        for job in DownloadJob.query.filter_by(status='running').all():
+            m = db.session.get(Media, job.media_id)
+            if (job.attempts or 0) >= max_attempts:
+                job.status, job.error, job.finished_at = 'error', 'interrupted too many times', datetime.utcnow()
+                if m:
+                    m.status, m.progress = 'error', None
+            else:
+                job.status = 'queued'
+                if m:
+                    m.status, m.progress = 'pending', QUEUED
+        db.session.commit()
+
+    def run(self):
+        """Dispatch loop; returns after stop() (or SIGTERM/SIGINT) once running downloads are wound down."""
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, lambda *_: self.stop())
+            signal.signal(signal.SIGINT, lambda *_: self.stop())
+        with self.app.app_context():
+            self.recover()
+            while not self._stop.is_set():
+                try:
+                    self._reap_cancelled()
+                    self._dispatch()
+                except Exception as e:
+                    logger.error(f"Download scheduler error: {e}", exc_info=True)
+                    db.session.rollback()
+                finally:
+                    db.session.remove()
+                # Doubles as a heartbeat: readers treat a file that stops changing as stale
+                self.progress.publish(force=True)
+                self._stop.wait(POLL_INTERVAL)
+        self._shutdown()
+        self.progress.publish(force=True)
+
+    def stop(self):
+        self._stop.set()
+
+    def _shutdown(self, timeout=10):
+        with self._lock:
+            running = list(self._running.values())
+            for entry in running:
+                entry['reason'] = 'shutdown'
+                self._kill(entry['proc'])
+        for entry in running:
+            entry['thread'].join(timeout)
+        logger.info("Download scheduler stopped")
+
+    # ---- dispatch ----
+
+    def _dispatch(self):
+        limits = self.limits()
+        with self._lock:
+            free = limits['max_concurrent'] - len(self._running)
+            per_host = {}
+            for entry in self._running.values():
+                per_host[entry['host']] = per_host.get(entry['host'], 0) + 1
+        if free <= 0:
+            return
+        queued = DownloadJob.query.filter_by(status='queued').order_by(
+            DownloadJob.priority.desc(), DownloadJob.id.asc()
+        ).limit(50).all()
+        for job in queued:
+            if free <= 0:
+                break
+            if per_host.get(job.host, 0) >= limits['per_host']:
+                continue
+            # Claim atomically so a stray second scheduler cannot start the same job
+            claimed = DownloadJob.query.filter_by(id=job.id, status='queued').update({
+                DownloadJob.status: 'running',
+                DownloadJob.attempts: DownloadJob.attempts + 1,
+                DownloadJob.started_at: datetime.utcnow(),
+            }, synchronize_session=False)
+            db.session.commit()
+            if claimed != 1:
+                continue
+            free -= 1
+            per_host[job.host] = per_host.get(job.host, 0) + 1
+            entry = {'host': job.host, 'proc': None, 'reason': None}
+            entry['thread'] = threading.Thread(target=self._work, args=(job.id,), daemon=True)
+            with self._lock:
+                self._running[job.id] = entry
+            entry['thread'].start()
+
+    def _reap_cancelled(self):
+        with self._lock:
+            ids = list(self._running)
+        if not ids:
+            return
+        cancelled = [row[0] for row in db.session.query(DownloadJob.id).filter(
+            DownloadJob.id.in_(ids), DownloadJob.status == 'cancelled'
+        )]
+        with self._lock:
+            for job_id in cancelled:
+                entry = self._running.get(job_id)
+                if entry and entry['reason'] is None:
+                    entry['reason'] = 'cancel'
+                    self._kill(entry['proc'])
+
+    @staticmethod
+    def _kill(proc):
+        if proc is None or proc.poll() is not None:
+            return
+        try:
+            # yt-dlp spawns ffmpeg; signal the whole process group
+            os.killpg(proc.pid, signal.SIGTERM)
+        except (AttributeError, OSError):
+            proc.terminate()
+
+    # ---- worker ----
+
+    def _work(self, job_id):
+        with self.app.app_context():
+            media_id = None
+            try:
+                media_id = db.session.get(DownloadJob, job_id).media_id
+                self._download(job_id)
+            except Exception as e:
+                logger.error(f"Download job {job_id} failed: {e}", exc_info=True)
+                db.session.rollback()
+                self._finish(job_id, 'error', str(e))
+            finally:
+                db.session.remove()
+                with self._lock:
+                    self._running.pop(job_id, None)
+                # After the outcome is committed, so clients that see the entry vanish read the final status
+                if media_id is not None:
+                    self.progress.remove(media_id)
+
+    def _download(self, job_id):
+        job = db.session.get(DownloadJob, job_id)
+        self.progress.update(job.media_id, force=True, state='starting', percent=None, size=None, speed=None, eta=None)
+        output_tmpl = os.path.join(MEDIA_FOLDER, job.output_base + ".%(ext)s")
+        cmd = build_command(job.url, job.fmt, job.quality, output_tmpl)
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1,
+                                start_new_session=True)
+        with self._lock:
+            entry = self._running[job_id]
+            entry['proc'] = proc
+            # stop()/cancel may have arrived before the process existed
+            if entry['reason'] is not None:
+                self._kill(proc)
+        final_path = video_id = None
+        for line in proc.stdout:
+            if line.startswith(FILE_MARKER):
+                final_path = line[len(FILE_MARKER):].strip()
+                continue
+            if line.startswith(ID_MARKER):
+                video_id = line[len(ID_MARKER):].strip()
+                continue
+            info = parse_progress_line(line)
+            if info is not None and entry['reason'] is None:
+                self.progress.update(job.media_id, state='downloading', **info)
+        ret = proc.wait()
+        reason = entry['reason']
+        if reason == 'shutdown':
+            self._requeue(job_id)
+        elif reason == 'cancel':
+            # cancel() already recorded the outcome; only the partial files are left
+            _remove_outputs(job.output_base)
+        elif ret != 0:
+            self._finish(job_id, 'error', f"yt-dlp exited with {ret}")
+        else:
+            self._finish(job_id, 'done', None, _saved_file(job.output_base, final_path), video_id)
+
+    def _requeue(self, job_id):
+        job = db.session.get(DownloadJob, job_id, populate_existing=True)
+        if job.status == 'running':
+            # A graceful stop does not count as an attempt
+            job.status, job.attempts = 'queued', max((job.attempts or 1) - 1, 0)
+            m = db.session.get(Media, job.media_id, populate_existing=True)
+            if m:
+                m.status, m.progress = 'pending', QUEUED
+        db.session.commit()
+
+    def _finish(self, job_id, status, error=None, filename=None, video_id=None):
+        job = db.session.get(DownloadJob, job_id, populate_existing=True)
+        if job is None or job.status != 'running':
+            return
+        job.status, job.error, job.finished_at = status, error, datetime.utcnow()
+        m = db.session.get(Media, job.media_id, populate_existing=True)
+        if m is None:
+            # Media row deleted mid-download
+            _remove_outputs(job.output_base)
+        else:
+            m.status, m.progress = status, None
+            if filename:
+                m.filepath = filename
+                index_download(job.url, job.fmt, job.quality, filename, video_id)
+        db.session.commit()
@@ -0,0 +1,160 @@
+"""Cached month snapshots for the expense tracker.
+
+month_snapshot_json(y, m) returns the serialized payload that the expenses page
+embeds and /api/expenses/month returns: the entries grouped by day, plus totals
+per day, payer and category computed with SQL GROUP BY, plus the currency and
+category settings. Payloads are cached per (year, month, month version,
+settings generation).
+
+The month version lives in the database: triggers on expense_entry (schema
+migration 19) bump expense_month_version for the old and new month of every
+inserted, updated or deleted entry, in the writer's own transaction. So edits
+in the web process and entries the recurring-expenses job materializes in its
+own process both reach this cache on the next lookup, which reads the
+version with one primary-key query. A build that races a write is stored
+under the version read before it and never served again. Call
+invalidate_settings() after changing app_setting. SNAPSHOT_TTL is only a
+safety net for writes made with the triggers dropped.
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+import calendar as _calendar
+
+from sqlalchemy import func
+
+from .models import db, ExpenseEntry
+
+SNAPSHOT_TTL = 300.0  # seconds
+MAX_MONTHS = 48
+
+DEFAULT_SETTINGS = {'currency': '₹', 'categories': []}
+
+_lock = threading.Lock()
+_snapshots = OrderedDict()  # (year, month, settings_gen) -> (json, expires_at), least recently used first
+_settings = None  # (settings dict, expires_at)
+_settings_gen = 0
+
+_MONTH_VERSION = db.text("SELECT version FROM expense_month_version WHERE month = :month")
+
+
+def expense_settings():
+    """Currency and category list from app_setting (cached)."""
+    global _settings
+    entry = _settings
+    if entry and entry[1] > time.monotonic():
+        return entry[0]
+    settings = {'currency': DEFAULT_SETTINGS['currency'], 'categories': []}
+    try:
+        rows = db.session.execute(db.text("SELECT key, value FROM app_setting WHERE key IN ('currency','categories')"))
+        data = {k: v for k, v in rows}
+        if data.get('currency'): settings['currency'] = data['currency']
+        if data.get('categories'): settings['categories'] = [c.strip() for c in data['categories'].split(',') if c.strip()]
+    except Exception:
+        pass
+    _settings = (settings, time.monotonic() + SNAPSHOT_TTL)
+    return settings
+
+
+def _month_bounds(y, m):
+    return date(y, m, 1), date(y, m, _calendar.monthrange(y, m)[1])
+
+
+def build_month_snapshot(y, m):
+    """Compute the month payload from the database (uncached)."""
+    month_start, month_end = _month_bounds(y, m)
+    in_month = (ExpenseEntry.date >= month_start, ExpenseEntry.date <= month_end)
+    amount = func.coalesce(ExpenseEntry.amount, 0)
+
+    by_date = {}
+    total = 0.0
+    for d, day_total in db.session.query(ExpenseEntry.date, func.sum(amount)).filter(*in_month).group_by(ExpenseEntry.date):
+        by_date[d.strftime('%Y-%m-%d')] = {'total': float(day_total or 0), 'entries': []}
+        total += float(day_total or 0)
+    payer = func.coalesce(ExpenseEntry.payer, '')
+    per_payer = {
+        name: float(s or 0)
+        for name, s in db.session.query(payer, func.sum(amount)).filter(*in_month).group_by(payer)
+    }
+    per_category = {
+        cat: float(s or 0)
+        for cat, s in db.session.query(ExpenseEntry.category, func.sum(amount)).filter(
+            *in_month, ExpenseEntry.category.isnot(None), ExpenseEntry.category != ''
+        ).group_by(ExpenseEntry.category)
+    }
+    rows = db.session.query(
+        ExpenseEntry.id, ExpenseEntry.date, ExpenseEntry.title, ExpenseEntry.category,
+        ExpenseEntry.unit_price, ExpenseEntry.amount, ExpenseEntry.quantity,
+        ExpenseEntry.recurring_id, ExpenseEntry.payer,
+    ).filter(*in_month).order_by(ExpenseEntry.date.asc(), ExpenseEntry.timestamp.asc())
+    for eid, d, title, category, unit_price, amt, quantity, recurring_id, payer_name in rows:
+        # setdefault: an entry committed after the GROUP BY ran has no day total yet
+        by_date.setdefault(d.strftime('%Y-%m-%d'), {'total': 0.0, 'entries': []})['entries'].append({
+            'id': eid,
+            'title': title,
+            'category': category,
+            'unit_price': float(unit_price) if unit_price is not None else None,
+            'amount': float(amt or 0),
+            'quantity': float(quantity or 0) if quantity is not None else None,
+            'recurring': bool(recurring_id),
+            'payer': payer_name or ''
+        })
+    top_category = max(per_category.items(), key=lambda kv: kv[1])[0] if per_category else None
+    return {
+        'by_date': by_date,
+        'summary': {
+            'total_this_month': total,
+            'per_payer': per_payer,
+            'per_category': per_category,
+            'top_category': top_category
+        },
+        'year': y,
+        'month': m,
+        'settings': expense_settings()
+    }
+
+
+def month_version(y, m):
+    """How often expense_entry rows of month (y, m) have changed, as counted by the triggers."""
+    return db.session.execute(_MONTH_VERSION, {'month': f"{y:04d}-{m:02d}"}).scalar() or 0
+
+
+def month_snapshot_json(y, m):
+    """Serialized month payload, served from the cache when possible."""
+    version = month_version(y, m)
+    now = time.monotonic()
+    with _lock:
+        key = (y, m, version, _settings_gen)
+        entry = _snapshots.get(key)
+        if entry and entry[1] > now:
+            _snapshots.move_to_end(key)
+            return entry[0]
+    payload = json.dumps(build_month_snapshot(y, m))
+    with _lock:
+        same_month = [k for k in _snapshots if k[:2] == (y, m)]
+        if any(k[2:] > key[2:] for k in same_month):
+            return payload  # a build of a newer version finished first
+        for old in same_month:  # older versions are never served again
+            del _snapshots[old]
+        _snapshots[key] = (payload, now + SNAPSHOT_TTL)
+        while len(_snapshots) > MAX_MONTHS:
+            _snapshots.popitem(last=False)
+    return payload
+
+
+def invalidate_settings():
+    """Call after changing app_setting; every cached month embeds the settings."""
+    global _settings, _settings_gen
+    with _lock:
+        _settings = None
+        _settings_gen += 1
+        _snapshots.clear()
+
+
+def clear_expense_cache():
+    global _settings
+    with _lock:
+        _settings = None
+        _snapshots.clear()
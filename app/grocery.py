@@ -0,0 +1,97 @@
+"""Grocery purchase frequency for shopping-list suggestions.
+
+Every item added to the shopping list is logged to grocery_history and, in the
+same transaction, bumps its row in grocery_frequency (keyed by the normalized
+item name). Suggestions read the top rows by score through ix_grocery_frequency_score,
+so their cost does not depend on how much history has accumulated.
+
+Scores decay exponentially with a HALF_LIFE_DAYS half-life. decay() applies
+the decay for the time elapsed since its previous run and drops items whose
+score fell below MIN_SCORE; sync/grocery_frequency.py runs it periodically.
+Between runs a new purchase simply adds 1.0.
+"""
+from datetime import datetime
+
+from sqlalchemy import DateTime, bindparam, select, text
+
+from .models import db, GroceryHistory, GroceryFrequency
+
+HALF_LIFE_DAYS = 30.0
+MIN_SCORE = 0.05  # a single purchase falls below this after ~4.3 half-lives (~130 days)
+DECAYED_AT_KEY = 'grocery_decayed_at'  # app_setting key
+
+
+def normalize(item):
+    return ' '.join((item or '').split()).lower()
+
+
+_UPSERT = text(
+    "INSERT INTO grocery_frequency (key, item, score, last_seen) VALUES (:k, :i, :w, :t) "
+    "ON CONFLICT(key) DO UPDATE SET score = score + excluded.score, item = excluded.item, "
+    "last_seen = excluded.last_seen"
+).bindparams(bindparam('t', type_=DateTime))
+
+
+def bump_frequency(conn, item, when, weight=1.0):
+    """Upsert one purchase of item into grocery_frequency on an open connection or session."""
+    key = normalize(item)
+    if not key:
+        return
+    conn.execute(_UPSERT, {'k': key, 'i': item.strip(), 'w': weight, 't': when})
+
+
+def record_purchase(item, creator):
+    """Log item to grocery_history and grocery_frequency (same transaction; caller commits)."""
+    now = datetime.utcnow()
+    db.session.add(GroceryHistory(item=item, creator=creator, timestamp=now))
+    bump_frequency(db.session, item, now)
+
+
+def suggestions(exclude=(), limit=10):
+    """Top `limit` items by decayed score, skipping names in exclude (compared case-insensitively)."""
+    skip = {normalize(x) for x in exclude}
+    rows = db.session.query(GroceryFrequency.key, GroceryFrequency.item).order_by(
+        GroceryFrequency.score.desc()
+    ).limit(limit + len(skip))
+    return [item for key, item in rows if key not in skip][:limit]
+
+
+def decay_factor(elapsed_days):
+    return 0.5 ** (max(elapsed_days, 0.0) / HALF_LIFE_DAYS)
+
+
+def decay(now=None):
+    """Decay every score for the time since the last run and compact dead rows. Commits.
+
+    Returns the number of rows removed.
+    """
+    now = now or datetime.utcnow()
+    last_s = db.session.execute(text("SELECT value FROM app_setting WHERE key = :k"), {'k': DECAYED_AT_KEY}).scalar()
+    removed = 0
+    if last_s:
+        elapsed = (now - datetime.fromisoformat(last_s)).total_seconds() / 86400.0
+        db.session.execute(text("UPDATE grocery_frequency SET score = score * :f"), {'f': decay_factor(elapsed)})
+        removed = db.session.execute(text("DELETE FROM grocery_frequency WHERE score < :m"), {'m': MIN_SCORE}).rowcount
+    db.session.execute(text("REPLACE INTO app_setting(key, value) VALUES(:k, :v)"), {'k': DECAYED_AT_KEY, 'v': now.isoformat()})
+    db.session.commit()
+    return removed
+
+
+def rebuild(conn, now=None):
+    """Recompute grocery_frequency from the full grocery_history (migration / repair)."""
+    now = now or datetime.utcnow()
+    totals = {}  # key -> [item, score, last_seen]; rows come oldest first so item/last_seen end up newest
+    rows = conn.execute(select(GroceryHistory.item, GroceryHistory.timestamp).order_by(GroceryHistory.timestamp))
+    for item, ts in rows:
+        key = normalize(item)
+        if not key:
+            continue
+        ts = ts or now
+        entry = totals.setdefault(key, [item, 0.0, ts])
+        entry[0], entry[2] = item.strip(), ts
+        entry[1] += decay_factor((now - ts).total_seconds() / 86400.0)
+    conn.execute(text("DELETE FROM grocery_frequency"))
+    live = [{'key': k, 'item': i, 'score': sc, 'last_seen': ts} for k, (i, sc, ts) in totals.items() if sc >= MIN_SCORE]
+    if live:
+        conn.execute(GroceryFrequency.__table__.insert(), live)
+    conn.execute(text("REPLACE INTO app_setting(key, value) VALUES(:k, :v)"), {'k': DECAYED_AT_KEY, 'v': now.isoformat()})
@@ -0,0 +1,180 @@
+"""Inverted ingredient index for "what can I cook".
+
+Recipe and favorite-meal ingredient lists are free text. Whenever one is saved,
+index() reduces it to ingredient words and stores one recipe_ingredient row
+per (word, recipe). The words are lowercased, stripped of diacritics,
+quantities, units and preparation words, and singular ("2 cups chopped
+Tomatoes" -> tomato).
+
+cook_suggestions() answers "what can I cook with what we have": it reads only
+the postings of the words on the expiry list and shopping list (the table's
+primary key starts with the word) and intersects them in memory. Recipe text
+is never read again, so the cost follows the number of matching postings,
+not the size of the recipe book. An item matches a recipe when the recipe
+has every word of the item that appears in any recipe at all, so "olive oil"
+does not match a recipe with sesame oil, while "Greek yogurt" still matches
+plain yogurt.
+"""
+import heapq
+import html
+import re
+import unicodedata
+from datetime import date, timedelta
+
+from sqlalchemy import bindparam, text
+
+from .models import db, Recipe, FavoriteMeal, ExpiryItem, ShoppingItem
+
+SOON_DAYS = 3  # expiry items due within this many days count most
+WEIGHTS = {'soon': 3.0, 'expiry': 2.0, 'shopping': 1.0}
+MAX_WORD = 64
+
+_TAG = re.compile(r'<[^>]*>')
+_WORD = re.compile(r'[^\W\d_]+')  # letters only: drops quantities like 2, 1/2 and ½
+
+UNITS = {
+    'g', 'gr', 'gram', 'kg', 'kilogram', 'mg', 'ml', 'cl', 'dl', 'l', 'liter', 'litre', 'oz', 'ounce', 'lb', 'pound',
+    'cup', 'tbsp', 'tbs', 'tablespoon', 'tsp', 'teaspoon', 'pinch', 'dash', 'handful', 'bunch', 'sprig', 'slice',
+    'piece', 'can', 'tin', 'jar', 'pack', 'package', 'packet', 'bottle', 'box', 'bag', 'pint', 'quart', 'stick',
+}
+STOPWORDS = {
+    'a', 'an', 'the', 'of', 'and', 'or', 'to', 'for', 'with', 'without', 'in', 'into', 'on', 'about', 'plus', 'some',
+    'few', 'more', 'extra', 'optional', 'taste', 'needed', 'serve', 'serving', 'garnish', 'x',
+    'fresh', 'freshly', 'chopped', 'diced', 'minced', 'sliced', 'grated', 'shredded', 'crushed', 'cubed', 'halved',
+    'quartered', 'peeled', 'seeded', 'beaten', 'melted', 'softened', 'cooked', 'boiled', 'roasted', 'toasted',
+    'dried', 'frozen', 'thawed', 'drained', 'rinsed', 'packed', 'heaping', 'level', 'finely', 'roughly', 'thinly',
+    'large', 'medium', 'small', 'big', 'whole', 'half', 'cold', 'warm', 'hot', 'room', 'temperature', 'ripe',
+}
+
+
+def _fold(word):
+    return ''.join(c for c in unicodedata.normalize('NFKD', word.casefold()) if not unicodedata.combining(c))
+
+
+def singular(word):
+    """Crude English singular, applied the same way to recipes and to list items."""
+    if len(word) > 4 and word.endswith('ies'):
+        return word[:-3] + 'y'  # berries -> berry
+    if len(word) > 4 and word.endswith(('oes', 'ches', 'shes', 'sses', 'xes')):
+        return word[:-2]  # tomatoes -> tomato, peaches -> peach
+    if len(word) > 3 and word.endswith('s') and not word.endswith(('ss', 'us', 'is')):
+        return word[:-1]
+    return word
+
+
+def words(value):
+    """Ingredient words of free text (HTML allowed), in order of first appearance."""
+    plain = _fold(html.unescape(_TAG.sub(' ', value or '')))  # before splitting: NFKD turns ½ into 1⁄2
+    seen = {}
+    for raw in _WORD.findall(plain):
+        word = singular(raw)
+        if len(word) < 2 or len(word) > MAX_WORD or word in STOPWORDS or word in UNITS:
+            continue
+        seen.setdefault(word, None)
+    return list(seen)
+
+
+def index(conn, kind, ref_id, ingredients):
+    """Replace the index rows of one recipe ('recipe') or favorite meal ('meal'); caller commits."""
+    unindex(conn, kind, ref_id)
+    found = words(ingredients)
+    if found:
+        conn.execute(text(
+            "INSERT INTO recipe_ingredient (ingredient, kind, ref_id, total) VALUES (:w, :k, :r, :t)"
+        ), [{'w': w, 'k': kind, 'r': ref_id, 't': len(found)} for w in found])
+
+
+def unindex(conn, kind, ref_id):
+    conn.execute(text("DELETE FROM recipe_ingredient WHERE kind = :k AND ref_id = :r"), {'k': kind, 'r': ref_id})
+
+
+def rebuild(conn):
+    """Re-index every recipe and favorite meal (migration / repair)."""
+    conn.execute(text("DELETE FROM recipe_ingredient"))
+    for kind, model in (('recipe', Recipe), ('meal', FavoriteMeal)):
+        for ref_id, ingredients in conn.execute(db.select(model.id, model.ingredients)).fetchall():
+            index(conn, kind, ref_id, ingredients)
+
+
+def pantry(sources=('expiry', 'shopping'), today=None):
+    """(name, weight) of what is on hand: expiry items not yet expired, then the shopping list."""
+    today = today or date.today()
+    items = []
+    if 'expiry' in sources:
+        soon = today + timedelta(days=SOON_DAYS)
+        rows = db.session.query(ExpiryItem.name, ExpiryItem.expiry_date).filter(
+            (ExpiryItem.expiry_date >= today) | ExpiryItem.expiry_date.is_(None)
+        ).order_by(ExpiryItem.expiry_date)
+        for name, expires in rows:
+            items.append((name, WEIGHTS['soon'] if expires and expires <= soon else WEIGHTS['expiry']))
+    if 'shopping' in sources:
+        items += [(name, WEIGHTS['shopping']) for (name,) in db.session.query(ShoppingItem.item)]
+    return items
+
+
+_POSTINGS = text(
+    "SELECT ingredient, kind, ref_id, total FROM recipe_ingredient WHERE ingredient IN :words AND kind IN :kinds"
+).bindparams(bindparam('words', expanding=True), bindparam('kinds', expanding=True))
+
+
+def cook_suggestions(items, kinds=('recipe', 'meal'), limit=10):
+    """Recipes and favorite meals ranked by how much of items (name, weight) they use.
+
+    The score is the summed weight of the items a recipe uses, so food that is
+    about to expire counts most. Ties go to the recipe with the larger share of
+    its ingredients on hand, then to the one with fewer missing ingredients.
+    """
+    merged = {}  # the same ingredient listed twice (expiry and shopping list) counts once, at its highest weight
+    for name, weight in items:
+        found = tuple(words(name))
+        if found:
+            names, best = merged.get(found, ([], 0.0))
+            merged[found] = (names + [name], max(best, weight))
+    if not merged or not kinds:
+        return []
+    postings, totals = {}, {}
+    wanted = sorted({w for found in merged for w in found})
+    for word, kind, ref_id, total in db.session.execute(_POSTINGS, {'words': wanted, 'kinds': list(kinds)}):
+        key = (kind, ref_id)
+        postings.setdefault(word, set()).add(key)
+        totals[key] = total
+
+    matched = []  # (names, weight, known words, recipes using the item)
+    for found, (names, weight) in merged.items():
+        known = [w for w in found if w in postings]  # words no recipe mentions (brands, "greek") are ignored
+        if known:
+            matched.append((names, weight, known, set.intersection(*(postings[w] for w in known))))
+    scores, covered = {}, {}
+    for names, weight, known, keys in matched:
+        for key in keys:
+            scores[key] = scores.get(key, 0.0) + weight
+            covered[key] = covered.get(key, 0) + len(known)
+    if not scores:
+        return []
+
+    # Only recipes that can still make the top `limit` by score need the tie-breakers
+    cutoff = heapq.nlargest(limit, scores.values())[-1]
+    best = sorted((key for key, score in scores.items() if score >= cutoff), key=lambda key: (
+        -scores[key], -min(covered[key], totals[key]) / totals[key], totals[key] - covered[key]))[:limit]
+
+    titles = {}
+    for kind, model, column in (('recipe', Recipe, Recipe.title), ('meal', FavoriteMeal, FavoriteMeal.name)):
+        ids = [ref_id for k, ref_id in best if k == kind]
+        if ids:
+            titles.update(((kind, i), t) for i, t in db.session.query(model.id, column).filter(model.id.in_(ids)))
+    results = []
+    for key in best:
+        if key not in titles:
+            continue
+        uses = [(names, known) for names, _, known, keys in matched if key in keys]
+        have = len({w for _, known in uses for w in known})
+        results.append({
+            'kind': key[0],
+            'id': key[1],
+            'title': titles[key],
+            'url': '/recipes' if key[0] == 'recipe' else '/meals',
+            'uses': [name for names, _ in uses for name in names],
+            'coverage': round(have / totals[key], 2),
+            'missing': totals[key] - have,
+        })
+    return results
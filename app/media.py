@@ -0,0 +1,135 @@
+"""Media downloader (yt-dlp). Downloads run in the scheduler process, see app/downloads.py."""
+from flask import render_template, request, redirect, url_for, flash, send_from_directory, jsonify, current_app, Response
+import json
+import threading
+import time
+
+from .download_progress import read_progress
+from .downloads import MEDIA_FOLDER, cancel, enqueue
+from .media_index import canonical_key, variant_key, lookup, release, savings
+from .models import db, Media
+from .pagination import list_page, load_more
+from .routes import main_bp, bleach
+from .utils import human_size
+
+SSE_TICK = 0.5  # seconds between checks of the progress registry
+SSE_RETRY_MS = 3000  # reconnect delay the stream asks EventSource for
+SSE_KEEPALIVE = 15.0  # seconds of silence before a comment line keeps proxies from closing the stream
+SSE_MAX_AGE = 10.0  # seconds; each stream holds a gthread thread, the browser reconnects after SSE_RETRY_MS
+SSE_MAX_STREAMS = 2  # streams open at once, out of gunicorn's --threads (start.sh); further tabs poll instead
+
+_streams = threading.BoundedSemaphore(SSE_MAX_STREAMS)
+
+
+def _can_manage(m, user):
+    admin_name = current_app.config['HOMEHUB_CONFIG'].get('admin_name', 'Administrator')
+    return user in {admin_name, 'Administrator', 'admin'} or user == m.creator
+
+@main_bp.route('/media', methods=['GET', 'POST'])
+def media():
+    if request.method == 'POST':
+        url = bleach.clean(request.form['url'])
+        creator = bleach.clean(request.form['creator'])
+        fmt = bleach.clean(request.form.get('format', 'mp4'))
+        quality = bleach.clean(request.form.get('quality', 'best'))
+        try:
+            priority = max(-10, min(10, int(request.form.get('priority') or 0)))
+        except ValueError:
+            priority = 0
+        # Same video in the same format and quality already in the library: reuse the file
+        existing = lookup(canonical_key(url), variant_key(fmt, quality))
+        if existing is not None:
+            existing.hits = (existing.hits or 0) + 1
+            db.session.add(Media(title=url, url=url, creator=creator, filepath=existing.filepath, status='done'))
+            db.session.commit()
+            flash('Already in the library; reused the existing file.', 'info')
+            return redirect(url_for('main.media'))
+        # Record the download; the scheduler picks it up within a few seconds
+        media_obj = Media(title=url, url=url, creator=creator, filepath='', status='pending')
+        db.session.add(media_obj)
+        db.session.flush()
+        enqueue(media_obj, fmt=fmt, quality=quality, priority=priority)
+        db.session.commit()
+        flash('Download queued. You can switch tabs; refresh to check status.', 'info')
+        return redirect(url_for('main.media'))
+    media_list, next_cursor = list_page('media', Media.query, Media.download_time, Media.id)
+    config = current_app.config['HOMEHUB_CONFIG']
+    reused, saved = savings()
+    return render_template('media.html', media_list=media_list, next_cursor=next_cursor, config=config,
+                           reused=reused, saved=human_size(saved))
+
+@main_bp.route('/api/media/page')
+def media_page():
+    return load_more('media', Media.query, Media.download_time, Media.id, '_media_items.html', 'media_list')
+
+@main_bp.route('/media/status/<int:media_id>')
+def media_status(media_id):
+    m = Media.query.get_or_404(media_id)
+    live = read_progress(current_app.config['HOMEHUB_DATA_DIR']).get(str(m.id)) if m.status == 'pending' else None
+    progress = m.progress
+    if live:
+        progress = f"{int(live['percent'])}%" if live.get('percent') is not None else None
+    return jsonify({
+        'status': m.status,
+        'progress': progress,
+        'filepath': m.filepath,
+        'speed': live.get('speed') if live else None,
+        'eta': live.get('eta') if live else None,
+    })
+
+@main_bp.route('/media/events')
+def media_events():
+    """Server-Sent Events: every change to the progress of all running downloads, as one JSON object.
+
+    With SSE_MAX_STREAMS streams already open the answer is 204 No Content, which
+    tells EventSource not to reconnect; the page then polls /media/status.
+    """
+    if not _streams.acquire(blocking=False):
+        return Response(status=204)
+    data_dir = current_app.config['HOMEHUB_DATA_DIR']
+
+    def stream():
+        yield f'retry: {SSE_RETRY_MS}\n\n'
+        started = last_sent = time.monotonic()
+        last = None
+        while time.monotonic() - started < SSE_MAX_AGE:
+            downloads = read_progress(data_dir)
+            now = time.monotonic()
+            if downloads != last:
+                yield f"data: {json.dumps({'downloads': downloads})}\n\n"
+                last, last_sent = downloads, now
+            elif now - last_sent >= SSE_KEEPALIVE:
+                yield ': keepalive\n\n'
+                last_sent = now
+            time.sleep(SSE_TICK)
+
+    response = Response(stream(), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    response.call_on_close(_streams.release)
+    return response
+
+@main_bp.route('/media/cancel/<int:media_id>', methods=['POST'])
+def cancel_media(media_id):
+    m = Media.query.get_or_404(media_id)
+    user = bleach.clean(request.form.get('user', ''))
+    if _can_manage(m, user) and cancel(m.id):
+        db.session.commit()
+        flash('Download cancelled.', 'info')
+    return redirect(url_for('main.media'))
+
+@main_bp.route('/media/<filename>')
+def serve_media(filename):
+    return send_from_directory(MEDIA_FOLDER, filename)
+
+@main_bp.route('/media/delete/<int:media_id>', methods=['POST'])
+def delete_media(media_id):
+    m = Media.query.get_or_404(media_id)
+    user = bleach.clean(request.form['user'])
+    if _can_manage(m, user):
+        # Stop any queued or running download first (the scheduler removes its partial files)
+        cancel(m.id)
+        # Files shared with another library entry stay on disk
+        release(m)
+        db.session.delete(m)
+        db.session.commit()
+    return redirect(url_for('main.media'))
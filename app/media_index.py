@@ -0,0 +1,125 @@
+"""Media library index: one downloaded file per (source, variant).
+
+canonical_key() reduces a URL to the video it points at (the YouTube or Vimeo
+id, otherwise the URL without tracking parameters or fragment). variant_key()
+names the format/quality choice. When a request matches a file that is still
+on disk, the /media route reuses it instead of queueing a download, and counts
+the reuse in MediaFile.hits. The media page reports the savings.
+
+The scheduler records finished downloads with index_download(). It passes the
+final path that yt-dlp prints, together with the extractor's video id, size
+and SHA-256.
+"""
+import hashlib
+import os
+import re
+from datetime import datetime
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+from sqlalchemy import func
+
+from .models import db, Media, MediaFile
+
+# Query parameters that never change which video a URL points at
+_TRACKING_PARAMS = {'si', 'feature', 'fbclid', 'gclid', 'igshid', 'ref', 'ref_src', 'pp', 't', 'start'}
+_YOUTUBE_ID = re.compile(r'^[A-Za-z0-9_-]{11}$')
+
+
+def canonical_key(url):
+    parts = urlsplit((url or '').strip())
+    host = (parts.hostname or '').lower()
+    if host.startswith('www.') or host.startswith('m.'):
+        host = host.split('.', 1)[1]
+    path = parts.path.rstrip('/')
+    query = [(k, v) for k, v in parse_qsl(parts.query) if k not in _TRACKING_PARAMS and not k.startswith('utm_')]
+
+    video_id = None
+    if host in ('youtube.com', 'music.youtube.com', 'youtube-nocookie.com'):
+        video_id = dict(query).get('v')
+        segments = path.split('/')
+        if not video_id and len(segments) >= 3 and segments[1] in ('shorts', 'embed', 'live', 'v'):
+            video_id = segments[2]
+    elif host == 'youtu.be':
+        video_id = path.lstrip('/')
+    if video_id and _YOUTUBE_ID.match(video_id):
+        return f"youtube:{video_id}"
+    if host == 'vimeo.com' and path.lstrip('/').isdigit():
+        return f"vimeo:{path.lstrip('/')}"
+    return f"url:{host}{path}" + (f"?{urlencode(sorted(query))}" if query else '')
+
+
+def variant_key(fmt, quality):
+    return 'mp3' if fmt == 'mp3' else f"mp4:{quality or 'best'}"
+
+
+def lookup(source_key, variant):
+    """Indexed file for (source_key, variant) that is still on disk, else None (stale rows are dropped)."""
+    entry = MediaFile.query.filter_by(source_key=source_key, variant=variant).first()
+    if entry is None:
+        return None
+    if not os.path.isfile(os.path.join(_media_folder(), entry.filepath)):
+        db.session.delete(entry)
+        return None
+    return entry
+
+
+def file_checksum(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def index_download(url, fmt, quality, filename, video_id=None):
+    """Record a finished download in the index, replacing an older entry for the same variant (caller commits)."""
+    path = os.path.join(_media_folder(), filename)
+    try:
+        size, checksum = os.path.getsize(path), file_checksum(path)
+    except OSError:
+        return None
+    source_key, variant = canonical_key(url), variant_key(fmt, quality)
+    entry = MediaFile.query.filter_by(source_key=source_key, variant=variant).first()
+    if entry is None:
+        entry = MediaFile(source_key=source_key, variant=variant, hits=0)
+        db.session.add(entry)
+    entry.video_id = video_id
+    entry.filepath = filename
+    entry.size = size
+    entry.checksum = checksum
+    entry.created_at = datetime.utcnow()
+    return entry
+
+
+def release(media):
+    """Remove media's files unless another Media row still shares them (caller commits). Returns True if removed."""
+    if not media.filepath:
+        return False
+    shared = db.session.query(Media.id).filter(Media.filepath == media.filepath, Media.id != media.id).first()
+    if shared:
+        return False
+    MediaFile.query.filter_by(filepath=media.filepath).delete(synchronize_session=False)
+    from .downloads import is_output
+    base = media.filepath.rsplit('.', 1)[0]
+    folder = _media_folder()
+    try:
+        for fname in os.listdir(folder):
+            if is_output(fname, base):
+                os.remove(os.path.join(folder, fname))
+    except OSError:
+        pass
+    return True
+
+
+def savings():
+    """(reused requests, bytes of download and storage avoided) across the library."""
+    hits, saved = db.session.query(
+        func.coalesce(func.sum(MediaFile.hits), 0),
+        func.coalesce(func.sum(MediaFile.hits * MediaFile.size), 0),
+    ).one()
+    return int(hits), int(saved)
+
+
+def _media_folder():
+    from .downloads import MEDIA_FOLDER
+    return MEDIA_FOLDER
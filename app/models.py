@@ -1,36 +1,91 @@
 from . import db
 from datetime import datetime
 from werkzeug.security import generate_password_hash, check_password_hash
-from passlib.hash import bcrypt
 
 class Note(db.Model):
+    # Order of the list page, for keyset pagination (app/pagination.py); the other list-page models match
+    __table_args__ = (db.Index('ix_note_timestamp_id', 'timestamp', 'id'),)
     id = db.Column(db.Integer, primary_key=True)
     content = db.Column(db.Text, nullable=False)
     creator = db.Column(db.String(64), nullable=False)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
 
 class File(db.Model):
+    __table_args__ = (db.Index('ix_file_upload_time_id', 'upload_time', 'id'),)
     id = db.Column(db.Integer, primary_key=True)
     filename = db.Column(db.String(256), nullable=False)
     creator = db.Column(db.String(64), nullable=False)
     upload_time = db.Column(db.DateTime, default=datetime.utcnow)
 
 class Media(db.Model):
+    __table_args__ = (db.Index('ix_media_download_time_id', 'download_time', 'id'),)
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(256))
     url = db.Column(db.String(512))
     creator = db.Column(db.String(64))
     download_time = db.Column(db.DateTime, default=datetime.utcnow)
     filepath = db.Column(db.String(512))
-    status = db.Column(db.String(32), default='done')  # pending, done, error
+    status = db.Column(db.String(32), default='done')  # pending, done, error, cancelled
     progress = db.Column(db.Text)  # latest progress line or JSON
 
+class DownloadJob(db.Model):
+    # Queue for the media download scheduler (app/downloads.py); one job per Media row
+    __table_args__ = (
+        # Scheduler picks queued jobs by priority, then age
+        db.Index('ix_download_job_status_priority', 'status', 'priority', 'id'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    media_id = db.Column(db.Integer, db.ForeignKey('media.id'), index=True)
+    url = db.Column(db.String(512), nullable=False)
+    host = db.Column(db.String(255))
+    fmt = db.Column(db.String(16), default='mp4')
+    quality = db.Column(db.String(128), default='best')
+    output_base = db.Column(db.String(128))
+    priority = db.Column(db.Integer, default=0)  # higher runs first
+    status = db.Column(db.String(16), default='queued')  # queued, running, done, error, cancelled
+    attempts = db.Column(db.Integer, default=0)
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+class MediaFile(db.Model):
+    # Media library index (app/media_index.py): one downloaded file per (source, variant)
+    __table_args__ = (
+        db.Index('ix_media_file_source_key_variant', 'source_key', 'variant', unique=True),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    source_key = db.Column(db.String(512), nullable=False)  # canonical_key() of the requested URL
+    variant = db.Column(db.String(255), nullable=False)  # variant_key(): format and quality
+    video_id = db.Column(db.String(255))  # extractor:id as reported by yt-dlp
+    filepath = db.Column(db.String(512), nullable=False, index=True)  # file name in MEDIA_FOLDER
+    size = db.Column(db.Integer)
+    checksum = db.Column(db.String(64))  # SHA-256
+    hits = db.Column(db.Integer, default=0)  # requests served from this file instead of downloading
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
 class PDF(db.Model):
+    __table_args__ = (
+        # Reuse lookup for identical uploads (app/pdf_jobs.py: find_compressed)
+        db.Index('ix_pdf_sha256_preset', 'sha256', 'preset'),
+        db.Index('ix_pdf_upload_time_id', 'upload_time', 'id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
-    filename = db.Column(db.String(256))
+    filename = db.Column(db.String(256))  # name as uploaded
+    stored_path = db.Column(db.String(512))  # original on disk, named by content hash; NULL for old rows (= filename)
+    sha256 = db.Column(db.String(64))  # of the uploaded file
     creator = db.Column(db.String(64))
     upload_time = db.Column(db.DateTime, default=datetime.utcnow)
     compressed_path = db.Column(db.String(512))
+    # Compression job (app/pdf_jobs.py)
+    preset = db.Column(db.String(16), default='ebook')  # screen, ebook, printer, lossless
+    status = db.Column(db.String(16), default='done')  # queued, running, done, error
+    original_size = db.Column(db.Integer)
+    compressed_size = db.Column(db.Integer)
+    elapsed = db.Column(db.Float)  # seconds spent compressing
+    error = db.Column(db.Text)
+    finished_at = db.Column(db.DateTime)
+    owner = db.Column(db.String(32))  # pdf_jobs.BOOT_TOKEN of the web process that queued or runs the job
 
 class ShoppingItem(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -43,14 +98,22 @@ class GroceryHistory(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     item = db.Column(db.String(256), nullable=False)
     creator = db.Column(db.String(64))
-    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+class GroceryFrequency(db.Model):
+    # Decayed purchase count per normalized item, maintained by app/grocery.py
+    key = db.Column(db.String(256), primary_key=True)
+    item = db.Column(db.String(256), nullable=False)  # most recent spelling, shown in suggestions
+    score = db.Column(db.Float, nullable=False, default=0.0, index=True)
+    last_seen = db.Column(db.DateTime)
 
 class HomeStatus(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(64), nullable=False)
+    name = db.Column(db.String(64), nullable=False, index=True)
     status = db.Column(db.String(16), default='Away')
 
 class Chore(db.Model):
+    __table_args__ = (db.Index('ix_chore_timestamp_id', 'timestamp', 'id'),)
     id = db.Column(db.Integer, primary_key=True)
     description = db.Column(db.Text, nullable=False)
     creator = db.Column(db.String(64))
@@ -58,6 +121,7 @@ class Chore(db.Model):
     done = db.Column(db.Boolean, default=False)
 
 class Recipe(db.Model):
+    __table_args__ = (db.Index('ix_recipe_timestamp_id', 'timestamp', 'id'),)
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(256), nullable=False)
     link = db.Column(db.String(512))
@@ -66,7 +130,16 @@ class Recipe(db.Model):
     creator = db.Column(db.String(64))
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
 
+class RecipeIngredient(db.Model):
+    # Inverted ingredient index (word -> recipes and favorite meals), maintained by app/ingredients.py
+    __table_args__ = (db.Index('ix_recipe_ingredient_ref', 'kind', 'ref_id'), {'sqlite_with_rowid': False})
+    ingredient = db.Column(db.String(64), primary_key=True)
+    kind = db.Column(db.String(8), primary_key=True)  # 'recipe' or 'meal'
+    ref_id = db.Column(db.Integer, primary_key=True)
+    total = db.Column(db.Integer, nullable=False)  # distinct ingredient words of that recipe, for coverage
+
 class ExpiryItem(db.Model):
+    __table_args__ = (db.Index('ix_expiry_item_expiry_date_id', 'expiry_date', 'id'),)
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(256), nullable=False)
     expiry_date = db.Column(db.Date)
@@ -74,6 +147,7 @@ class ExpiryItem(db.Model):
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
 
 class ShortURL(db.Model):
+    __table_args__ = (db.Index('ix_short_url_timestamp_id', 'timestamp', 'id'),)
     id = db.Column(db.Integer, primary_key=True)
     original_url = db.Column(db.String(512), nullable=False)
     short_code = db.Column(db.String(16), unique=True, nullable=False)
@@ -81,6 +155,7 @@ class ShortURL(db.Model):
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
 
 class QRCode(db.Model):
+    __table_args__ = (db.Index('ix_qr_code_timestamp_id', 'timestamp', 'id'),)
     id = db.Column(db.Integer, primary_key=True)
     text = db.Column(db.Text, nullable=False)
     filename = db.Column(db.String(256), nullable=False)
@@ -95,7 +170,7 @@ class Notice(db.Model):
 
 class Reminder(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    date = db.Column(db.Date, nullable=False)
+    date = db.Column(db.Date, nullable=False, index=True)
     time = db.Column(db.String(5))  # HH:MM (optional)
     title = db.Column(db.String(256), nullable=False)
     description = db.Column(db.Text)
@@ -109,7 +184,7 @@ class Reminder(db.Model):
 
 class MemberStatus(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(64), nullable=False)
+    name = db.Column(db.String(64), nullable=False, index=True)
     text = db.Column(db.Text, default='')
     updated_at = db.Column(db.DateTime, default=datetime.utcnow)
 
@@ -128,8 +203,12 @@ class RecurringExpense(db.Model):
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
 
 class ExpenseEntry(db.Model):
+    __table_args__ = (
+        # One entry per rule and day; app/recurring.py relies on it for INSERT OR IGNORE
+        db.Index('ix_expense_entry_recurring_id_date', 'recurring_id', 'date', unique=True),
+    )
     id = db.Column(db.Integer, primary_key=True)
-    date = db.Column(db.Date, nullable=False)
+    date = db.Column(db.Date, nullable=False, index=True)
     title = db.Column(db.String(256), nullable=False)
     category = db.Column(db.String(64))
     unit_price = db.Column(db.Float)
@@ -162,6 +241,7 @@ class User(db.Model):
         # HomeHub authentication (Werkzeug)
         self.password_hash = generate_password_hash(password)
         # CalDAV authentication (htpasswd-compatible bcrypt with 2y identifier)
+        from passlib.hash import bcrypt
         self.caldav_password_hash = bcrypt.using(ident='2y').hash(password)
         self.password_set = True
 
@@ -173,12 +253,47 @@ class User(db.Model):
         return f'<User {self.username}>'
 
 class Photo(db.Model):
+    __table_args__ = (
+        # Gallery timeline pages (app/photo_timeline.py), all photos and per album
+        db.Index('ix_photo_sort_time_id', 'sort_time', 'id'),
+        db.Index('ix_photo_album_sort_time', 'album', 'sort_time', 'id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
-    filename = db.Column(db.String(256), nullable=False)
-    album = db.Column(db.String(128), default='General')
+    filename = db.Column(db.String(256), nullable=False, index=True)
+    album = db.Column(db.String(128), default='General')  # filtered through ix_photo_album_sort_time
     caption = db.Column(db.String(512))
     uploader = db.Column(db.String(64))
-    upload_time = db.Column(db.DateTime, default=datetime.utcnow)
+    upload_time = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    thumb_status = db.Column(db.String(16), default='pending')  # pending, done, error (app/thumbnails.py)
+    # From EXIF at upload (app/photo_timeline.py)
+    taken_at = db.Column(db.DateTime)
+    camera = db.Column(db.String(128))
+    width = db.Column(db.Integer)
+    height = db.Column(db.Integer)
+    has_gps = db.Column(db.Boolean, default=False)
+    sort_time = db.Column(db.DateTime)  # taken_at, else upload_time
+    phash = db.Column(db.String(16))  # hex dHash for near-duplicate detection (app/photo_dedupe.py)
+    crc32 = db.Column(db.Integer)  # of the original, stored by the first album export (app/zip_stream.py)
+
+class PhotoBucket(db.Model):
+    # Photo count per album and year-month of Photo.sort_time; album '' for photos without one
+    album = db.Column(db.String(128), primary_key=True)
+    ym = db.Column(db.String(7), primary_key=True)  # 'YYYY-MM'
+    count = db.Column(db.Integer, default=0, nullable=False)
+
+class PhotoVariant(db.Model):
+    # Resized copies of a photo in photos/thumbs/, one per (box, format)
+    __table_args__ = (
+        db.Index('ix_photo_variant_photo_id_box_fmt', 'photo_id', 'box', 'fmt', unique=True),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    photo_id = db.Column(db.Integer, db.ForeignKey('photo.id'), nullable=False)
+    box = db.Column(db.Integer, nullable=False)  # longest side requested (thumbnails.SIZES)
+    fmt = db.Column(db.String(8), nullable=False)  # webp, jpeg
+    filename = db.Column(db.String(300), nullable=False)
+    width = db.Column(db.Integer)
+    height = db.Column(db.Integer)
+    bytes = db.Column(db.Integer)
 
 class MealPlan(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -217,7 +332,7 @@ class Pet(db.Model):
 
 class PetCareEvent(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    pet_id = db.Column(db.Integer, db.ForeignKey('pet.id'), nullable=False)
+    pet_id = db.Column(db.Integer, db.ForeignKey('pet.id'), nullable=False, index=True)
     event_type = db.Column(db.String(64), nullable=False)  # Vet Visit, Vaccination, etc.
     description = db.Column(db.Text)
     event_date = db.Column(db.Date, nullable=False)
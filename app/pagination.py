@@ -0,0 +1,105 @@
+"""Keyset pagination for the list pages (notes, files, media, PDFs, QR codes, ...).
+
+A list page renders its first page of rows and a "Load more" button that
+fetches the next page from /api/<page>/page?cursor=... as JSON:
+{"html": <rendered rows>, "next": <cursor or null>}. The rows are rendered by
+the same partial template as the first page.
+
+A cursor is "<sort value>|<id>" of the last row shown. The next page is the
+rows after it in (sort value, id) order, which SQLite answers with a seek on
+the page's (sort column, id) index. Unlike OFFSET, that cost does not grow with
+the table or with how far the user has scrolled. Rows whose sort value is
+NULL sort as SQLite does, after the others when descending and before them
+when ascending. They are paged by id alone (cursor "|<id>"), a seek on the
+same index, because a row-value comparison never matches NULL. Page sizes:
+
+    list_pages:
+      page_size: 50       # rows per page
+      notes: 100          # override for one page
+"""
+from datetime import date, datetime
+
+from flask import current_app, jsonify, render_template, request
+from sqlalchemy import tuple_
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def page_size(config, name):
+    """Rows per page for list page `name` from config.yml's `list_pages:` section."""
+    section = (config or {}).get('list_pages') or {}
+    if not isinstance(section, dict):
+        return DEFAULT_PAGE_SIZE
+    for key in (name, 'page_size'):
+        try:
+            return max(1, min(int(section[key]), MAX_PAGE_SIZE))
+        except (KeyError, TypeError, ValueError):
+            continue
+    return DEFAULT_PAGE_SIZE
+
+
+def encode_cursor(value, row_id):
+    return f"{'' if value is None else value.isoformat()}|{row_id}"
+
+
+def decode_cursor(cursor, column):
+    """(sort value or None, id) from a cursor for `column`, or None if it is malformed."""
+    try:
+        value, row_id = cursor.rsplit('|', 1)
+        if not value:
+            return None, int(row_id)
+        parse = date.fromisoformat if column.type.python_type is date else datetime.fromisoformat
+        return parse(value), int(row_id)
+    except (AttributeError, ValueError):
+        return None
+
+
+def _segment(query, column, id_column, nulls, after, limit, descending):
+    """Up to limit rows of query whose sort value is NULL (if nulls) or not NULL, after `after`."""
+    if nulls:
+        query = query.filter(column.is_(None))
+        if after:
+            query = query.filter(id_column < after[1] if descending else id_column > after[1])
+        order = (id_column.desc(),) if descending else (id_column.asc(),)
+    else:
+        query = query.filter(column.isnot(None))
+        if after:
+            # Row-value comparison, so SQLite seeks into the (column, id) index
+            key = tuple_(column, id_column)
+            query = query.filter(key < after if descending else key > after)
+        order = (column.desc(), id_column.desc()) if descending else (column.asc(), id_column.asc())
+    return query.order_by(*order).limit(limit).all()
+
+
+def keyset_page(query, column, id_column, cursor=None, limit=DEFAULT_PAGE_SIZE, descending=True):
+    """(rows, next cursor or None): up to limit rows of query after cursor, ordered by (column, id_column)."""
+    after = decode_cursor(cursor, column) if cursor else None
+    segments = (False, True) if descending else (True, False)  # NULL sort values last / first
+    if after:
+        segments = segments[segments.index(after[0] is None):]
+    rows = []
+    for nulls in segments:
+        seek = after if after and (after[0] is None) == nulls else None
+        rows += _segment(query, column, id_column, nulls, seek, limit + 1 - len(rows), descending)
+        if len(rows) > limit:
+            break
+    more = len(rows) > limit
+    rows = rows[:limit]
+    if not more:
+        return rows, None
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, column.key), getattr(last, id_column.key))
+
+
+def list_page(name, query, column, id_column, cursor=None, descending=True):
+    """keyset_page() sized for list page `name`."""
+    limit = page_size(current_app.config['HOMEHUB_CONFIG'], name)
+    return keyset_page(query, column, id_column, cursor, limit, descending)
+
+
+def load_more(name, query, column, id_column, template, var, descending=True, **context):
+    """JSON response for a list page's "Load more": the next rows rendered by `template` as `var`."""
+    rows, next_cursor = list_page(name, query, column, id_column, request.args.get('cursor'), descending)
+    html = render_template(template, config=current_app.config['HOMEHUB_CONFIG'], **{var: rows}, **context)
+    return jsonify({'html': html, 'next': next_cursor})
@@ -0,0 +1,270 @@
+"""Background PDF compression.
+
+The /pdfs route saves each upload, records a PDF row with status 'queued' and
+hands its id to submit(). A bounded pool compresses up to `max_workers` PDFs
+at once. Each job runs Ghostscript as a child process, so the pool threads only
+supervise it and several uploads compress in parallel:
+
+    pdf_compression:
+      max_workers: 2      # Ghostscript processes at once
+      timeout: 600        # seconds before a run is abandoned
+
+Each job records PDF.status, the original and compressed sizes and the elapsed
+time, and PDF.owner the BOOT_TOKEN of the web process whose pool holds the
+job. The token is a random id drawn at import, so unlike a pid it is never
+reused by a later process. On its first /pdfs request each process
+resubmits, via resume(), the queued or running jobs that carry another
+token. That assumes a single web process: start.sh runs gunicorn with -w 1,
+and a second worker would take over the first one's running jobs.
+
+Uploads are hashed while they are written (save_upload). The original is
+stored under its SHA-256, so two different files with the same name no longer
+overwrite each other. A job whose (hash, preset) already has a compressed file
+reuses that file instead of running Ghostscript again, unless that run failed
+and only kept the original (PDF.error set). release() removes files
+only once no PDF row refers to them.
+"""
+import hashlib
+import logging
+import os
+import shutil
+import subprocess
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from sqlalchemy import or_
+
+from .config import get_config
+from .models import db, PDF
+
+logger = logging.getLogger('homehub.pdf_jobs')
+
+PDF_FOLDER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'pdfs')
+
+DEFAULT_LIMITS = {'max_workers': 2, 'timeout': 600}
+DEFAULT_PRESET = 'ebook'
+# Preset -> Ghostscript options. 'lossless' rewrites the file without downsampling or re-encoding images.
+PRESETS = {
+    'screen': ['-dPDFSETTINGS=/screen'],
+    'ebook': ['-dPDFSETTINGS=/ebook'],
+    'printer': ['-dPDFSETTINGS=/printer'],
+    'lossless': [
+        '-dPDFSETTINGS=/default',
+        '-dPassThroughJPEGImages=true', '-dPassThroughJPXImages=true',
+        '-dDownsampleColorImages=false', '-dDownsampleGrayImages=false', '-dDownsampleMonoImages=false',
+        '-dAutoFilterColorImages=false', '-dAutoFilterGrayImages=false',
+        '-dColorImageFilter=/FlateEncode', '-dGrayImageFilter=/FlateEncode',
+    ],
+}
+PRESET_LABELS = {'screen': 'Smallest (screen)', 'ebook': 'Balanced (ebook)', 'printer': 'High quality (printer)',
+                 'lossless': 'Lossless'}
+ACTIVE = ('queued', 'running')
+
+_lock = threading.Lock()
+_executor = None
+_resumed = False
+BOOT_TOKEN = uuid.uuid4().hex  # PDF.owner of the jobs this process queued or runs
+_content_locks = {}  # (sha256, preset) -> [lock, users]; serializes identical uploads so the second reuses the first
+
+
+def compression_limits(config):
+    """DEFAULT_LIMITS overlaid with config.yml's `pdf_compression:` section (invalid values ignored)."""
+    limits = dict(DEFAULT_LIMITS)
+    overrides = (config or {}).get('pdf_compression') or {}
+    if isinstance(overrides, dict):
+        for key in DEFAULT_LIMITS:
+            try:
+                limits[key] = max(1, int(overrides[key]))
+            except (KeyError, TypeError, ValueError):
+                pass
+    return limits
+
+
+def normalize_preset(mode):
+    # 'fast' was the only value the old form ever sent; it always meant /ebook
+    return mode if mode in PRESETS else DEFAULT_PRESET
+
+
+def gs_command(preset, input_path, output_path):
+    return ['gs', '-sDEVICE=pdfwrite', '-dCompatibilityLevel=1.4', *PRESETS[normalize_preset(preset)],
+            '-dNOPAUSE', '-dQUIET', '-dBATCH', f'-sOutputFile={output_path}', input_path]
+
+
+def save_upload(file_storage, chunk_size=1 << 20):
+    """Stream an upload to PDF_FOLDER while hashing it. Returns (stored name, sha256, size)."""
+    digest = hashlib.sha256()
+    size = 0
+    tmp = os.path.join(PDF_FOLDER, f".upload-{uuid.uuid4().hex}.part")
+    try:
+        with open(tmp, 'wb') as out:
+            for chunk in iter(lambda: file_storage.stream.read(chunk_size), b''):
+                digest.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+        sha = digest.hexdigest()
+        stored = f"{sha}.pdf"
+        # Same name means same content: keep the copy already there
+        os.replace(tmp, os.path.join(PDF_FOLDER, stored))
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return stored, sha, size
+
+
+def compressed_name(sha, preset, filename):
+    return f"{sha[:16]}_{normalize_preset(preset)}_{filename}"
+
+
+def find_compressed(sha, preset, exclude_id=None):
+    """Newest successfully compressed PDF with this content and preset whose file still exists, else None."""
+    # A failed run is 'done' too, with error set and a copy of the original as its output: compress again instead
+    q = PDF.query.filter(PDF.sha256 == sha, PDF.preset == normalize_preset(preset), PDF.status == 'done',
+                         PDF.error.is_(None))
+    if exclude_id is not None:
+        q = q.filter(PDF.id != exclude_id)
+    for p in q.order_by(PDF.id.desc()).limit(5):
+        if p.compressed_path and os.path.isfile(os.path.join(PDF_FOLDER, p.compressed_path)):
+            return p
+    return None
+
+
+def _remove_unused(name, pdf_id):
+    """Delete file `name` from PDF_FOLDER unless a PDF row other than pdf_id refers to it."""
+    shared = db.session.query(PDF.id).filter(
+        PDF.id != pdf_id, or_(PDF.compressed_path == name, PDF.stored_path == name)
+    ).first()
+    if shared is None:
+        try:
+            os.remove(os.path.join(PDF_FOLDER, name))
+        except OSError:
+            pass
+
+
+def release(pdf):
+    """Delete pdf's original and compressed files unless another row still uses them (caller deletes the row)."""
+    for name in (pdf.compressed_path, pdf.stored_path):
+        if name:
+            _remove_unused(name, pdf.id)
+
+
+def _pool():
+    global _executor
+    with _lock:
+        if _executor is None:
+            workers = compression_limits(get_config())['max_workers']
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='pdf-compress')
+        return _executor
+
+
+def submit(app, pdf_id):
+    """Compress PDF row pdf_id in the background (the row must be committed with status 'queued')."""
+    _pool().submit(_run, app, pdf_id)
+
+
+def resume(app):
+    """Once per process: resubmit queued or running jobs left by an earlier web process."""
+    global _resumed
+    with _lock:
+        if _resumed:
+            return
+        _resumed = True
+    stale = []
+    # Jobs with our token were queued by this process already (an upload can land before this query)
+    for pdf_id, owner in db.session.query(PDF.id, PDF.owner).filter(
+            PDF.status.in_(ACTIVE), or_(PDF.owner.is_(None), PDF.owner != BOOT_TOKEN)).all():
+        # Conditional on the old owner, so the row is taken over at most once
+        previous = PDF.owner.is_(None) if owner is None else PDF.owner == owner
+        taken = PDF.query.filter(PDF.id == pdf_id, PDF.status.in_(ACTIVE), previous).update(
+            {PDF.status: 'queued', PDF.owner: BOOT_TOKEN}, synchronize_session=False)
+        if taken:
+            stale.append(pdf_id)
+    db.session.commit()
+    for pdf_id in stale:
+        submit(app, pdf_id)
+
+
+def _run(app, pdf_id):
+    with app.app_context():
+        try:
+            _compress(pdf_id)
+        except Exception as e:
+            logger.error(f"PDF compression {pdf_id} failed: {e}", exc_info=True)
+            db.session.rollback()
+            PDF.query.filter_by(id=pdf_id).update({PDF.status: 'error', PDF.error: str(e)}, synchronize_session=False)
+            db.session.commit()
+        finally:
+            db.session.remove()
+
+
+def _compress(pdf_id):
+    # Claim atomically so a job resubmitted by resume() never runs twice
+    claimed = PDF.query.filter_by(id=pdf_id, status='queued').update(
+        {PDF.status: 'running', PDF.owner: BOOT_TOKEN}, synchronize_session=False)
+    db.session.commit()
+    if claimed != 1:
+        return
+    p = db.session.get(PDF, pdf_id)
+    if not p.sha256:
+        _run_ghostscript(p)
+        return
+    key = (p.sha256, p.preset)
+    with _lock:
+        entry = _content_locks.setdefault(key, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            # Identical upload already compressed with this preset (e.g. a duplicate in the same batch)
+            prior = find_compressed(p.sha256, p.preset, exclude_id=p.id)
+            if prior is not None:
+                reuse_compressed(p, prior)
+                db.session.commit()
+            else:
+                _run_ghostscript(p)
+    finally:
+        with _lock:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del _content_locks[key]
+
+
+def _run_ghostscript(p):
+    pdf_id = p.id
+    input_path = os.path.join(PDF_FOLDER, p.stored_path or p.filename)
+    output_path = os.path.join(PDF_FOLDER, p.compressed_path)
+    timeout = compression_limits(get_config())['timeout']
+    started = time.monotonic()
+    error = None
+    try:
+        subprocess.run(gs_command(p.preset, input_path, output_path), check=True, timeout=timeout,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    except (OSError, subprocess.SubprocessError) as e:
+        error = f"Ghostscript failed ({e.__class__.__name__}); kept the original"
+    if db.session.get(PDF, pdf_id, populate_existing=True) is None:
+        # Deleted while compressing
+        _remove_unused(os.path.basename(output_path), pdf_id)
+        return
+    original_size = os.path.getsize(input_path)
+    # Ghostscript can grow already-optimized files; serve the original then
+    if error or not os.path.exists(output_path) or os.path.getsize(output_path) >= original_size:
+        shutil.copy(input_path, output_path)
+    p.status = 'done'
+    p.error = error
+    p.original_size = original_size
+    p.compressed_size = os.path.getsize(output_path)
+    p.elapsed = round(time.monotonic() - started, 2)
+    p.finished_at = datetime.utcnow()
+    db.session.commit()
+
+
+def reuse_compressed(p, prior):
+    """Point p at prior's compressed file (caller commits)."""
+    p.compressed_path = prior.compressed_path
+    p.original_size = prior.original_size
+    p.compressed_size = prior.compressed_size
+    p.elapsed = 0.0
+    p.error = None
+    p.status = 'done'
+    p.finished_at = datetime.utcnow()
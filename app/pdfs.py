@@ -0,0 +1,83 @@
+"""PDF compressor (Ghostscript). Compression runs in the background, see app/pdf_jobs.py."""
+from flask import render_template, request, redirect, url_for, send_from_directory, current_app, jsonify, flash
+from werkzeug.utils import secure_filename
+
+from .models import db, PDF
+from .pagination import list_page, load_more
+from .pdf_jobs import (BOOT_TOKEN, PDF_FOLDER, PRESET_LABELS, compressed_name, find_compressed, normalize_preset, release,
+                       resume, reuse_compressed, save_upload, submit)
+from .routes import main_bp, bleach
+
+
+def _pdf_json(p):
+    return {
+        'status': p.status,
+        'compressed_path': p.compressed_path,
+        'original_size': p.original_size,
+        'compressed_size': p.compressed_size,
+        'elapsed': p.elapsed,
+        'error': p.error,
+    }
+
+@main_bp.route('/pdfs', methods=['GET', 'POST'])
+def pdfs():
+    app = current_app._get_current_object()
+    resume(app)
+    if request.method == 'POST':
+        creator = bleach.clean(request.form['creator'])
+        preset = normalize_preset(bleach.clean(request.form.get('mode', '')))
+        queued = []
+        reused = 0
+        for pdf_file in request.files.getlist('pdf'):
+            filename = secure_filename(pdf_file.filename or '')
+            if not filename:
+                continue
+            stored, sha, size = save_upload(pdf_file)
+            pdf_obj = PDF(filename=filename, creator=creator, stored_path=stored, sha256=sha, original_size=size,
+                          compressed_path=compressed_name(sha, preset, filename), preset=preset, status='queued',
+                          owner=BOOT_TOKEN)
+            # Same file compressed with the same preset before: reuse that output
+            prior = find_compressed(sha, preset)
+            if prior is not None:
+                reuse_compressed(pdf_obj, prior)
+                reused += 1
+            else:
+                queued.append(pdf_obj)
+            db.session.add(pdf_obj)
+        db.session.commit()
+        # Several uploads compress in parallel, up to pdf_compression.max_workers
+        for pdf_obj in queued:
+            submit(app, pdf_obj.id)
+        if queued:
+            flash(f"Compressing {len(queued)} PDF{'s' if len(queued) != 1 else ''}; this page updates when done.", 'info')
+        if reused:
+            flash(f"{reused} PDF{'s were' if reused != 1 else ' was'} already compressed; reused the earlier result.", 'info')
+        return redirect(url_for('main.pdfs'))
+    pdfs, next_cursor = list_page('pdfs', PDF.query, PDF.upload_time, PDF.id)
+    config = current_app.config['HOMEHUB_CONFIG']
+    return render_template('pdfs.html', pdfs=pdfs, next_cursor=next_cursor, config=config, presets=PRESET_LABELS)
+
+@main_bp.route('/api/pdfs/page')
+def pdfs_page():
+    return load_more('pdfs', PDF.query, PDF.upload_time, PDF.id, '_pdf_items.html', 'pdfs')
+
+@main_bp.route('/pdfs/status/<int:pdf_id>')
+def pdf_status(pdf_id):
+    return jsonify(_pdf_json(PDF.query.get_or_404(pdf_id)))
+
+@main_bp.route('/pdfs/<filename>')
+def serve_pdf(filename):
+    return send_from_directory(PDF_FOLDER, filename)
+
+@main_bp.route('/pdfs/delete/<int:pdf_id>', methods=['POST'])
+def delete_pdf(pdf_id):
+    p = PDF.query.get_or_404(pdf_id)
+    user = bleach.clean(request.form['user'])
+    admin_name = current_app.config['HOMEHUB_CONFIG'].get('admin_name', 'Administrator')
+    admin_aliases = {admin_name, 'Administrator', 'admin'}
+    if user in admin_aliases or user == p.creator:
+        # Files shared with identical uploads stay on disk
+        release(p)
+        db.session.delete(p)
+        db.session.commit()
+    return redirect(url_for('main.pdfs'))
@@ -0,0 +1,184 @@
+"""Near-duplicate photo detection.
+
+Every photo gets a 64-bit difference hash (dHash) in Photo.phash. The image is
+reduced to 9x8 grey pixels, and each bit records whether a pixel is brighter
+than its right-hand neighbour. Re-encoded, resized or lightly edited copies of
+a shot (the same picture sent from another phone) differ in only a few bits.
+Two photos are possible duplicates when the Hamming distance between their
+hashes is at most `threshold`:
+
+    photo_duplicates:
+      threshold: 6            # differing bits (of 64) still counted as a duplicate
+      reject_on_upload: false # skip uploads that duplicate a photo already in the library
+
+The thumbnail pool hashes each upload from its smallest rendered variant
+(app/thumbnails.py). With reject_on_upload the upload route hashes the
+original itself, before the photo is stored. Photos uploaded before hashes
+existed are backfilled by thumbnails.rescan_hashes().
+
+Lookups go through HashIndex, a multi-index hash table of all hashes. It is
+kept in memory, updated by this process as hashes are recorded, and rebuilt
+after INDEX_TTL seconds so that hashes written by other processes show up.
+"""
+import threading
+import time
+from functools import lru_cache
+from itertools import combinations
+
+from .models import db, Photo
+
+INDEX_TTL = 60.0  # seconds
+DEFAULT_SETTINGS = {'threshold': 6, 'reject_on_upload': False}
+MAX_THRESHOLD = 12  # wider searches probe most of the index, and match unrelated photos anyway
+
+
+def duplicate_settings(config):
+    """DEFAULT_SETTINGS overlaid with config.yml's `photo_duplicates:` section (invalid values ignored)."""
+    settings = dict(DEFAULT_SETTINGS)
+    overrides = (config or {}).get('photo_duplicates') or {}
+    if isinstance(overrides, dict):
+        try:
+            settings['threshold'] = min(max(0, int(overrides['threshold'])), MAX_THRESHOLD)
+        except (KeyError, TypeError, ValueError):
+            pass
+        if isinstance(overrides.get('reject_on_upload'), bool):
+            settings['reject_on_upload'] = overrides['reject_on_upload']
+    return settings
+
+
+def dhash(img):
+    """64-bit difference hash of a PIL image, as an int."""
+    from PIL import Image
+
+    small = img.convert('L').resize((9, 8), Image.LANCZOS).tobytes()
+    bits = 0
+    for row in range(0, 72, 9):
+        for col in range(row, row + 8):
+            bits = (bits << 1) | (small[col] > small[col + 1])
+    return bits
+
+
+def hash_file(path):
+    """Hex dHash of the image at path, upright. JPEGs are decoded at the smallest DCT scale."""
+    from PIL import Image, ImageOps
+
+    with Image.open(path) as img:
+        if img.format == 'JPEG':
+            img.draft('L', (64, 64))
+        return format_hash(dhash(ImageOps.exif_transpose(img)))
+
+
+def format_hash(value):
+    return f"{value:016x}"
+
+
+def hamming(a, b):
+    return (a ^ b).bit_count()
+
+
+BANDS = 4
+BAND_BITS = 16
+_BAND_MASK = (1 << BAND_BITS) - 1
+
+
+@lru_cache(maxsize=None)
+def _flips(radius):
+    """Every BAND_BITS-bit mask with at most radius bits set."""
+    return tuple(sum(1 << b for b in bits) for r in range(radius + 1)
+                 for bits in combinations(range(BAND_BITS), r))
+
+
+class HashIndex:
+    """Multi-index hash table over 64-bit hashes.
+
+    The hash is split into BANDS bands, and each band has its own table. If two
+    hashes are within radius, some band differs in at most radius // BANDS bits
+    (pigeonhole), so search() only probes those neighbours of each band and
+    checks the full distance of what it finds.
+    """
+
+    def __init__(self):
+        self._tables = [{} for _ in range(BANDS)]
+
+    @staticmethod
+    def _bands(value):
+        return [(value >> (i * BAND_BITS)) & _BAND_MASK for i in range(BANDS)]
+
+    def add(self, value, item):
+        for table, band in zip(self._tables, self._bands(value)):
+            table.setdefault(band, []).append((value, item))
+
+    def search(self, value, radius):
+        """[(distance, item)] for every item whose hash is within radius of value."""
+        found = {}
+        flips = _flips(radius // BANDS)
+        for table, band in zip(self._tables, self._bands(value)):
+            for flip in flips:
+                for other, item in table.get(band ^ flip, ()):
+                    if item not in found:
+                        d = hamming(value, other)
+                        if d <= radius:
+                            found[item] = d
+        return [(d, item) for item, d in found.items()]
+
+
+_lock = threading.Lock()
+_hashes = None
+_built_at = 0.0
+
+
+def _index():
+    global _hashes, _built_at
+    with _lock:
+        if _hashes is None or time.monotonic() - _built_at > INDEX_TTL:
+            index = HashIndex()
+            for photo_id, phash in db.session.query(Photo.id, Photo.phash).filter(Photo.phash.isnot(None)):
+                index.add(int(phash, 16), photo_id)
+            _hashes, _built_at = index, time.monotonic()
+        return _hashes
+
+
+def remember(photo_id, phash):
+    """Add a just-committed hash to this process's index."""
+    with _lock:
+        if _hashes is not None and phash:
+            _hashes.add(int(phash, 16), photo_id)
+
+
+def find_similar(phash, threshold, exclude_id=None):
+    """[(distance, Photo)] within threshold of phash, closest first; deleted or rehashed photos are dropped."""
+    value = int(phash, 16)
+    candidates = {pid for _, pid in _index().search(value, threshold) if pid != exclude_id}
+    if not candidates:
+        return []
+    matches = []
+    for photo in Photo.query.filter(Photo.id.in_(candidates), Photo.phash.isnot(None)):
+        d = hamming(value, int(photo.phash, 16))
+        if d <= threshold:
+            matches.append((d, photo))
+    return sorted(matches, key=lambda m: (m[0], m[1].id))
+
+
+def duplicate_groups(threshold):
+    """Groups (lists of photo ids, two or more) linked by hashes within threshold of each other."""
+    index = HashIndex()
+    rows = db.session.query(Photo.id, Photo.phash).filter(Photo.phash.isnot(None)).order_by(Photo.id).all()
+    parent = {}
+
+    def root(pid):
+        while parent[pid] != pid:
+            parent[pid] = parent[parent[pid]]
+            pid = parent[pid]
+        return pid
+
+    # Each photo is compared only with those before it, so every pair is checked once
+    for photo_id, phash in rows:
+        value = int(phash, 16)
+        parent[photo_id] = photo_id
+        for _, other in index.search(value, threshold):
+            parent[root(other)] = root(photo_id)
+        index.add(value, photo_id)
+    groups = {}
+    for photo_id in parent:
+        groups.setdefault(root(photo_id), []).append(photo_id)
+    return sorted((g for g in groups.values() if len(g) > 1), key=lambda g: g[0])
@@ -0,0 +1,139 @@
+"""Photo metadata and the month-bucketed gallery timeline.
+
+read_metadata() takes the taken-at time, camera, oriented dimensions and GPS
+presence from a photo's EXIF header; the pixels are never decoded. The upload
+route stores these on Photo. Photo.sort_time is the taken-at time, or the
+upload time when EXIF has none; the gallery orders by it.
+
+photo_bucket keeps a photo count per (album, year-month of sort_time).
+Writers call bump_bucket() inside their transaction. The gallery reads its
+album list and month headers from there, and pages photos with a (sort_time,
+id) keyset cursor (app/pagination.py) over ix_photo_album_sort_time. Neither
+depends on how many photos the library holds.
+"""
+from datetime import datetime
+
+from sqlalchemy import func, text
+
+from .models import db, Photo, PhotoBucket
+from .pagination import keyset_page
+
+PAGE_SIZE = 60
+
+_EXIF_IFD = 0x8769
+_GPS_IFD = 0x8825
+_DATETIME_ORIGINAL = 0x9003
+_DATETIME_DIGITIZED = 0x9004
+_DATETIME = 0x0132
+_MAKE = 0x010F
+_MODEL = 0x0110
+_ORIENTATION = 0x0112
+
+
+def _parse_exif_time(value):
+    try:
+        return datetime.strptime(str(value).strip('\x00 ')[:19], '%Y:%m:%d %H:%M:%S')
+    except ValueError:
+        return None
+
+
+def read_metadata(path):
+    """{'taken_at', 'camera', 'width', 'height', 'has_gps'} from the file header; None values when unknown."""
+    from PIL import Image
+
+    meta = {'taken_at': None, 'camera': None, 'width': None, 'height': None, 'has_gps': False}
+    try:
+        with Image.open(path) as img:
+            width, height = img.size
+            exif = img.getexif()
+    except Exception:
+        return meta
+    if exif.get(_ORIENTATION) in (5, 6, 7, 8):
+        width, height = height, width  # stored sideways, displayed upright
+    meta['width'], meta['height'] = width, height
+    detail = exif.get_ifd(_EXIF_IFD)
+    for tag, source in ((_DATETIME_ORIGINAL, detail), (_DATETIME_DIGITIZED, detail), (_DATETIME, exif)):
+        if source.get(tag):
+            meta['taken_at'] = _parse_exif_time(source[tag])
+            if meta['taken_at']:
+                break
+    make, model = (str(exif.get(t) or '').strip('\x00 ') for t in (_MAKE, _MODEL))
+    camera = model if make and model.lower().startswith(make.lower()) else ' '.join(p for p in (make, model) if p)
+    meta['camera'] = camera[:128] or None
+    meta['has_gps'] = bool(exif.get_ifd(_GPS_IFD))
+    return meta
+
+
+def month_key(when):
+    return when.strftime('%Y-%m')
+
+
+_BUMP = text(
+    "INSERT INTO photo_bucket (album, ym, count) VALUES (:a, :ym, :d) "
+    "ON CONFLICT(album, ym) DO UPDATE SET count = count + excluded.count"
+)
+
+
+def bump_bucket(conn, album, when, delta):
+    """Add delta photos to the (album, month of when) bucket on an open connection or session."""
+    conn.execute(_BUMP, {'a': album or '', 'ym': month_key(when), 'd': delta})
+    if delta < 0:
+        conn.execute(text("DELETE FROM photo_bucket WHERE album = :a AND ym = :ym AND count <= 0"),
+                     {'a': album or '', 'ym': month_key(when)})
+
+
+def rebuild_buckets(conn):
+    """Recompute photo_bucket from photo (migration / repair)."""
+    conn.execute(text("DELETE FROM photo_bucket"))
+    conn.execute(text(
+        "INSERT INTO photo_bucket (album, ym, count) "
+        "SELECT COALESCE(album, ''), strftime('%Y-%m', sort_time), COUNT(*) FROM photo "
+        "WHERE sort_time IS NOT NULL GROUP BY COALESCE(album, ''), strftime('%Y-%m', sort_time)"
+    ))
+
+
+def albums():
+    """[(album, photo count)] by name."""
+    rows = db.session.query(PhotoBucket.album, func.sum(PhotoBucket.count)).group_by(PhotoBucket.album).order_by(PhotoBucket.album)
+    return [(album, int(n)) for album, n in rows if album]
+
+
+def buckets(album=None):
+    """[(year-month, photo count)], newest first, for one album or all of them."""
+    q = db.session.query(PhotoBucket.ym, func.sum(PhotoBucket.count))
+    if album:
+        q = q.filter(PhotoBucket.album == album)
+    return [(ym, int(n)) for ym, n in q.group_by(PhotoBucket.ym).order_by(PhotoBucket.ym.desc())]
+
+
+def page(album=None, cursor=None, ym=None, limit=PAGE_SIZE):
+    """(photos, next cursor or None), newest first, after `cursor` or starting at the end of month `ym`."""
+    q = Photo.query
+    if album:
+        q = q.filter(Photo.album == album)
+    if ym and not cursor:
+        try:
+            start = datetime.strptime(ym, '%Y-%m')
+        except ValueError:
+            start = None
+        if start:
+            end = start.replace(year=start.year + 1, month=1) if start.month == 12 else start.replace(month=start.month + 1)
+            q = q.filter(Photo.sort_time < end)
+    return keyset_page(q, Photo.sort_time, Photo.id, cursor, limit)
+
+
+def photo_json(photo):
+    return {
+        'id': photo.id,
+        'filename': photo.filename,
+        'caption': photo.caption,
+        'uploader': photo.uploader,
+        'album': photo.album,
+        'ym': month_key(photo.sort_time),
+        'date': photo.sort_time.strftime('%b %d, %Y'),
+        'taken_at': photo.taken_at.isoformat() if photo.taken_at else None,
+        'camera': photo.camera,
+        'width': photo.width,
+        'height': photo.height,
+        'has_gps': bool(photo.has_gps),
+    }
@@ -0,0 +1,260 @@
+"""Photo gallery. Thumbnails are rendered in the background, see app/thumbnails.py."""
+from flask import (render_template, request, redirect, url_for, flash, send_from_directory, jsonify, current_app, abort,
+                   stream_with_context)
+from werkzeug.datastructures import ContentRange
+from werkzeug.utils import secure_filename
+from datetime import datetime
+import os
+
+from .models import db, Photo, PhotoVariant
+from .photo_dedupe import duplicate_groups, duplicate_settings, find_similar, hamming, hash_file, MAX_THRESHOLD
+from .photo_timeline import albums as album_counts, buckets, bump_bucket, month_key, page, photo_json, read_metadata
+from .routes import main_bp
+from .thumbnails import (GRID_SIZE, PHOTOS_FOLDER, SIZES, box_for, negotiate_format, pick_variant, purge_photo,
+                         rescan_hashes, resume, submit)
+from .zip_stream import ZipEntry, ZipStream
+
+IMAGE_MAX_AGE = 365 * 24 * 3600  # file names are unique and variants are derived from them, so they never change
+
+
+def _send_image(folder, name):
+    response = send_from_directory(folder, name, max_age=IMAGE_MAX_AGE)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    response.vary.add('Accept')
+    return response
+
+
+def _requested_width():
+    try:
+        return max(1, int(request.args['w']))
+    except (KeyError, ValueError):
+        return None
+
+
+def _send_photo(filename, width):
+    """Smallest variant of the photo covering width pixels in the best accepted format; the original for None."""
+    photo = Photo.query.filter_by(filename=filename).first_or_404()
+    box = box_for(width) if width else None
+    if box is None:
+        return _send_image(PHOTOS_FOLDER, photo.filename)
+    try:
+        folder, name = pick_variant(photo, box, negotiate_format(request.accept_mimetypes))
+    except Exception as e:
+        current_app.logger.warning(f"{box}px variant of {filename} failed: {e}")
+        abort(404)
+    return _send_image(folder, name)
+
+@main_bp.route('/photos')
+def photos():
+    resume(current_app._get_current_object())
+    config = current_app.config['HOMEHUB_CONFIG']
+    album = request.args.get('album') or None
+    # First page only; the page loads the rest from /api/photos/page
+    photos, next_cursor = page(album=album)
+    albums = album_counts()
+    return render_template('photos.html', config=config, is_authed=True, photos=photos, albums=[a for a, _ in albums],
+                           album_counts=albums, current_album=album, next_cursor=next_cursor,
+                           bucket_counts=dict(buckets(album)), month_key=month_key)
+
+@main_bp.route('/api/photos/timeline')
+def api_photos_timeline():
+    """Month buckets of the gallery (optionally one album), newest first."""
+    album = request.args.get('album') or None
+    return jsonify({'buckets': [{'ym': ym, 'count': n} for ym, n in buckets(album)]})
+
+@main_bp.route('/api/photos/page')
+def api_photos_page():
+    """Next page of photos after ?cursor=, or from the end of month ?ym=; keyset on (sort_time, id)."""
+    album = request.args.get('album') or None
+    try:
+        limit = max(1, min(int(request.args.get('limit', 60)), 200))
+    except ValueError:
+        limit = 60
+    photos, next_cursor = page(album=album, cursor=request.args.get('cursor'), ym=request.args.get('ym'), limit=limit)
+    return jsonify({'photos': [photo_json(p) for p in photos], 'next': next_cursor})
+
+@main_bp.route('/photos/upload', methods=['POST'])
+def photos_upload():
+    files = request.files.getlist('photos')
+    album = request.form.get('album', '').strip() or 'General'
+    caption = request.form.get('caption', '').strip()
+    uploader = request.form.get('uploader', 'Unknown')
+    dedupe = duplicate_settings(current_app.config['HOMEHUB_CONFIG'])
+
+    added = []
+    rejected = []
+    batch_hashes = []
+    for file in files:
+        if file and file.filename:
+            filename = secure_filename(f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{file.filename}")
+            filepath = os.path.join(PHOTOS_FOLDER, filename)
+            file.save(filepath)
+
+            phash = None
+            if dedupe['reject_on_upload']:
+                # Hashed here rather than in the pool so a duplicate is never stored
+                try:
+                    phash = hash_file(filepath)
+                except Exception as e:
+                    current_app.logger.warning(f"Could not hash {filename}: {e}")
+                if phash and (find_similar(phash, dedupe['threshold'])
+                              or any(hamming(int(phash, 16), int(h, 16)) <= dedupe['threshold'] for h in batch_hashes)):
+                    os.remove(filepath)
+                    rejected.append(file.filename)
+                    continue
+                if phash:
+                    batch_hashes.append(phash)
+
+            # EXIF header only; the pixels are decoded by the thumbnail pool
+            meta = read_metadata(filepath)
+            uploaded = datetime.now()
+            photo = Photo(
+                filename=filename,
+                album=album,
+                caption=caption,
+                uploader=uploader,
+                upload_time=uploaded,
+                thumb_status='pending',
+                sort_time=meta['taken_at'] or uploaded,
+                phash=phash,
+                **meta
+            )
+            db.session.add(photo)
+            bump_bucket(db.session, album, photo.sort_time, 1)
+            added.append(photo)
+
+    db.session.commit()
+    # Thumbnails are rendered by the pool; the grid renders any it needs before they are ready
+    app = current_app._get_current_object()
+    for photo in added:
+        submit(app, photo.id, photo.filename)
+    if rejected:
+        flash(f"Skipped {len(rejected)} likely duplicate(s) already in the library: {', '.join(rejected)}", 'info')
+    if added or not rejected:
+        flash('Photos uploaded successfully!', 'success')
+    return redirect(url_for('main.photos'))
+
+def _requested_threshold():
+    default = duplicate_settings(current_app.config['HOMEHUB_CONFIG'])['threshold']
+    try:
+        return min(max(0, int(request.args.get('threshold', default))), MAX_THRESHOLD)
+    except ValueError:
+        return default
+
+@main_bp.route('/api/photos/duplicates')
+def api_photos_duplicates():
+    """Groups of possible duplicates across the library, largest original first within each group."""
+    threshold = _requested_threshold()
+    groups = duplicate_groups(threshold)
+    photos = {p.id: p for p in Photo.query.filter(Photo.id.in_([pid for g in groups for pid in g]))}
+    result = []
+    for group in groups:
+        members = sorted((photos[pid] for pid in group if pid in photos),
+                         key=lambda p: (-(p.width or 0) * (p.height or 0), p.id))
+        if len(members) > 1:
+            result.append([photo_json(p) for p in members])
+    return jsonify({'threshold': threshold, 'groups': result})
+
+@main_bp.route('/api/photos/<int:photo_id>/similar')
+def api_photos_similar(photo_id):
+    photo = Photo.query.get_or_404(photo_id)
+    if not photo.phash:
+        return jsonify({'photos': [], 'pending': True})
+    matches = find_similar(photo.phash, _requested_threshold(), exclude_id=photo.id)
+    return jsonify({'photos': [dict(photo_json(p), distance=d) for d, p in matches], 'pending': False})
+
+@main_bp.route('/api/photos/duplicates/rescan', methods=['POST'])
+def api_photos_rescan():
+    """Hash photos that have no hash yet (or every photo with ?all=1) in the thumbnail pool."""
+    queued = rescan_hashes(current_app._get_current_object(), everything=request.args.get('all') == '1')
+    return jsonify({'queued': queued})
+
+@main_bp.route('/photos/full/<filename>')
+def photos_full(filename):
+    # Without ?w= this is the original, as before
+    return _send_photo(filename, _requested_width())
+
+@main_bp.route('/photos/thumb/<filename>')
+def photos_thumb(filename):
+    # Capped at the largest pipeline size, so a thumbnail is never the full-size original
+    return _send_photo(filename, min(_requested_width() or GRID_SIZE, SIZES[-1]))
+
+def _store_crc(entry):
+    Photo.query.filter_by(id=entry.key).update({Photo.crc32: entry.crc}, synchronize_session=False)
+    db.session.commit()
+
+@main_bp.route('/photos/export')
+def photos_export():
+    """An album (every photo without ?album=) as a ZIP streamed from disk, resumable with Range requests."""
+    album = request.args.get('album') or None
+    q = db.session.query(Photo.id, Photo.filename, Photo.album, Photo.sort_time, Photo.upload_time, Photo.crc32)
+    if album:
+        q = q.filter(Photo.album == album)
+    entries = []
+    for photo_id, filename, photo_album, sort_time, upload_time, crc in q.order_by(Photo.sort_time, Photo.id):
+        path = os.path.join(PHOTOS_FOLDER, filename)
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            continue
+        # The whole library gets one folder per album
+        name = filename if album else f"{(photo_album or 'General').replace('/', '_')}/{filename}"
+        modified = sort_time or upload_time or datetime(1980, 1, 1)
+        entries.append(ZipEntry(name, path, size, modified, crc=crc, key=photo_id))
+    if not entries:
+        abort(404)
+    archive = ZipStream(entries, on_crc=_store_crc)
+
+    start, stop, status = 0, archive.size, 200
+    if_range = request.if_range
+    # A resumed download only gets the rest if the archive is still the one it started
+    if request.range and (if_range.etag == archive.etag or (if_range.etag is None and if_range.date is None)):
+        span = request.range.range_for_length(archive.size)
+        if span:
+            (start, stop), status = span, 206
+        elif len(request.range.ranges) == 1:
+            response = current_app.response_class(status=416)
+            response.content_range = ContentRange('bytes', None, None, archive.size)
+            return response
+
+    response = current_app.response_class(stream_with_context(archive.stream(start, stop)), status=status,
+                                          mimetype='application/zip', direct_passthrough=True)
+    response.content_length = stop - start
+    response.accept_ranges = 'bytes'
+    response.set_etag(archive.etag)
+    if status == 206:
+        response.content_range = ContentRange('bytes', start, stop, archive.size)
+    download_name = secure_filename(album or '') or 'photos'
+    response.headers['Content-Disposition'] = f'attachment; filename="{download_name}.zip"'
+    return response
+
+@main_bp.route('/photos/get/<int:photo_id>')
+def photos_get(photo_id):
+    photo = Photo.query.get_or_404(photo_id)
+    return jsonify({
+        'filename': photo.filename,
+        'caption': photo.caption,
+        'uploader': photo.uploader,
+        'upload_time': photo.upload_time.strftime('%B %d, %Y'),
+        'taken_at': photo.taken_at.strftime('%B %d, %Y') if photo.taken_at else None,
+        'camera': photo.camera
+    })
+
+@main_bp.route('/photos/delete/<int:photo_id>', methods=['POST'])
+def photos_delete(photo_id):
+    photo = Photo.query.get_or_404(photo_id)
+
+    # Delete files
+    purge_photo(photo)
+    try:
+        os.remove(os.path.join(PHOTOS_FOLDER, photo.filename))
+    except OSError:
+        pass
+
+    PhotoVariant.query.filter_by(photo_id=photo.id).delete(synchronize_session=False)
+    if photo.sort_time:
+        bump_bucket(db.session, photo.album, photo.sort_time, -1)
+    db.session.delete(photo)
+    db.session.commit()
+    return jsonify({'success': True})
@@ -0,0 +1,66 @@
+"""QR code generator. qrcode (and its PIL backend) is imported on first use."""
+from flask import render_template, request, redirect, url_for, current_app
+from datetime import datetime
+import os
+
+from .models import db, QRCode
+from .pagination import list_page, load_more
+from .routes import main_bp, bleach, BASE_DIR
+
+@main_bp.route('/qr', methods=['GET', 'POST'])
+def qr():
+    import qrcode
+    import base64
+    import re
+    qr_img = None
+    if request.method == 'POST':
+        qrtext = bleach.clean(request.form['qrtext'])
+        creator = bleach.clean(request.form['creator'])
+        ssid_match = re.search(r'ssid:([^ ]+)', qrtext, re.IGNORECASE)
+        pass_match = re.search(r'pass:([^ ]+)', qrtext, re.IGNORECASE)
+        type_match = re.search(r'type:([^ ]+)', qrtext, re.IGNORECASE)
+        hidden_match = re.search(r'hidden:([^ ]+)', qrtext, re.IGNORECASE)
+        if ssid_match and pass_match:
+            ssid = bleach.clean(ssid_match.group(1))
+            password = bleach.clean(pass_match.group(1))
+            enc_type = (type_match.group(1) if type_match else 'WPA').upper()
+            hidden = hidden_match.group(1) if hidden_match else 'false'
+            wifi_str = f"WIFI:S:{ssid};T:{enc_type};P:{password};H:{hidden};"
+            qrtext_for_qr = wifi_str
+        else:
+            qrtext_for_qr = qrtext
+        qr_code = qrcode.make(qrtext_for_qr)
+        from io import BytesIO
+        buf = BytesIO()
+        qr_code.save(buf, format='PNG')
+        qr_img = base64.b64encode(buf.getvalue()).decode('utf-8')
+        # Save to disk and record history
+        filename = f"qr_{int(datetime.utcnow().timestamp())}.png"
+        path = os.path.join(BASE_DIR, 'static', filename)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(buf.getvalue())
+        db.session.add(QRCode(text=qrtext, filename=filename, creator=creator))
+        db.session.commit()
+    history, next_cursor = list_page('qr', QRCode.query, QRCode.timestamp, QRCode.id)
+    config = current_app.config['HOMEHUB_CONFIG']
+    return render_template('qr.html', qr_img=qr_img, history=history, next_cursor=next_cursor, config=config)
+
+@main_bp.route('/api/qr/page')
+def qr_page():
+    return load_more('qr', QRCode.query, QRCode.timestamp, QRCode.id, '_qr_items.html', 'history')
+
+@main_bp.route('/qr/delete/<int:qr_id>', methods=['POST'])
+def delete_qr(qr_id):
+    q = QRCode.query.get_or_404(qr_id)
+    user = bleach.clean(request.form['user'])
+    admin_name = current_app.config['HOMEHUB_CONFIG'].get('admin_name', 'Administrator')
+    admin_aliases = {admin_name, 'Administrator', 'admin'}
+    if user in admin_aliases or user == q.creator:
+        try:
+            os.remove(os.path.join(BASE_DIR, 'static', q.filename))
+        except Exception:
+            pass
+        db.session.delete(q)
+        db.session.commit()
+    return redirect(url_for('main.qr'))
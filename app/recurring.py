@@ -0,0 +1,111 @@
+"""Recurring-expense engine: turns RecurringExpense rules into ExpenseEntry rows.
+
+materialize() computes every occurrence a rule is missing up to a given day in
+one pass, checks which of them already exist with a single query per rule and
+bulk inserts the rest with INSERT OR IGNORE. The expense_entry triggers bump
+the versions of the months it touched, which retires their cached snapshots
+in every process (app/expense_cache.py). The unique (recurring_id, date)
+index makes a concurrent or repeated run harmless, so it is safe to call from
+the background job (sync/recurring_expenses.py), from the CLI and right after a
+rule is created or edited.
+
+Page requests only read expense_entry; they never generate occurrences.
+"""
+import calendar as _calendar
+import logging
+from datetime import date, timedelta
+
+from sqlalchemy import insert
+
+from .models import db, RecurringExpense, ExpenseEntry
+
+logger = logging.getLogger('homehub.recurring')
+
+
+def _first_of_next_month(d):
+    ny = d.year + (1 if d.month == 12 else 0)
+    nm = 1 if d.month == 12 else d.month + 1
+    return date(ny, nm, 1)
+
+
+def _monthly_mode(rule):
+    return getattr(rule, 'monthly_mode', 'day_of_month') or 'day_of_month'
+
+
+def _next_date(rule, d, base_day):
+    if rule.frequency == 'daily':
+        return d + timedelta(days=1)
+    if rule.frequency == 'weekly':
+        return d + timedelta(weeks=1)
+    nxt = _first_of_next_month(d)
+    if _monthly_mode(rule) == 'calendar':
+        return nxt
+    # same day-of-month next month (clamped to last day)
+    last_dom = _calendar.monthrange(nxt.year, nxt.month)[1]
+    return nxt.replace(day=min(base_day, last_dom))
+
+
+def occurrence_dates(rule, until):
+    """Dates the rule still has to generate, from after last_generated_date up to `until` (inclusive)."""
+    start = rule.start_date or until
+    # Monthly same-day mode keeps the start date's day-of-month
+    base_day = start.day
+    last = rule.last_generated_date
+    if last is None or last < start:
+        # Fresh generation from the start date; calendar-monthly rules begin on a 1st
+        if rule.frequency == 'monthly' and _monthly_mode(rule) == 'calendar' and start.day != 1:
+            d = _first_of_next_month(start)
+        else:
+            d = start
+    else:
+        d = _next_date(rule, last, base_day)
+    stop = min(until, rule.end_date) if rule.end_date else until
+    dates = []
+    while d <= stop:
+        dates.append(d)
+        d = _next_date(rule, d, base_day)
+    return dates
+
+
+def materialize(until=None, rule_ids=None):
+    """Insert missing occurrences for all rules (or just rule_ids) up to `until` (default today).
+
+    Commits and returns the number of entries inserted.
+    """
+    until = until or date.today()
+    q = RecurringExpense.query
+    if rule_ids is not None:
+        q = q.filter(RecurringExpense.id.in_(list(rule_ids)))
+    table = ExpenseEntry.__table__
+    inserted = 0
+    for rule in q.all():
+        dates = occurrence_dates(rule, until)
+        if not dates:
+            continue
+        existing = {
+            row[0] for row in db.session.query(ExpenseEntry.date).filter(
+                ExpenseEntry.recurring_id == rule.id,
+                ExpenseEntry.date >= dates[0],
+                ExpenseEntry.date <= dates[-1],
+            )
+        }
+        qty = rule.default_quantity or 1.0
+        amt = (rule.unit_price or 0.0) * qty
+        rows = [{
+            'date': d,
+            'title': rule.title,
+            'category': getattr(rule, 'category', None),
+            'unit_price': rule.unit_price,
+            'quantity': qty,
+            'amount': amt,
+            'payer': rule.creator,
+            'recurring_id': rule.id,
+        } for d in dates if d not in existing]
+        if rows:
+            result = db.session.execute(insert(table).prefix_with('OR IGNORE'), rows)
+            inserted += max(result.rowcount or 0, 0)
+        rule.last_generated_date = dates[-1]
+    db.session.commit()
+    if inserted:
+        logger.info("Materialized %s recurring expense entries up to %s", inserted, until)
+    return inserted
@@ -1,16 +1,21 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, send_from_directory, jsonify, current_app, session
-from .config import load_config
-from threading import Thread
-from .models import db, Note, File, Media, PDF, ShoppingItem, GroceryHistory, HomeStatus, Chore, Recipe, ExpiryItem, ShortURL, QRCode, Notice, Reminder, MemberStatus, RecurringExpense, ExpenseEntry, BitwardenVault, User, Photo, MealPlan, FavoriteMeal, MaintenanceTask, Pet, PetCareEvent, Countdown
-from .utils import generate_short_code
+from .config import get_config
+from .models import db, Note, File, ShoppingItem, HomeStatus, Chore, Recipe, ExpiryItem, ShortURL, Notice, Reminder, MemberStatus, RecurringExpense, ExpenseEntry, BitwardenVault, User, MealPlan, FavoriteMeal, MaintenanceTask, Pet, PetCareEvent, Countdown
+from .utils import generate_short_code, lazy_import
+from .recurring import materialize
+from .bulk import delete_owned, delete_matching
+from .grocery import record_purchase, suggestions as grocery_suggestions
+from .expense_cache import month_snapshot_json, invalidate_settings
+from .user_cache import get_user, get_user_by_name, can_write_calendar, invalidate_user
+from .pagination import list_page, load_more
+from .search import search as search_index, enabled_kinds
+from .ingredients import index as index_ingredients, unindex as unindex_ingredients, pantry, cook_suggestions
 import os
 from werkzeug.utils import secure_filename
 from datetime import datetime, date, timedelta
-import calendar as _calendar
-import bleach
 import json
-import secrets
-import time
+
+bleach = lazy_import('bleach')
 
 main_bp = Blueprint('main', __name__)
 
@@ -19,9 +24,9 @@ ALLOWED_ATTRIBUTES = {'a': ['href', 'title']}
 
 @main_bp.before_app_request
 def reload_config_and_auth():
-    # Always reload config to reflect changes to config.yml without rebuilding
+    # Pick up config.yml edits without rebuilding; get_config() only re-parses when the file changed
     try:
-        current_app.config['HOMEHUB_CONFIG'] = load_config()
+        current_app.config['HOMEHUB_CONFIG'] = get_config()
     except Exception:
         pass
 
@@ -44,9 +49,9 @@ def reload_config_and_auth():
     if not user_id:
         return redirect(url_for('main.login'))
 
-    # Verify user still exists and load into g
+    # Verify user still exists and load a cached snapshot into g
     from flask import g
-    user = User.query.get(user_id)
+    user = get_user(user_id)
     if not user:
         session.clear()
         return redirect(url_for('main.login'))
@@ -59,18 +64,57 @@ def reload_config_and_auth():
 
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 UPLOAD_FOLDER = os.path.join(BASE_DIR, 'uploads')
-MEDIA_FOLDER = os.path.join(BASE_DIR, 'media')
-PDF_FOLDER = os.path.join(BASE_DIR, 'pdfs')
 GAMES_FOLDER = os.path.join(BASE_DIR, 'games')
 
+def _add_months(d, months):
+    """First day of the month `months` away from d's month."""
+    idx = d.year * 12 + (d.month - 1) + months
+    return date(idx // 12, idx % 12 + 1, 1)
+
+
+def _dashboard_window_months(config):
+    """Months either side of the current one embedded in the dashboard (reminders.dashboard_window_months)."""
+    try:
+        n = int((config.get('reminders') or {}).get('dashboard_window_months', 1))
+    except (TypeError, ValueError, AttributeError):
+        n = 1
+    return max(0, min(n, 12))
+
+
+def _reminders_payload(rows, months):
+    """Dashboard payload {"months": [...], "by_date": {date: [reminder, ...]}} from the ordered reminder rows."""
+    by_date = {}
+    for rid, title, description, creator, day, rtime, rcat in rows:
+        try:
+            key = day.strftime('%Y-%m-%d')
+        except Exception:
+            # Fallback if the date is already a string or None
+            key = str(day) if day else ''
+        by_date.setdefault(key, []).append({
+            'id': int(rid),
+            'title': title or '',
+            'description': description or '',
+            'creator': creator or '',
+            'time': rtime or None,
+            'category': rcat or None,
+        })
+    return {'months': months, 'by_date': by_date}
+
+
 @main_bp.route('/')
 def index():
     config = current_app.config['HOMEHUB_CONFIG']
     notice = Notice.query.order_by(Notice.updated_at.desc()).first()
-    # Calendar: gather reminders grouped by date
-    # Use with_entities to avoid passing ORM models around accidentally
+    # Calendar: embed only the months around today; the page fetches any other
+    # month from /api/reminders when the user navigates to it.
+    n = _dashboard_window_months(config)
+    this_month = date.today().replace(day=1)
+    start = _add_months(this_month, -n)
+    end = _add_months(this_month, n + 1)
+    months = [_add_months(this_month, i).strftime('%Y-%m') for i in range(-n, n + 1)]
     try:
-        # Include time and category so initial month cache has full data
+        from sqlalchemy import case
+        # One range query (served by ix_reminder_date), same order as /api/reminders
         rows = Reminder.query.with_entities(
             Reminder.id,
             Reminder.title,
@@ -79,30 +123,19 @@ def index():
             Reminder.date,
             Reminder.time,
             Reminder.category
+        ).filter(Reminder.date >= start, Reminder.date < end).order_by(
+            Reminder.date.asc(),
+            case((Reminder.time.is_(None), 1), (Reminder.time == '', 1), else_=0).asc(),
+            Reminder.time.asc(),
+            Reminder.id.asc()
         ).all()
     except Exception:
         rows = []
-    by_date = {}
-    for rid, title, description, creator, rdate, rtime, rcat in rows:
-        try:
-            key = rdate.strftime('%Y-%m-%d')
-        except Exception:
-            # Fallback if rdate is already a string or None
-            key = str(rdate) if rdate else ''
-        by_date.setdefault(key, []).append({
-            'id': int(rid),
-            'title': title or '',
-            'description': description or '',
-            'creator': creator or '',
-            'time': rtime or None,
-            'category': rcat or None,
-        })
-    # Serialize once server-side to avoid Jinja tojson on ORM-related objects
-    import json
     try:
-        reminders_json = json.dumps(by_date)
+        # Escape '<' like Jinja's tojson so a title cannot close the <script> tag
+        reminders_json = json.dumps(_reminders_payload(rows, months)).replace('<', '\\u003c')
     except Exception:
-        reminders_json = '{}'
+        reminders_json = '{"months": [], "by_date": {}}'
     # Who is Home summary
     family = list(dict.fromkeys(config.get('family_members', [])))
     who_statuses = {s.name: s.status for s in HomeStatus.query.all() if s.name in family}
@@ -219,8 +252,7 @@ def api_reminders_create():
     description = bleach.clean(payload.get('description', ''), tags=ALLOWED_TAGS, attributes=ALLOWED_ATTRIBUTES)
 
     # Check calendar write permission
-    user = User.query.filter_by(username=creator).first()
-    if not user or (not user.is_admin and not user.calendar_write_enabled):
+    if not can_write_calendar(creator):
         return jsonify({'ok': False, 'error': 'Calendar write permission required'}), 403
 
     if not title:
@@ -266,8 +298,7 @@ def api_reminders_update(rid):
     username = bleach.clean(payload.get('creator', ''))
 
     # Check calendar write permission
-    user_obj = User.query.filter_by(username=username).first()
-    if not user_obj or (not user_obj.is_admin and not user_obj.calendar_write_enabled):
+    if not can_write_calendar(username):
         return jsonify({'ok': False, 'error': 'Calendar write permission required'}), 403
 
     admin_name = current_app.config['HOMEHUB_CONFIG'].get('admin_name', 'Administrator')
@@ -316,30 +347,28 @@ def api_reminders_delete_bulk():
     username = bleach.clean(payload.get('creator', ''))
 
     # Check calendar write permission
-    user_obj = User.query.filter_by(username=username).first()
-    if not user_obj or (not user_obj.is_admin and not user_obj.calendar_write_enabled):
+    if not can_write_calendar(username):
         return jsonify({'ok': False, 'error': 'Calendar write permission required'}), 403
 
     if not isinstance(ids, list) or not ids:
         return jsonify({'ok': False, 'error': 'No ids provided'}), 400
     admin_name = current_app.config['HOMEHUB_CONFIG'].get('admin_name', 'Administrator')
     admin_aliases = {admin_name, 'Administrator', 'admin'}
-    deleted = 0
-    dates = set()
-    for rid in ids:
-        if not isinstance(rid, int):
-            continue
-        r = Reminder.query.get(rid)
-        if not r:
-            continue
-        if username in admin_aliases or username == (r.creator or ''):
-            if r.date:
-                dates.add(r.date.strftime('%Y-%m-%d'))
-            db.session.delete(r)
-            deleted += 1
-    if deleted:
+    result = delete_owned(Reminder, [rid for rid in ids if isinstance(rid, int)], Reminder.creator, username, admin_aliases)
+    if result.ids:
         db.session.commit()
-    return jsonify({'ok': True, 'deleted': deleted, 'dates': list(dates)})
+    return jsonify({'ok': True, 'deleted': len(result.ids), 'dates': sorted(d.strftime('%Y-%m-%d') for d in result.dates)})
+
+@main_bp.route('/api/search')
+def api_search():
+    """Ranked full-text search (app/search.py). ?q=words&kinds=note,recipe&limit=20"""
+    kinds = enabled_kinds(current_app.config['HOMEHUB_CONFIG'])
+    wanted = request.args.get('kinds')
+    if wanted:
+        kinds = [k for k in kinds if k in wanted.split(',')]
+    limit = request.args.get('limit', 20, type=int)
+    hits = search_index(db.session.connection(), request.args.get('q', ''), kinds, limit)
+    return jsonify({'ok': True, 'results': hits})
 
 @main_bp.route('/login', methods=['GET', 'POST'])
 def login():
@@ -430,6 +459,7 @@ def setup_password():
         # Set password
         user.set_password(password)
         db.session.commit()
+        invalidate_user(user.id)
 
         # Log the user in
         session.pop('setup_user_id', None)
@@ -495,6 +525,7 @@ def admin_reset_password():
         # Reset password
         target_user.set_password(new_password)
         db.session.commit()
+        invalidate_user(target_user.id)
 
         flash(f'Password reset successfully for {target_username}', 'success')
         return redirect(url_for('main.admin_reset_password'))
@@ -521,9 +552,13 @@ def notes():
             db.session.add(note)
             db.session.commit()
         return redirect(url_for('main.notes'))
-    notes = Note.query.order_by(Note.timestamp.desc()).all()
+    notes, next_cursor = list_page('notes', Note.query, Note.timestamp, Note.id)
     config = current_app.config['HOMEHUB_CONFIG']
-    return render_template('notes.html', notes=notes, config=config)
+    return render_template('notes.html', notes=notes, next_cursor=next_cursor, config=config)
+
+@main_bp.route('/api/notes/page')
+def notes_page():
+    return load_more('notes', Note.query, Note.timestamp, Note.id, '_note_items.html', 'notes')
 
 @main_bp.route('/notes/delete/<int:note_id>', methods=['POST'])
 def delete_note(note_id):
@@ -551,9 +586,13 @@ def upload():
             db.session.add(db_file)
         db.session.commit()
         return redirect(url_for('main.upload'))
-    files = File.query.order_by(File.upload_time.desc()).all()
+    files, next_cursor = list_page('upload', File.query, File.upload_time, File.id)
     config = current_app.config['HOMEHUB_CONFIG']
-    return render_template('upload.html', files=files, config=config)
+    return render_template('upload.html', files=files, next_cursor=next_cursor, config=config)
+
+@main_bp.route('/api/upload/page')
+def upload_page():
+    return load_more('upload', File.query, File.upload_time, File.id, '_file_items.html', 'files')
 
 @main_bp.route('/uploads/<filename>')
 def uploaded_file(filename):
@@ -582,91 +621,21 @@ def shopping():
         creator = bleach.clean(request.form['creator'])
         shopping_item = ShoppingItem(item=item, creator=creator)
         db.session.add(shopping_item)
-        # Log to grocery history for suggestions
-        db.session.add(GroceryHistory(item=item, creator=creator))
+        # Log to grocery history and the frequency table used for suggestions
+        record_purchase(item, creator)
         db.session.commit()
         return redirect(url_for('main.shopping'))
     items = ShoppingItem.query.order_by(ShoppingItem.timestamp.desc()).all()
-    # Suggestion logic: top 10 most frequent items in last 90 days not already on list
-    from datetime import timedelta
-    cutoff = datetime.utcnow() - timedelta(days=90)
-    existing = {i.item.lower() for i in items}
-    rows = db.session.execute(db.text("""
-        SELECT item, COUNT(*) as cnt
-        FROM grocery_history
-        WHERE timestamp >= :cutoff
-        GROUP BY item
-        ORDER BY cnt DESC
-        LIMIT 20
-    """), {"cutoff": cutoff}).fetchall()
-    suggestions = [r[0] for r in rows if r[0].lower() not in existing][:10]
+    # Suggestions: top 10 items by decayed purchase frequency not already on the list
+    suggestions = grocery_suggestions(exclude=[i.item for i in items], limit=10)
     config = current_app.config['HOMEHUB_CONFIG']
     return render_template('shopping.html', items=items, suggestions=suggestions, config=config)
 
 # Expense Tracker
 @main_bp.route('/expenses', methods=['GET', 'POST'])
 def expenses():
-    # Generate recurring entries up to today
+    # Recurring occurrences are materialized by app/recurring.py (background job / on rule changes)
     today = date.today()
-    recs = RecurringExpense.query.all()
-    for r in recs:
-        # Determine next date to generate
-        start = r.start_date or today
-        # For monthly same-day mode, base day should be from start_date to preserve intent
-        base_day = (r.start_date or today).day
-        last = r.last_generated_date  # may be None
-        # Iterate dates based on frequency
-        def next_date(d):
-            if r.frequency == 'daily':
-                return d + timedelta(days=1)
-            if r.frequency == 'weekly':
-                return d + timedelta(weeks=1)
-            # monthly: honor monthly_mode
-            mode = getattr(r, 'monthly_mode', 'day_of_month') or 'day_of_month'
-            if mode == 'calendar':
-                # jump to first day of next month
-                ny = d.year + (1 if d.month == 12 else 0)
-                nm = 1 if d.month == 12 else d.month + 1
-                return date(ny, nm, 1)
-            else:
-                # same day-of-month next month (clamped to last day)
-                ny = d.year + (1 if d.month == 12 else 0)
-                nm = 1 if d.month == 12 else d.month + 1
-                last_dom = _calendar.monthrange(ny, nm)[1]
-                day = min(base_day, last_dom)
-                return date(ny, nm, day)
-        # Seed generation correctly for each frequency
-        if last is None or (last and last < start):
-            # Treat as fresh generation starting from start date
-            if r.frequency == 'daily':
-                d = start
-            elif r.frequency == 'weekly':
-                d = start
-            else:  # monthly
-                mode = getattr(r, 'monthly_mode', 'day_of_month') or 'day_of_month'
-                if mode == 'calendar':
-                    # If start is on the 1st, include it; otherwise begin on first day of next month
-                    if start.day == 1:
-                        d = start
-                    else:
-                        ny = start.year + (1 if start.month == 12 else 0)
-                        nm = 1 if start.month == 12 else start.month + 1
-                        d = date(ny, nm, 1)
-                else:
-                    d = start
-        else:
-            # Continue from last generated date
-            d = next_date(last)
-        while d <= today and (not r.end_date or d <= r.end_date):
-            # only create if not already present
-            exists = ExpenseEntry.query.filter_by(date=d, recurring_id=r.id).first()
-            if not exists:
-                qty = r.default_quantity or 1.0
-                amt = (r.unit_price or 0.0) * qty
-                db.session.add(ExpenseEntry(date=d, title=r.title, category=getattr(r, 'category', None), unit_price=r.unit_price, quantity=qty, amount=amt, payer=r.creator, recurring_id=r.id))
-            r.last_generated_date = d
-            d = next_date(d)
-    db.session.commit()
 
     # Handle add entry
     if request.method == 'POST':
@@ -684,8 +653,11 @@ def expenses():
             creator = bleach.clean(request.form.get('creator',''))
             sd = datetime.strptime(start_date, '%Y-%m-%d').date() if start_date else date.today()
             ed = datetime.strptime(end_date, '%Y-%m-%d').date() if end_date else None
-            db.session.add(RecurringExpense(title=title, unit_price=unit_price, default_quantity=default_quantity, frequency=frequency, monthly_mode=monthly_mode, category=category, start_date=sd, end_date=ed, creator=creator))
+            rule = RecurringExpense(title=title, unit_price=unit_price, default_quantity=default_quantity, frequency=frequency, monthly_mode=monthly_mode, category=category, start_date=sd, end_date=ed, creator=creator)
+            db.session.add(rule)
             db.session.commit()
+            # Back-fill occurrences up to today right away instead of waiting for the next job run
+            materialize(rule_ids=[rule.id])
             flash('Recurring expense added.', 'success')
             # Preserve view state if provided
             y = request.args.get('y') or today.year
@@ -715,66 +687,13 @@ def expenses():
     try:
         y = int(request.args.get('y') or today.year)
         m = int(request.args.get('m') or today.month)
+        date(y, m, 1)  # reject out-of-range months
     except Exception:
         y, m = today.year, today.month
-    month_start = date(y, m, 1)
-    last_day = _calendar.monthrange(y, m)[1]
-    month_end = date(y, m, last_day)
-
-    q_entries = ExpenseEntry.query.filter(ExpenseEntry.date >= month_start, ExpenseEntry.date <= month_end).order_by(ExpenseEntry.date.asc(), ExpenseEntry.timestamp.asc()).all()
-    # Prepare data structure for client rendering
-    by_date = {}
-    total = 0.0
-    per_payer = {}
-    per_category = {}
-    for e in q_entries:
-        ds = e.date.strftime('%Y-%m-%d')
-        by_date.setdefault(ds, {'total': 0.0, 'entries': []})
-        by_date[ds]['total'] += float(e.amount or 0)
-        total += float(e.amount or 0)
-        per_payer[e.payer or ''] = per_payer.get(e.payer or '', 0.0) + float(e.amount or 0)
-        if e.category:
-            per_category[e.category] = per_category.get(e.category, 0.0) + float(e.amount or 0)
-        by_date[ds]['entries'].append({
-            'id': e.id,
-            'title': e.title,
-            'category': e.category,
-            'unit_price': float(e.unit_price) if e.unit_price is not None else None,
-            'amount': float(e.amount or 0),
-            'quantity': float(e.quantity or 0) if e.quantity is not None else None,
-            'recurring': bool(e.recurring_id),
-            'payer': e.payer or ''
-        })
-    # Determine top category name
-    top_category = None
-    if per_category:
-        top_category = max(per_category.items(), key=lambda kv: kv[1])[0]
 
     rules = RecurringExpense.query.order_by(RecurringExpense.timestamp.desc()).all()
     config = current_app.config['HOMEHUB_CONFIG']
-    import json
-    # Settings
-    settings = {'currency': '₹', 'categories': []}
-    try:
-        rows = db.session.execute(db.text("SELECT key, value FROM app_setting WHERE key IN ('currency','categories')"))
-        data = {k: v for k, v in rows}
-        if data.get('currency'): settings['currency'] = data['currency']
-        if data.get('categories'): settings['categories'] = [c.strip() for c in data['categories'].split(',') if c.strip()]
-    except Exception:
-        pass
-    payload = {
-        'by_date': by_date,
-        'summary': {
-            'total_this_month': total,
-            'per_payer': per_payer,
-            'per_category': per_category,
-            'top_category': top_category
-        },
-        'year': y,
-        'month': m,
-        'settings': settings
-    }
-    return render_template('expenses.html', rules=rules, config=config, expenses_json=json.dumps(payload))
+    return render_template('expenses.html', rules=rules, config=config, expenses_json=month_snapshot_json(y, m))
 
 @main_bp.route('/expenses/delete/<int:entry_id>', methods=['POST'])
 def delete_expense(entry_id):
@@ -798,14 +717,9 @@ def delete_recurring(rec_id):
     admin_name = current_app.config['HOMEHUB_CONFIG'].get('admin_name', 'Administrator')
     admin_aliases = {admin_name, 'Administrator', 'admin'}
     if user in admin_aliases or user == r.creator:
-        # If requested, delete all generated entries for this rule
+        # If requested, delete all generated entries for this rule (one statement)
         if request.form.get('delete_entries'):
-            try:
-                entries = ExpenseEntry.query.filter_by(recurring_id=r.id).all()
-                for e in entries:
-                    db.session.delete(e)
-            except Exception:
-                pass
+            delete_matching(ExpenseEntry, ExpenseEntry.recurring_id == r.id)
         db.session.delete(r)
         db.session.commit()
     y = request.args.get('y') or date.today().year
@@ -849,114 +763,14 @@ def edit_expense(entry_id):
 # JSON API for monthly expenses
 @main_bp.route('/api/expenses/month', methods=['GET'])
 def api_expenses_month():
-    # Ensure recurring generation has run recently
     today = date.today()
-    recs = RecurringExpense.query.all()
-    for r in recs:
-        start = r.start_date or today
-        last = r.last_generated_date
-        def next_date(d):
-            if r.frequency == 'daily':
-                return d + timedelta(days=1)
-            if r.frequency == 'weekly':
-                return d + timedelta(weeks=1)
-            mode = getattr(r, 'monthly_mode', 'day_of_month') or 'day_of_month'
-            if mode == 'calendar':
-                ny = d.year + (1 if d.month == 12 else 0)
-                nm = 1 if d.month == 12 else d.month + 1
-                return date(ny, nm, 1)
-            else:
-                base_day = (r.start_date or today).day
-                ny = d.year + (1 if d.month == 12 else 0)
-                nm = 1 if d.month == 12 else d.month + 1
-                last = _calendar.monthrange(ny, nm)[1]
-                day = min(base_day, last)
-                return date(ny, nm, day)
-        # Seed similarly to page route
-        if last is None or (last and last < start):
-            if r.frequency == 'daily':
-                d = start
-            elif r.frequency == 'weekly':
-                d = start
-            else:
-                mode = getattr(r, 'monthly_mode', 'day_of_month') or 'day_of_month'
-                if mode == 'calendar':
-                    if start.day == 1:
-                        d = start
-                    else:
-                        ny = start.year + (1 if start.month == 12 else 0)
-                        nm = 1 if start.month == 12 else start.month + 1
-                        d = date(ny, nm, 1)
-                else:
-                    d = start
-        else:
-            d = next_date(last)
-        while d <= today and (not r.end_date or d <= r.end_date):
-            exists = ExpenseEntry.query.filter_by(date=d, recurring_id=r.id).first()
-            if not exists:
-                qty = r.default_quantity or 1.0
-                amt = (r.unit_price or 0.0) * qty
-                db.session.add(ExpenseEntry(date=d, title=r.title, category=getattr(r, 'category', None), unit_price=r.unit_price, quantity=qty, amount=amt, payer=r.creator, recurring_id=r.id))
-            r.last_generated_date = d
-            d = next_date(d)
-    db.session.commit()
-
     try:
         y = int(request.args.get('year') or today.year)
         m = int(request.args.get('month') or today.month)
+        date(y, m, 1)  # reject out-of-range months
     except Exception:
         y, m = today.year, today.month
-    month_start = date(y, m, 1)
-    last_day = _calendar.monthrange(y, m)[1]
-    month_end = date(y, m, last_day)
-
-    q_entries = ExpenseEntry.query.filter(ExpenseEntry.date >= month_start, ExpenseEntry.date <= month_end).order_by(ExpenseEntry.date.asc(), ExpenseEntry.timestamp.asc()).all()
-    by_date = {}
-    total = 0.0
-    per_payer = {}
-    per_category = {}
-    for e in q_entries:
-        ds = e.date.strftime('%Y-%m-%d')
-        by_date.setdefault(ds, {'total': 0.0, 'entries': []})
-        by_date[ds]['total'] += float(e.amount or 0)
-        total += float(e.amount or 0)
-        per_payer[e.payer or ''] = per_payer.get(e.payer or '', 0.0) + float(e.amount or 0)
-        if e.category:
-            per_category[e.category] = per_category.get(e.category, 0.0) + float(e.amount or 0)
-        by_date[ds]['entries'].append({
-            'id': e.id,
-            'title': e.title,
-            'category': e.category,
-            'unit_price': float(e.unit_price) if e.unit_price is not None else None,
-            'amount': float(e.amount or 0),
-            'quantity': float(e.quantity or 0) if e.quantity is not None else None,
-            'recurring': bool(e.recurring_id),
-            'payer': e.payer or ''
-        })
-    top_category = None
-    if per_category:
-        top_category = max(per_category.items(), key=lambda kv: kv[1])[0]
-    # Settings
-    settings = {'currency': '₹', 'categories': []}
-    try:
-        rows = db.session.execute(db.text("SELECT key, value FROM app_setting WHERE key IN ('currency','categories')"))
-        data = {k: v for k, v in rows}
-        if data.get('currency'): settings['currency'] = data['currency']
-        if data.get('categories'): settings['categories'] = [c.strip() for c in data['categories'].split(',') if c.strip()]
-    except Exception:
-        pass
-    return jsonify({
-        'by_date': by_date,
-        'summary': {
-            'total_this_month': total,
-            'per_payer': per_payer,
-            'per_category': per_category,
-            'top_category': top_category
-        },
-        'year': y,
-        'month': m,
-        'settings': settings
-    })
+    return current_app.response_class(month_snapshot_json(y, m), mimetype='application/json')
 
 # Bulk delete expenses (admin or owners for each)
 @main_bp.route('/expenses/bulk-delete', methods=['POST'])
@@ -965,21 +779,10 @@ def bulk_delete_expenses():
     user = bleach.clean(request.form.get('user', ''))
     admin_name = current_app.config['HOMEHUB_CONFIG'].get('admin_name', 'Administrator')
     admin_aliases = {admin_name, 'Administrator', 'admin'}
-    deleted = 0
-    for sid in ids:
-        try:
-            eid = int(sid)
-        except Exception:
-            continue
-        e = ExpenseEntry.query.get(eid)
-        if not e:
-            continue
-        if user in admin_aliases or user == (e.payer or ''):
-            db.session.delete(e)
-            deleted += 1
-    if deleted:
+    result = delete_owned(ExpenseEntry, ids, ExpenseEntry.payer, user, admin_aliases)
+    if result.ids:
         db.session.commit()
-        flash(f'Deleted {deleted} expense(s).', 'success')
+        flash(f'Deleted {len(result.ids)} expense(s).', 'success')
     else:
         flash('No expenses deleted (not allowed or invalid IDs).', 'error')
     y = request.args.get('y') or date.today().year
@@ -1010,31 +813,26 @@ def edit_recurring(rec_id):
     if monthly_mode is not None: r.monthly_mode = bleach.clean(monthly_mode)
     if start_date: r.start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
     if end_date: r.end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
-    # Also update existing entries generated by this rule to reflect changed fields
-    entries = ExpenseEntry.query.filter_by(recurring_id=r.id).all()
-    for e in entries:
-        # Keep date and payer/amount integrity, but recompute amount if unit price or quantity changed
-        e.title = r.title
-        e.category = getattr(r, 'category', None)
-        # If the rule defines a unit_price/quantity, propagate and recompute amount; else preserve existing
-        if r.unit_price is not None:
-            e.unit_price = r.unit_price
-        if r.default_quantity is not None:
-            e.quantity = r.default_quantity
-        if e.unit_price is not None and e.quantity is not None:
-            try:
-                e.amount = float(e.unit_price) * float(e.quantity)
-            except Exception:
-                pass
+    # Propagate the rule to entries it generated with set-based UPDATEs (optionally only from today on)
+    from sqlalchemy import and_, case, func, literal, Float
+    in_rule = [ExpenseEntry.recurring_id == r.id]
+    if request.form.get('apply_to') == 'future':
+        in_rule.append(ExpenseEntry.date >= date.today())
+    # If the rule defines a unit_price/quantity, propagate and recompute amount; else preserve existing
+    new_price = literal(r.unit_price, Float) if r.unit_price is not None else ExpenseEntry.unit_price
+    new_qty = literal(r.default_quantity, Float) if r.default_quantity is not None else ExpenseEntry.quantity
+    ExpenseEntry.query.filter(*in_rule).update({
+        ExpenseEntry.title: r.title,
+        ExpenseEntry.category: getattr(r, 'category', None),
+        ExpenseEntry.unit_price: new_price,
+        ExpenseEntry.quantity: new_qty,
+        ExpenseEntry.amount: case((and_(new_price.isnot(None), new_qty.isnot(None)), new_price * new_qty), else_=ExpenseEntry.amount),
+    }, synchronize_session=False)
     # Align last_generated_date to latest existing generated entry after edits
-    try:
-        if entries:
-            r.last_generated_date = max(e.date for e in entries if getattr(e, 'date', None))
-        else:
-            r.last_generated_date = None
-    except Exception:
-        pass
+    r.last_generated_date = db.session.query(func.max(ExpenseEntry.date)).filter(ExpenseEntry.recurring_id == r.id).scalar()
     db.session.commit()
+    # Fill any occurrences the new start date/frequency adds
+    materialize(rule_ids=[r.id])
     flash('Recurring rule updated.', 'success')
     y = request.args.get('y') or date.today().year
     m = request.args.get('m') or date.today().month
@@ -1056,6 +854,7 @@ def save_expense_settings():
     db.session.execute(_text("REPLACE INTO app_setting(key, value) VALUES('currency', :v)"), { 'v': currency })
     db.session.execute(_text("REPLACE INTO app_setting(key, value) VALUES('categories', :v)"), { 'v': categories })
     db.session.commit()
+    invalidate_settings()
     flash('Settings saved.', 'success')
     y = request.args.get('y') or date.today().year
     m = request.args.get('m') or date.today().month
@@ -1092,9 +891,13 @@ def chores():
         db.session.add(chore)
         db.session.commit()
         return redirect(url_for('main.chores'))
-    chores = Chore.query.order_by(Chore.timestamp.desc()).all()
+    chores, next_cursor = list_page('chores', Chore.query, Chore.timestamp, Chore.id)
     config = current_app.config['HOMEHUB_CONFIG']
-    return render_template('chores.html', chores=chores, config=config)
+    return render_template('chores.html', chores=chores, next_cursor=next_cursor, config=config)
+
+@main_bp.route('/api/chores/page')
+def chores_page():
+    return load_more('chores', Chore.query, Chore.timestamp, Chore.id, '_chore_items.html', 'chores')
 
 @main_bp.route('/chores/toggle/<int:chore_id>', methods=['POST'])
 def toggle_chore(chore_id):
@@ -1126,16 +929,32 @@ def recipes():
         if not (ingredients and ingredients.strip()) and not (instructions and instructions.strip()):
             flash('Please add ingredients or instructions (or both).', 'error')
             # render page without losing title/link fields
-            recipes = Recipe.query.order_by(Recipe.timestamp.desc()).all()
+            recipes, next_cursor = list_page('recipes', Recipe.query, Recipe.timestamp, Recipe.id)
             config = current_app.config['HOMEHUB_CONFIG']
-            return render_template('recipes.html', recipes=recipes, config=config, form_title=title, form_link=link, form_ingredients=ingredients or '', form_instructions=instructions or '')
+            return render_template('recipes.html', recipes=recipes, next_cursor=next_cursor, config=config, form_title=title, form_link=link, form_ingredients=ingredients or '', form_instructions=instructions or '')
         recipe = Recipe(title=title, link=link, ingredients=ingredients, instructions=instructions, creator=creator)
         db.session.add(recipe)
+        db.session.flush()
+        index_ingredients(db.session, 'recipe', recipe.id, ingredients)
         db.session.commit()
         return redirect(url_for('main.recipes'))
-    recipes = Recipe.query.order_by(Recipe.timestamp.desc()).all()
+    recipes, next_cursor = list_page('recipes', Recipe.query, Recipe.timestamp, Recipe.id)
     config = current_app.config['HOMEHUB_CONFIG']
-    return render_template('recipes.html', recipes=recipes, config=config)
+    return render_template('recipes.html', recipes=recipes, next_cursor=next_cursor, config=config)
+
+@main_bp.route('/api/recipes/page')
+def recipes_page():
+    return load_more('recipes', Recipe.query, Recipe.timestamp, Recipe.id, '_recipe_items.html', 'recipes')
+
+@main_bp.route('/api/recipes/cook')
+def recipes_cook():
+    """What can be cooked from the expiry and shopping lists (app/ingredients.py). ?from=expiry,shopping&limit=10"""
+    toggles = current_app.config['HOMEHUB_CONFIG'].get('feature_toggles') or {}
+    kinds = [k for k, toggle in (('recipe', 'recipes'), ('meal', 'meal_planner')) if toggles.get(toggle)]
+    sources = [s for s in request.args.get('from', 'expiry,shopping').split(',') if s in ('expiry', 'shopping')]
+    limit = max(1, min(request.args.get('limit', 10, type=int), 50))
+    items = pantry(sources)
+    return jsonify({'ok': True, 'items': [name for name, _ in items], 'results': cook_suggestions(items, kinds, limit)})
 
 @main_bp.route('/recipes/delete/<int:recipe_id>', methods=['POST'])
 def delete_recipe(recipe_id):
@@ -1144,6 +963,7 @@ def delete_recipe(recipe_id):
     admin_name = current_app.config['HOMEHUB_CONFIG'].get('admin_name', 'Administrator')
     admin_aliases = {admin_name, 'Administrator', 'admin'}
     if user in admin_aliases or user == recipe.creator:
+        unindex_ingredients(db.session, 'recipe', recipe.id)
         db.session.delete(recipe)
         db.session.commit()
     return redirect(url_for('main.recipes'))
@@ -1159,10 +979,16 @@ def expiry():
         db.session.add(expiry_item)
         db.session.commit()
         return redirect(url_for('main.expiry'))
-    items = ExpiryItem.query.order_by(ExpiryItem.expiry_date.asc()).all()
+    # Soonest first
+    items, next_cursor = list_page('expiry', ExpiryItem.query, ExpiryItem.expiry_date, ExpiryItem.id, descending=False)
     today = date.today()
     config = current_app.config['HOMEHUB_CONFIG']
-    return render_template('expiry.html', items=items, today=today, config=config)
+    return render_template('expiry.html', items=items, next_cursor=next_cursor, today=today, config=config)
+
+@main_bp.route('/api/expiry/page')
+def expiry_page():
+    return load_more('expiry', ExpiryItem.query, ExpiryItem.expiry_date, ExpiryItem.id, '_expiry_items.html', 'items',
+                     descending=False, today=date.today())
 
 @main_bp.route('/expiry/delete/<int:item_id>', methods=['POST'])
 def delete_expiry(item_id):
@@ -1188,9 +1014,13 @@ def shorten():
         db.session.add(short_url)
         db.session.commit()
         return redirect(url_for('main.shorten'))
-    urls = ShortURL.query.order_by(ShortURL.timestamp.desc()).all()
+    urls, next_cursor = list_page('shorten', ShortURL.query, ShortURL.timestamp, ShortURL.id)
     config = current_app.config['HOMEHUB_CONFIG']
-    return render_template('shorten.html', urls=urls, config=config)
+    return render_template('shorten.html', urls=urls, next_cursor=next_cursor, config=config)
+
+@main_bp.route('/api/shorten/page')
+def shorten_page():
+    return load_more('shorten', ShortURL.query, ShortURL.timestamp, ShortURL.id, '_short_url_items.html', 'urls')
 
 @main_bp.route('/s/<short_code>')
 def redirect_short(short_code):
@@ -1209,99 +1039,6 @@ def delete_short(url_id):
     return redirect(url_for('main.shorten'))
 
 
-# Media Downloader (yt-dlp integration)
-@main_bp.route('/media', methods=['GET', 'POST'])
-def media():
-    import subprocess, re
-    if request.method == 'POST':
-        url = bleach.clean(request.form['url'])
-        creator = bleach.clean(request.form['creator'])
-        fmt = bleach.clean(request.form.get('format', 'mp4'))
-        quality = bleach.clean(request.form.get('quality', 'best'))
-        # Create a placeholder record marked pending
-        base = f"media_{int(datetime.utcnow().timestamp())}"
-        # Let yt-dlp append extension automatically
-        output_tmpl = os.path.join(MEDIA_FOLDER, base + ".%(ext)s")
-        media_obj = Media(title=url, url=url, creator=creator, filepath='', status='pending')
-        db.session.add(media_obj)
-        db.session.commit()
-        flash('Download queued. You can switch tabs; refresh to check status.', 'info')
-        # Build yt-dlp command
-        cmd = ["yt-dlp", "-o", output_tmpl]
-        if fmt == 'mp3':
-            cmd += ["-x", "--audio-format", "mp3"]
-        else:
-            # Prefer bestvideo+bestaudio with mp4 fallback, honoring selected quality
-            # Provide a sane default ladder if user selected shorthand like 'best'
-            selected = quality or 'best'
-            if selected == 'best':
-                # best available up to original, prefer mp4 mux else fallback
-                fmt_string = "bestvideo[ext=mp4]+bestaudio[ext=m4a]/bestvideo+bestaudio/best"
-            else:
-                # Use user-provided filter, but still add fallbacks and prefer mp4 container when possible
-                fmt_string = f"{selected}/bestvideo[ext=mp4]+bestaudio[ext=m4a]/best"
-            cmd += ["-f", fmt_string]
-            # Merge into mp4 when possible without re-encoding
-            cmd += ["--merge-output-format", "mp4"]
-        cmd += [url]
-
-        # Capture the real app object now to use inside the background thread
-        app_obj = current_app._get_current_object()
-
-        def worker(app, mid: int, base_prefix: str, command: list):
-            # Use the app's context explicitly inside the thread
-            with app.app_context():
-                m = Media.query.get(mid)
-                try:
-                    # Stream output to capture progress lines
-                    proc = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1)
-                    last_percent = -1
-                    for line in proc.stdout:
-                        # Parse percent like: "[download]  12.3% of ..."
-                        try:
-                            m = Media.query.get(mid)
-                            if not m:
-                                continue
-                            match = re.search(r"\[download\]\s+(\d+(?:\.\d+)?)%", line)
-                            if match:
-                                p = int(float(match.group(1)))
-                                if p != last_percent and p % 5 == 0:
-                                    m.progress = f"{p}%"
-                                    db.session.commit()
-                                    last_percent = p
-                        except Exception:
-                            pass
-                    ret = proc.wait()
-                    if ret != 0:
-                        raise RuntimeError(f"yt-dlp exited with {ret}")
-                    saved = None
-                    for fname in os.listdir(MEDIA_FOLDER):
-                        if fname.startswith(base_prefix):
-                            saved = fname
-                            break
-                    m.filepath = saved or ''
-                    m.status = 'done'
-                except Exception:
-                    m.status = 'error'
-                finally:
-                    m.progress = None
-                    db.session.commit()
-
-        Thread(target=worker, args=(app_obj, media_obj.id, base, cmd), daemon=True).start()
-        return redirect(url_for('main.media'))
-    media_list = Media.query.order_by(Media.download_time.desc()).all()
-    config = current_app.config['HOMEHUB_CONFIG']
-    return render_template('media.html', media_list=media_list, config=config)
-
-@main_bp.route('/media/status/<int:media_id>')
-def media_status(media_id):
-    m = Media.query.get_or_404(media_id)
-    return jsonify({
-        'status': m.status,
-        'progress': m.progress,
-        'filepath': m.filepath,
-    })
-
 # Calendar/Reminders
 @main_bp.route('/calendar/add', methods=['POST'])
 def add_reminder():
@@ -1311,8 +1048,7 @@ def add_reminder():
     creator = bleach.clean(request.form.get('creator'))
 
     # Check calendar write permission
-    user = User.query.filter_by(username=creator).first()
-    if not user or (not user.is_admin and not user.calendar_write_enabled):
+    if not can_write_calendar(creator):
         flash('You do not have permission to add calendar events.', 'error')
         return redirect(url_for('main.index'))
 
@@ -1337,8 +1073,7 @@ def delete_reminder(reminder_id):
     username = bleach.clean(request.form.get('user'))
 
     # Check calendar write permission
-    user_obj = User.query.filter_by(username=username).first()
-    if not user_obj or (not user_obj.is_admin and not user_obj.calendar_write_enabled):
+    if not can_write_calendar(username):
         flash('You do not have permission to delete calendar events.', 'error')
         return redirect(url_for('main.index'))
 
@@ -1367,8 +1102,7 @@ def delete_reminders_bulk():
     username = bleach.clean(request.form.get('user', ''))
 
     # Check calendar write permission
-    user_obj = User.query.filter_by(username=username).first()
-    if not user_obj or (not user_obj.is_admin and not user_obj.calendar_write_enabled):
+    if not can_write_calendar(username):
         flash('You do not have permission to delete calendar events.', 'error')
         return redirect(url_for('main.index'))
 
@@ -1383,159 +1117,21 @@ def delete_reminders_bulk():
         return redirect(url_for('main.index'))
     admin_name = current_app.config['HOMEHUB_CONFIG'].get('admin_name', 'Administrator')
     admin_aliases = {admin_name, 'Administrator', 'admin'}
+    result = delete_owned(Reminder, id_list, Reminder.creator, username, admin_aliases)
+    # Return to the date of the first submitted reminder that existed
     kept_date = None
-    deleted = 0
     for rid in id_list:
-        r = Reminder.query.get(rid)
-        if not r:
-            continue
-        if kept_date is None and getattr(r, 'date', None):
-            try:
-                kept_date = r.date.strftime('%Y-%m-%d')
-            except Exception:
-                kept_date = None
-        if username in admin_aliases or username == r.creator:
-            db.session.delete(r)
-            deleted += 1
-    if deleted:
+        rdate = result.found.get(rid, (None, None))[0]
+        if rdate:
+            kept_date = rdate.strftime('%Y-%m-%d')
+            break
+    if result.ids:
         db.session.commit()
-        flash(f'Deleted {deleted} reminder(s).', 'success')
+        flash(f'Deleted {len(result.ids)} reminder(s).', 'success')
     else:
         flash('No reminders deleted (permission?).', 'error')
     return redirect(url_for('main.index', date=kept_date) if kept_date else url_for('main.index'))
 
-@main_bp.route('/media/<filename>')
-def serve_media(filename):
-    return send_from_directory(MEDIA_FOLDER, filename)
-
-@main_bp.route('/media/delete/<int:media_id>', methods=['POST'])
-def delete_media(media_id):
-    m = Media.query.get_or_404(media_id)
-    user = bleach.clean(request.form['user'])
-    admin_name = current_app.config['HOMEHUB_CONFIG'].get('admin_name', 'Administrator')
-    admin_aliases = {admin_name, 'Administrator', 'admin'}
-    if user in admin_aliases or user == m.creator:
-        # remove files that match base prefix
-        try:
-            if m.filepath:
-                base = m.filepath.rsplit('.', 1)[0]
-                for fname in os.listdir(MEDIA_FOLDER):
-                    if fname.startswith(base):
-                        os.remove(os.path.join(MEDIA_FOLDER, fname))
-        except Exception:
-            pass
-        db.session.delete(m)
-        db.session.commit()
-    return redirect(url_for('main.media'))
-
-# PDF Compressor
-@main_bp.route('/pdfs', methods=['GET', 'POST'])
-def pdfs():
-    import shutil, subprocess
-    if request.method == 'POST':
-        pdf_file = request.files['pdf']
-        creator = bleach.clean(request.form['creator'])
-        mode = bleach.clean(request.form.get('mode', 'fast'))
-        filename = secure_filename(pdf_file.filename)
-        input_path = os.path.join(PDF_FOLDER, filename)
-        pdf_file.save(input_path)
-        # Compress PDF using Ghostscript only
-        compressed_path = f"compressed_{filename}"
-        output_path = os.path.join(PDF_FOLDER, compressed_path)
-        try:
-            gs_cmd = [
-                'gs', '-sDEVICE=pdfwrite', '-dCompatibilityLevel=1.4',
-                '-dPDFSETTINGS=/ebook', '-dNOPAUSE', '-dQUIET', '-dBATCH',
-                f'-sOutputFile={output_path}', input_path
-            ]
-            subprocess.run(gs_cmd, check=True)
-        except Exception:
-            # As a minimal fallback just copy the file
-            shutil.copy(input_path, output_path)
-        # Save record
-        pdf_obj = PDF(filename=filename, creator=creator, compressed_path=compressed_path)
-        db.session.add(pdf_obj)
-        db.session.commit()
-        return redirect(url_for('main.pdfs'))
-    pdfs = PDF.query.order_by(PDF.upload_time.desc()).all()
-    config = current_app.config['HOMEHUB_CONFIG']
-    return render_template('pdfs.html', pdfs=pdfs, config=config)
-
-@main_bp.route('/pdfs/<filename>')
-def serve_pdf(filename):
-    return send_from_directory(PDF_FOLDER, filename)
-
-@main_bp.route('/pdfs/delete/<int:pdf_id>', methods=['POST'])
-def delete_pdf(pdf_id):
-    p = PDF.query.get_or_404(pdf_id)
-    user = bleach.clean(request.form['user'])
-    admin_name = current_app.config['HOMEHUB_CONFIG'].get('admin_name', 'Administrator')
-    admin_aliases = {admin_name, 'Administrator', 'admin'}
-    if user in admin_aliases or user == p.creator:
-        try:
-            if p.compressed_path:
-                os.remove(os.path.join(PDF_FOLDER, p.compressed_path))
-        except Exception:
-            pass
-        db.session.delete(p)
-        db.session.commit()
-    return redirect(url_for('main.pdfs'))
-
-# QR Code Generator
-@main_bp.route('/qr', methods=['GET', 'POST'])
-def qr():
-    import qrcode
-    import base64
-    import re
-    qr_img = None
-    if request.method == 'POST':
-        qrtext = bleach.clean(request.form['qrtext'])
-        creator = bleach.clean(request.form['creator'])
-        ssid_match = re.search(r'ssid:([^ ]+)', qrtext, re.IGNORECASE)
-        pass_match = re.search(r'pass:([^ ]+)', qrtext, re.IGNORECASE)
-        type_match = re.search(r'type:([^ ]+)', qrtext, re.IGNORECASE)
-        hidden_match = re.search(r'hidden:([^ ]+)', qrtext, re.IGNORECASE)
-        if ssid_match and pass_match:
-            ssid = bleach.clean(ssid_match.group(1))
-            password = bleach.clean(pass_match.group(1))
-            enc_type = (type_match.group(1) if type_match else 'WPA').upper()
-            hidden = hidden_match.group(1) if hidden_match else 'false'
-            wifi_str = f"WIFI:S:{ssid};T:{enc_type};P:{password};H:{hidden};"
-            qrtext_for_qr = wifi_str
-        else:
-            qrtext_for_qr = qrtext
-        qr_code = qrcode.make(qrtext_for_qr)
-        from io import BytesIO
-        buf = BytesIO()
-        qr_code.save(buf, format='PNG')
-        qr_img = base64.b64encode(buf.getvalue()).decode('utf-8')
-        # Save to disk and record history
-        filename = f"qr_{int(datetime.utcnow().timestamp())}.png"
-        path = os.path.join(BASE_DIR, 'static', filename)
-        os.makedirs(os.path.dirname(path), exist_ok=True)
-        with open(path, 'wb') as f:
-            f.write(buf.getvalue())
-        db.session.add(QRCode(text=qrtext, filename=filename, creator=creator))
-        db.session.commit()
-    history = QRCode.query.order_by(QRCode.timestamp.desc()).all()
-    config = current_app.config['HOMEHUB_CONFIG']
-    return render_template('qr.html', qr_img=qr_img, history=history, config=config)
-
-@main_bp.route('/qr/delete/<int:qr_id>', methods=['POST'])
-def delete_qr(qr_id):
-    q = QRCode.query.get_or_404(qr_id)
-    user = bleach.clean(request.form['user'])
-    admin_name = current_app.config['HOMEHUB_CONFIG'].get('admin_name', 'Administrator')
-    admin_aliases = {admin_name, 'Administrator', 'admin'}
-    if user in admin_aliases or user == q.creator:
-        try:
-            os.remove(os.path.join(BASE_DIR, 'static', q.filename))
-        except Exception:
-            pass
-        db.session.delete(q)
-        db.session.commit()
-    return redirect(url_for('main.qr'))
-
 # Admin: Manage Family Members
 @main_bp.route('/admin/manage-family')
 def manage_family():
@@ -1562,6 +1158,7 @@ def reset_user_password(user_id):
     user = User.query.get_or_404(user_id)
     user.password_set = False
     db.session.commit()
+    invalidate_user(user.id)
 
     flash(f'{user.username} will be prompted to set a new password on next login.', 'success')
     return redirect(url_for('main.manage_family'))
@@ -1619,6 +1216,7 @@ def remove_family_member(user_id):
     username = user.username
     db.session.delete(user)
     db.session.commit()
+    invalidate_user(user_id)
 
     flash(f'Family member "{username}" removed successfully', 'success')
     return redirect(url_for('main.manage_family'))
@@ -1642,6 +1240,7 @@ def toggle_calendar_permission(user_id):
     # Toggle the permission
     user.calendar_write_enabled = not user.calendar_write_enabled
     db.session.commit()
+    invalidate_user(user.id)
 
     status = "enabled" if user.calendar_write_enabled else "disabled"
     flash(f'Calendar write permission {status} for {user.username}', 'success')
@@ -1702,7 +1301,7 @@ def family_calendar_setup():
         return redirect(url_for('main.caldav_setup'))
 
     username = session.get('username', '')
-    user = User.query.filter_by(username=username).first()
+    user = get_user_by_name(username)
 
     # Detect current host and protocol
     detected_host = request.host.split(':')[0] if request.host else 'localhost'
@@ -2048,141 +1647,6 @@ def games():
                          is_authed=True,
                          game_categories=game_categories)
 
-@main_bp.route('/games/chess')
-def chess_game():
-    """Chess game with AI and multiplayer"""
-    config = current_app.config['HOMEHUB_CONFIG']
-    game_id = request.args.get('game_id')
-
-    # If accessed with game_id, it's a remote game link (no auth required, no nav)
-    is_remote_link = game_id is not None
-    is_authed = session.get('user_id') is not None
-
-    # Render standalone template for remote links, otherwise use full template with nav
-    template = 'chess_standalone.html' if is_remote_link else 'chess.html'
-
-    return render_template(template,
-                         config=config,
-                         is_authed=is_authed,
-                         game_id=game_id)
-
-# Remote Chess Game Storage
-# Format: {game_id: {'fen': fen_string, 'white_player': session_id, 'black_player': session_id,
-#                    'current_turn': 'w'/'b', 'last_activity': timestamp, 'moves': []}}
-remote_chess_games = {}
-
-def cleanup_old_games():
-    """Remove games older than 24 hours"""
-    cutoff_time = time.time() - (24 * 60 * 60)
-    games_to_remove = [gid for gid, game in remote_chess_games.items()
-                       if game['last_activity'] < cutoff_time]
-    for gid in games_to_remove:
-        del remote_chess_games[gid]
-
-@main_bp.route('/api/chess/create', methods=['POST'])
-def create_remote_chess_game():
-    """Create a new remote chess game"""
-    cleanup_old_games()
-
-    data = request.json
-    player_token = data.get('player_token')  # Unique token from client
-
-    # Generate secure game ID
-    game_id = secrets.token_urlsafe(16)
-
-    # Initialize game state - CREATOR IS ALWAYS WHITE
-    remote_chess_games[game_id] = {
-        'fen': 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1',  # Starting position
-        'white_player': player_token,  # Creator is always white
-        'black_player': None,  # Second player will be black
-        'current_turn': 'w',
-        'last_activity': time.time(),
-        'moves': [],
-        'game_over': False,
-        'result': None
-    }
-
-    print(f"[CHESS] Created game {game_id}, creator (WHITE): {player_token[:12]}..., total games: {len(remote_chess_games)}")
-
-    return jsonify({
-        'success': True,
-        'game_id': game_id,
-        'player_color': 'white'  # Creator is always white
-    })
-
-@main_bp.route('/api/chess/game/<game_id>', methods=['GET'])
-def get_chess_game(game_id):
-    """Get current game state"""
-    cleanup_old_games()
-
-    print(f"[CHESS] Get game request for {game_id}, total games: {len(remote_chess_games)}, games: {list(remote_chess_games.keys())}")
-
-    if game_id not in remote_chess_games:
-        print(f"[CHESS] Game {game_id} not found!")
-        return jsonify({'success': False, 'error': 'Game not found'}), 404
-
-    game = remote_chess_games[game_id]
-    player_token = request.args.get('player_token')
-
-    # SIMPLE LOGIC: Player 1 (creator) = White, Player 2 = Black
-    if game['white_player'] == player_token:
-        # This is Player 1 (creator)
-        player_color = 'white'
-        print(f"[CHESS] Player 1 (WHITE/creator): {player_token[:12]}")
-    else:
-        # This is Player 2 (joiner) - assign to black
-        if game['black_player'] != player_token:
-            game['black_player'] = player_token
-            print(f"[CHESS] Player 2 (BLACK/joiner) assigned: {player_token[:12]}")
-        player_color = 'black'
-
-    return jsonify({
-        'success': True,
-        'fen': game['fen'],
-        'current_turn': game['current_turn'],
-        'moves': game['moves'],
-        'player_color': player_color,
-        'players_connected': game['white_player'] is not None and game['black_player'] is not None,
-        'game_over': game['game_over'],
-        'result': game['result']
-    })
-
-@main_bp.route('/api/chess/game/<game_id>/move', methods=['POST'])
-def submit_chess_move(game_id):
-    """Submit a move to a remote game"""
-    cleanup_old_games()
-
-    if game_id not in remote_chess_games:
-        return jsonify({'success': False, 'error': 'Game not found'}), 404
-
-    game = remote_chess_games[game_id]
-    data = request.json
-    player_token = data.get('player_token')
-
-    # Verify it's the player's turn
-    player_color = None
-    if game['white_player'] == player_token:
-        player_color = 'w'
-    elif game['black_player'] == player_token:
-        player_color = 'b'
-    else:
-        return jsonify({'success': False, 'error': 'You are not a player in this game'}), 403
-
-    if game['current_turn'] != player_color:
-        return jsonify({'success': False, 'error': 'Not your turn'}), 400
-
-    # Update game state
-    game['fen'] = data['fen']
-    game['current_turn'] = data['turn']
-    game['moves'].append(data['move'])
-    game['last_activity'] = time.time()
-
-    if data.get('game_over'):
-        game['game_over'] = True
-        game['result'] = data.get('result')
-
-    return jsonify({'success': True})
-
 @main_bp.route('/games/<category>/<path:filename>')
 def serve_game(category, filename):
     """Serve game files from the games directory"""
@@ -2201,96 +1665,6 @@ def devtools():
     config = current_app.config['HOMEHUB_CONFIG']
     return render_template('devtools.html', config=config, is_authed=True)
 
-# Photo Gallery
-PHOTOS_FOLDER = os.path.join(BASE_DIR, 'photos')
-os.makedirs(PHOTOS_FOLDER, exist_ok=True)
-os.makedirs(os.path.join(PHOTOS_FOLDER, 'thumbs'), exist_ok=True)
-
-@main_bp.route('/photos')
-def photos():
-    from .models import Photo
-    config = current_app.config['HOMEHUB_CONFIG']
-    photos = Photo.query.order_by(Photo.upload_time.desc()).all()
-    albums = db.session.query(Photo.album).distinct().all()
-    albums = [a[0] for a in albums if a[0]]
-    return render_template('photos.html', config=config, is_authed=True, photos=photos, albums=albums)
-
-@main_bp.route('/photos/upload', methods=['POST'])
-def photos_upload():
-    from .models import Photo
-    from PIL import Image
-
-    files = request.files.getlist('photos')
-    album = request.form.get('album', '').strip() or 'General'
-    caption = request.form.get('caption', '').strip()
-    uploader = request.form.get('uploader', 'Unknown')
-
-    for file in files:
-        if file and file.filename:
-            filename = secure_filename(f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{file.filename}")
-            filepath = os.path.join(PHOTOS_FOLDER, filename)
-            file.save(filepath)
-
-            # Create thumbnail
-            try:
-                img = Image.open(filepath)
-                img.thumbnail((400, 400))
-                thumb_path = os.path.join(PHOTOS_FOLDER, 'thumbs', filename)
-                img.save(thumb_path)
-            except:
-                pass
-
-            photo = Photo(
-                filename=filename,
-                album=album,
-                caption=caption,
-                uploader=uploader,
-                upload_time=datetime.now()
-            )
-            db.session.add(photo)
-
-    db.session.commit()
-    flash('Photos uploaded successfully!', 'success')
-    return redirect(url_for('main.photos'))
-
-@main_bp.route('/photos/full/<filename>')
-def photos_full(filename):
-    return send_from_directory(PHOTOS_FOLDER, filename)
-
-@main_bp.route('/photos/thumb/<filename>')
-def photos_thumb(filename):
-    thumb_path = os.path.join(PHOTOS_FOLDER, 'thumbs', filename)
-    if os.path.exists(thumb_path):
-        return send_from_directory(os.path.join(PHOTOS_FOLDER, 'thumbs'), filename)
-    return send_from_directory(PHOTOS_FOLDER, filename)
-
-@main_bp.route('/photos/get/<int:photo_id>')
-def photos_get(photo_id):
-    from .models import Photo
-    photo = Photo.query.get_or_404(photo_id)
-    return jsonify({
-        'filename': photo.filename,
-        'caption': photo.caption,
-        'uploader': photo.uploader,
-        'upload_time': photo.upload_time.strftime('%B %d, %Y')
-    })
-
-@main_bp.route('/photos/delete/<int:photo_id>', methods=['POST'])
-def photos_delete(photo_id):
-    from .models import Photo
-    photo = Photo.query.get_or_404(photo_id)
-
-    # Delete files
-    try:
-        os.remove(os.path.join(PHOTOS_FOLDER, photo.filename))
-        os.remove(os.path.join(PHOTOS_FOLDER, 'thumbs', photo.filename))
-    except:
-        pass
-
-    db.session.delete(photo)
-    db.session.commit()
-    return jsonify({'success': True})
-
 # Meal Planner
 @main_bp.route('/meals')
 def meals():
@@ -2327,6 +1701,8 @@ def meals_favorite_add():
 
     fav = FavoriteMeal(name=name, ingredients=ingredients, creator=creator)
     db.session.add(fav)
+    db.session.flush()
+    index_ingredients(db.session, 'meal', fav.id, ingredients)
     db.session.commit()
     flash('Favorite meal added!', 'success')
     return redirect(url_for('main.meals'))
@@ -2335,6 +1711,7 @@ def meals_favorite_add():
 def meals_favorite_delete(fav_id):
     from .models import FavoriteMeal
     fav = FavoriteMeal.query.get_or_404(fav_id)
+    unindex_ingredients(db.session, 'meal', fav.id)
     db.session.delete(fav)
     db.session.commit()
     return jsonify({'success': True})
@@ -2478,299 +1855,6 @@ def petcare_event_delete(event_id):
     db.session.commit()
     return jsonify({'success': True})
 
-# Weather Widget
-import requests
-
-def get_weather_data(location=None, lat=None, lon=None):
-    """Fetch weather data from Open-Meteo API (free, no API key needed)"""
-    print(f"[DEBUG] get_weather_data called with location={location}, lat={lat}, lon={lon}")
-    try:
-        # Default to ZIP 47725 (Evansville, IN area)
-        if not location and not (lat and lon):
-            location = "47725"
-            print(f"[DEBUG] Using default location: {location}")
-
-        # If location is provided, try to geocode it
-        if location:
-            # Use OpenWeatherMap geocoding (can also work without API key for basic lookups)
-            # Or use Open-Meteo's geocoding
-            geo_url = f"https://geocoding-api.open-meteo.com/v1/search?name={location}&count=1&language=en&format=json"
-            print(f"[DEBUG] Geocoding URL: {geo_url}")
-            geo_response = requests.get(geo_url, timeout=5)
-            print(f"[DEBUG] Geocoding response status: {geo_response.status_code}")
-            if geo_response.ok:
-                geo_data = geo_response.json()
-                print(f"[DEBUG] Geocoding data: {geo_data}")
-                if geo_data.get('results'):
-                    result = geo_data['results'][0]
-                    lat = result['latitude']
-                    lon = result['longitude']
-                    location_name = result.get('name', location)
-                    country = result.get('country', '')
-                    admin1 = result.get('admin1', '')
-                    location_display = f"{location_name}, {admin1}, {country}" if admin1 else f"{location_name}, {country}"
-                    print(f"[DEBUG] Geocoded: {location_display} at {lat}, {lon}")
-                else:
-                    print("[DEBUG] No geocoding results")
-                    return None
-            else:
-                print(f"[DEBUG] Geocoding failed with status {geo_response.status_code}")
-                return None
-
-        if not (lat and lon):
-            print("[DEBUG] No lat/lon available")
-            return None
-
-        # Fetch comprehensive weather from Open-Meteo (all free data)
-        weather_url = (
-            f"https://api.open-meteo.com/v1/forecast?"
-            f"latitude={lat}&longitude={lon}&"
-            f"current=temperature_2m,relative_humidity_2m,apparent_temperature,precipitation,weather_code,"
-            f"wind_speed_10m,wind_direction_10m,wind_gusts_10m,pressure_msl,cloud_cover,visibility,uv_index,is_day&"
-            f"hourly=temperature_2m,precipitation_probability,weather_code,wind_speed_10m,relative_humidity_2m&"
-            f"daily=weather_code,temperature_2m_max,temperature_2m_min,sunrise,sunset,uv_index_max,"
-            f"precipitation_probability_max,precipitation_sum,wind_speed_10m_max,wind_gusts_10m_max&"
-            f"temperature_unit=fahrenheit&wind_speed_unit=mph&precipitation_unit=inch&timezone=auto&forecast_days=7"
-        )
-        print(f"[DEBUG] Weather URL: {weather_url}")
-
-        weather_response = requests.get(weather_url, timeout=10)
-        print(f"[DEBUG] Weather response status: {weather_response.status_code}")
-        if not weather_response.ok:
-            print("[DEBUG] Weather API request failed")
-            return None
-
-        data = weather_response.json()
-        current = data.get('current', {})
-        hourly = data.get('hourly', {})
-        daily = data.get('daily', {})
-        print(f"[DEBUG] Weather data: {current}")
-        print(f"[DEBUG] Daily forecast data keys: {daily.keys() if daily else 'None'}")
-
-        # Map weather codes to descriptions and icons
-        weather_code = current.get('weather_code', 0)
-        weather_desc, weather_icon = map_weather_code(weather_code)
-
-        # Wind direction to compass
-        def wind_direction_to_compass(degrees):
-            if degrees is None:
-                return "N/A"
-            directions = ["N", "NNE", "NE", "ENE", "E", "ESE", "SE", "SSE",
-                         "S", "SSW", "SW", "WSW", "W", "WNW", "NW", "NNW"]
-            idx = round(degrees / 22.5) % 16
-            return directions[idx]
-
-        # Process hourly forecast (next 24 hours)
-        hourly_list = []
-        if hourly:
-            h_times = hourly.get('time', [])
-            h_temps = hourly.get('temperature_2m', [])
-            h_precip_prob = hourly.get('precipitation_probability', [])
-            h_weather_codes = hourly.get('weather_code', [])
-            h_wind_speeds = hourly.get('wind_speed_10m', [])
-            h_humidity = hourly.get('relative_humidity_2m', [])
-
-            # Get next 24 hours
-            for i in range(min(24, len(h_times))):
-                try:
-                    time_obj = datetime.fromisoformat(h_times[i].replace('Z', '+00:00'))
-                    hour_display = time_obj.strftime('%I %p')  # 12-hour format
-                    h_code = h_weather_codes[i] if i < len(h_weather_codes) else 0
-                    h_desc, h_icon = map_weather_code(h_code)
-
-                    hourly_list.append({
-                        'hour': hour_display,
-                        'temperature': round(h_temps[i]) if i < len(h_temps) else 0,
-                        'precipitation_prob': h_precip_prob[i] if i < len(h_precip_prob) else 0,
-                        'weather_code': h_code,
-                        'icon': h_icon,
-                        'description': h_desc,
-                        'wind_speed': round(h_wind_speeds[i], 1) if i < len(h_wind_speeds) else 0,
-                        'humidity': h_humidity[i] if i < len(h_humidity) else 0
-                    })
-                except (IndexError, ValueError) as e:
-                    print(f"[DEBUG] Error processing hourly {i}: {e}")
-                    continue
-
-        # Process 5-day forecast (skip today, take next 5 days)
-        forecast_list = []
-        if daily:
-            dates = daily.get('time', [])
-            weather_codes = daily.get('weather_code', [])
-            temp_max = daily.get('temperature_2m_max', [])
-            temp_min = daily.get('temperature_2m_min', [])
-            sunrise = daily.get('sunrise', [])
-            sunset = daily.get('sunset', [])
-            uv_max = daily.get('uv_index_max', [])
-            precip_prob = daily.get('precipitation_probability_max', [])
-            precip_sum = daily.get('precipitation_sum', [])
-            wind_max = daily.get('wind_speed_10m_max', [])
-            gust_max = daily.get('wind_gusts_10m_max', [])
-
-            # Skip first day (today), take next 5
-            for i in range(1, min(6, len(dates))):
-                try:
-                    date_obj = datetime.strptime(dates[i], '%Y-%m-%d')
-                    day_name = date_obj.strftime('%a')  # Mon, Tue, etc.
-                    fc_code = weather_codes[i] if i < len(weather_codes) else 0
-                    fc_desc, fc_icon = map_weather_code(fc_code)
-
-                    # Parse sunrise/sunset
-                    sunrise_time = datetime.fromisoformat(sunrise[i].replace('Z', '+00:00')).strftime('%I:%M %p') if i < len(sunrise) and sunrise[i] else 'N/A'
-                    sunset_time = datetime.fromisoformat(sunset[i].replace('Z', '+00:00')).strftime('%I:%M %p') if i < len(sunset) and sunset[i] else 'N/A'
-
-                    forecast_list.append({
-                        'day': day_name,
-                        'date': dates[i],
-                        'weather_code': fc_code,
-                        'icon': fc_icon,
-                        'description': fc_desc,
-                        'high': round(temp_max[i]),
-                        'low': round(temp_min[i]),
-                        'sunrise': sunrise_time,
-                        'sunset': sunset_time,
-                        'uv_max': round(uv_max[i], 1) if i < len(uv_max) and uv_max[i] else 0,
-                        'precipitation_prob': precip_prob[i] if i < len(precip_prob) else 0,
-                        'precipitation_sum': round(precip_sum[i], 2) if i < len(precip_sum) else 0,
-                        'wind_max': round(wind_max[i], 1) if i < len(wind_max) else 0,
-                        'wind_gusts_max': round(gust_max[i], 1) if i < len(gust_max) else 0
-                    })
-                except (IndexError, ValueError) as e:
-                    print(f"[DEBUG] Error processing forecast day {i}: {e}")
-                    continue
-
-        # Today's detailed data from daily[0]
-        today_data = {}
-        if daily and len(daily.get('time', [])) > 0:
-            try:
-                sunrise_today = datetime.fromisoformat(daily['sunrise'][0].replace('Z', '+00:00')).strftime('%I:%M %p') if daily.get('sunrise') else 'N/A'
-                sunset_today = datetime.fromisoformat(daily['sunset'][0].replace('Z', '+00:00')).strftime('%I:%M %p') if daily.get('sunset') else 'N/A'
-                today_data = {
-                    'sunrise': sunrise_today,
-                    'sunset': sunset_today,
-                    'uv_index': round(daily['uv_index_max'][0], 1) if daily.get('uv_index_max') else 0,
-                    'precip_prob': daily['precipitation_probability_max'][0] if daily.get('precipitation_probability_max') else 0,
-                    'precip_sum': round(daily['precipitation_sum'][0], 2) if daily.get('precipitation_sum') else 0
-                }
-            except (IndexError, ValueError, KeyError) as e:
-                print(f"[DEBUG] Error processing today's data: {e}")
-
-        # Add high/low from today's daily data
-        today_high = round(daily['temperature_2m_max'][0]) if daily and daily.get('temperature_2m_max') and len(daily['temperature_2m_max']) > 0 else 0
-        today_low = round(daily['temperature_2m_min'][0]) if daily and daily.get('temperature_2m_min') and len(daily['temperature_2m_min']) > 0 else 0
-
-        result = {
-            'location': location_display if location else f"{lat}, {lon}",
-            'current': {
-                'temperature': round(current.get('temperature_2m', 0)),
-                'feels_like': round(current.get('apparent_temperature', 0)),
-                'humidity': current.get('relative_humidity_2m', 0),
-                'wind_speed': round(current.get('wind_speed_10m', 0), 1),
-                'wind_direction': wind_direction_to_compass(current.get('wind_direction_10m')),
-                'wind_direction_degrees': current.get('wind_direction_10m', 0),
-                'wind_gusts': round(current.get('wind_gusts_10m', 0), 1),
-                'pressure': round(current.get('pressure_msl', 0)),
-                'cloud_cover': current.get('cloud_cover', 0),
-                'visibility': round(current.get('visibility', 0) / 1609.34, 1),  # meters to miles
-                'uv_index': round(current.get('uv_index', 0), 1),
-                'is_day': current.get('is_day', 1),
-                'weather_code': weather_code,
-                'description': weather_desc,
-                'icon': weather_icon
-            },
-            'today': {
-                'high': today_high,
-                'low': today_low,
-                'sunrise': today_data.get('sunrise', 'N/A'),
-                'sunset': today_data.get('sunset', 'N/A'),
-                'uv_index': today_data.get('uv_index', 0),
-                'precip_prob': today_data.get('precip_prob', 0),
-                'precip_sum': today_data.get('precip_sum', 0)
-            },
-            'forecast': forecast_list,
-            'hourly': hourly_list
-        }
-        print(f"[DEBUG] Returning weather result with {len(forecast_list)} forecast days and {len(hourly_list)} hourly entries")
-        return result
-    except Exception as e:
-        print(f"[ERROR] Weather fetch error: {e}")
-        import traceback
-        traceback.print_exc()
-        return None
-
-def map_weather_code(code):
-    """Map WMO weather codes to descriptions and Font Awesome icons"""
-    weather_map = {
-        0: ("Clear sky", "fa-sun"),
-        1: ("Mainly clear", "fa-sun"),
-        2: ("Partly cloudy", "fa-cloud-sun"),
-        3: ("Overcast", "fa-cloud"),
-        45: ("Foggy", "fa-smog"),
-        48: ("Foggy", "fa-smog"),
-        51: ("Light drizzle", "fa-cloud-rain"),
-        53: ("Moderate drizzle", "fa-cloud-rain"),
-        55: ("Dense drizzle", "fa-cloud-rain"),
-        61: ("Slight rain", "fa-cloud-rain"),
-        63: ("Moderate rain", "fa-cloud-showers-heavy"),
-        65: ("Heavy rain", "fa-cloud-showers-heavy"),
-        71: ("Slight snow", "fa-snowflake"),
-        73: ("Moderate snow", "fa-snowflake"),
-        75: ("Heavy snow", "fa-snowflake"),
-        77: ("Snow grains", "fa-snowflake"),
-        80: ("Slight rain showers", "fa-cloud-rain"),
-        81: ("Moderate rain showers", "fa-cloud-showers-heavy"),
-        82: ("Violent rain showers", "fa-cloud-showers-heavy"),
-        85: ("Slight snow showers", "fa-snowflake"),
-        86: ("Heavy snow showers", "fa-snowflake"),
-        95: ("Thunderstorm", "fa-cloud-bolt"),
-        96: ("Thunderstorm with hail", "fa-cloud-bolt"),
-        99: ("Thunderstorm with heavy hail", "fa-cloud-bolt"),
-    }
-    return weather_map.get(code, ("Unknown", "fa-cloud"))
-
-@main_bp.route('/weather')
-def weather():
-    print("[DEBUG] /weather route called")
-    config = current_app.config['HOMEHUB_CONFIG']
-    # Default to ZIP 47725
-    weather_data = get_weather_data(location="47725")
-    print(f"[DEBUG] Weather page rendering with data: {weather_data}")
-    return render_template('weather.html', config=config, is_authed=True, weather=weather_data, location="47725")
-
-@main_bp.route('/weather/update', methods=['POST'])
-def weather_update():
-    print("[DEBUG] /weather/update route called")
-    data = request.get_json()
-    print(f"[DEBUG] Request data: {data}")
-    location = data.get('location')
-    lat = data.get('lat')
-    lon = data.get('lon')
-
-    weather_data = get_weather_data(location=location, lat=lat, lon=lon)
-    print(f"[DEBUG] Weather update result: {weather_data}")
-
-    if weather_data:
-        response = jsonify({'success': True, 'weather': weather_data})
-        print(f"[DEBUG] Returning success response")
-        return response
-    else:
-        print("[DEBUG] Returning error response")
-        return jsonify({'success': False, 'error': 'Could not fetch weather data'})
-
-@main_bp.route('/api/weather', methods=['GET'])
-def api_weather():
-    """API endpoint for weather data (used by widget)"""
-    location = request.args.get('zip')
-    lat = request.args.get('lat')
-    lon = request.args.get('lon')
-
-    weather_data = get_weather_data(location=location, lat=lat, lon=lon)
-
-    if weather_data:
-        return jsonify(weather_data)
-    else:
-        return jsonify({'error': 'Could not fetch weather data'}), 400
-
 # Countdown Timers
 @main_bp.route('/countdowns')
 def countdowns():
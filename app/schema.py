@@ -0,0 +1,577 @@
+"""Versioned schema migrations for the SQLite database.
+
+Each migration is a (version, name, function) entry in MIGRATIONS. Applied
+versions are recorded in the schema_version table. ensure_schema() runs on
+every boot but costs a single query when the schema is already current. The
+upgrade itself runs under a file lock, so concurrent gunicorn workers and the
+sync daemon never migrate at the same time.
+
+Migration functions receive a SQLAlchemy connection inside a transaction and
+must be idempotent, tolerating columns and tables that already exist. Steps
+spell out the DDL, SQL, constants and helpers they apply instead of reading
+them from the live modules: a step has to do the same thing on every
+database, however the code has moved on since it was written. Only file
+locations still come from the app. Filling in existing rows from files
+(hashes, EXIF headers) is not done here: the step schedules an app/backfill.py
+job, so the migration transaction never waits on the disk.
+
+Run pending migrations ahead of boot with:  python migrations/migrate.py
+"""
+import html
+import logging
+import os
+import re
+import unicodedata
+from contextlib import contextmanager
+from datetime import datetime
+from urllib.parse import urlsplit
+
+from sqlalchemy import DateTime, bindparam, text
+from sqlalchemy.exc import OperationalError
+
+from . import db
+
+try:
+    import fcntl
+except ImportError:  # Windows dev machines: fall back to no cross-process lock
+    fcntl = None
+
+logger = logging.getLogger('homehub.schema')
+
+
+def _columns(conn, table):
+    return {row[1] for row in conn.exec_driver_sql(f"PRAGMA table_info({table})")}
+
+
+def _add_column(conn, table, column, type_spec, default=None):
+    """ALTER TABLE ... ADD COLUMN unless the column already exists; backfill NULLs with default."""
+    if column in _columns(conn, table):
+        return
+    conn.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN {column} {type_spec}")
+    if default is not None:
+        conn.execute(text(f"UPDATE {table} SET {column}=:v WHERE {column} IS NULL"), {'v': default})
+
+
+_BACKFILL_TABLE = (
+    "CREATE TABLE IF NOT EXISTS backfill (name TEXT PRIMARY KEY, until_id INTEGER NOT NULL, "
+    "position INTEGER NOT NULL DEFAULT 0, scheduled_at TIMESTAMP, finished_at TIMESTAMP)"
+)
+
+
+def _schedule_backfill(conn, name, table):
+    """Queue the app/backfill.py job name over the rows table holds now; nothing when it is empty."""
+    conn.exec_driver_sql(_BACKFILL_TABLE)
+    conn.execute(text(
+        f"INSERT OR REPLACE INTO backfill (name, until_id, position, scheduled_at) "
+        f"SELECT :n, (SELECT MAX(id) FROM {table}), 0, :t WHERE EXISTS (SELECT 1 FROM {table})"
+    ), {'n': name, 't': datetime.utcnow()})
+
+
+# ---------------------- Migration steps ----------------------
+
+# Model tables as of migration 1; later tables and columns come from their own steps
+_M001_TABLES = (
+    "bitwarden_vault (id INTEGER NOT NULL, username VARCHAR(64) NOT NULL, bitwarden_email VARCHAR(256) NOT NULL, "
+    "setup_completed BOOLEAN, timestamp DATETIME, PRIMARY KEY (id), UNIQUE (username))",
+    "chore (id INTEGER NOT NULL, description TEXT NOT NULL, creator VARCHAR(64), timestamp DATETIME, done BOOLEAN, "
+    "PRIMARY KEY (id))",
+    "countdown (id INTEGER NOT NULL, event_name VARCHAR(256) NOT NULL, event_date DATE NOT NULL, icon VARCHAR(32), "
+    "description TEXT, creator VARCHAR(64), timestamp DATETIME, PRIMARY KEY (id))",
+    "expiry_item (id INTEGER NOT NULL, name VARCHAR(256) NOT NULL, expiry_date DATE, creator VARCHAR(64), "
+    "timestamp DATETIME, PRIMARY KEY (id))",
+    "favorite_meal (id INTEGER NOT NULL, name VARCHAR(256) NOT NULL, ingredients TEXT, creator VARCHAR(64), "
+    "timestamp DATETIME, PRIMARY KEY (id))",
+    "file (id INTEGER NOT NULL, filename VARCHAR(256) NOT NULL, creator VARCHAR(64) NOT NULL, "
+    "upload_time DATETIME, PRIMARY KEY (id))",
+    "grocery_history (id INTEGER NOT NULL, item VARCHAR(256) NOT NULL, creator VARCHAR(64), timestamp DATETIME, "
+    "PRIMARY KEY (id))",
+    "home_status (id INTEGER NOT NULL, name VARCHAR(64) NOT NULL, status VARCHAR(16), PRIMARY KEY (id))",
+    "maintenance_task (id INTEGER NOT NULL, task_name VARCHAR(256) NOT NULL, description TEXT, icon VARCHAR(32), "
+    "frequency_days INTEGER, next_due DATE, last_completed DATE, status VARCHAR(16), creator VARCHAR(64), "
+    "timestamp DATETIME, PRIMARY KEY (id))",
+    "meal_plan (id INTEGER NOT NULL, day VARCHAR(16) NOT NULL, meal_type VARCHAR(16) NOT NULL, "
+    "meal_name VARCHAR(256), PRIMARY KEY (id))",
+    "media (id INTEGER NOT NULL, title VARCHAR(256), url VARCHAR(512), creator VARCHAR(64), "
+    "download_time DATETIME, filepath VARCHAR(512), status VARCHAR(32), progress TEXT, PRIMARY KEY (id))",
+    "member_status (id INTEGER NOT NULL, name VARCHAR(64) NOT NULL, text TEXT, updated_at DATETIME, "
+    "PRIMARY KEY (id))",
+    "note (id INTEGER NOT NULL, content TEXT NOT NULL, creator VARCHAR(64) NOT NULL, timestamp DATETIME, "
+    "PRIMARY KEY (id))",
+    "notice (id INTEGER NOT NULL, content TEXT, updated_by VARCHAR(64), updated_at DATETIME, PRIMARY KEY (id))",
+    "pdf (id INTEGER NOT NULL, filename VARCHAR(256), creator VARCHAR(64), upload_time DATETIME, "
+    "compressed_path VARCHAR(512), PRIMARY KEY (id))",
+    "pet (id INTEGER NOT NULL, name VARCHAR(128) NOT NULL, species VARCHAR(64), breed VARCHAR(128), "
+    "icon VARCHAR(32), birth_date DATE, creator VARCHAR(64), timestamp DATETIME, PRIMARY KEY (id))",
+    "photo (id INTEGER NOT NULL, filename VARCHAR(256) NOT NULL, album VARCHAR(128), caption VARCHAR(512), "
+    "uploader VARCHAR(64), upload_time DATETIME, PRIMARY KEY (id))",
+    "qr_code (id INTEGER NOT NULL, text TEXT NOT NULL, filename VARCHAR(256) NOT NULL, creator VARCHAR(64), "
+    "timestamp DATETIME, PRIMARY KEY (id))",
+    "recipe (id INTEGER NOT NULL, title VARCHAR(256) NOT NULL, link VARCHAR(512), ingredients TEXT, "
+    "instructions TEXT, creator VARCHAR(64), timestamp DATETIME, PRIMARY KEY (id))",
+    "recurring_expense (id INTEGER NOT NULL, title VARCHAR(256) NOT NULL, unit_price FLOAT, "
+    "default_quantity FLOAT, frequency VARCHAR(16), category VARCHAR(64), monthly_mode VARCHAR(16), "
+    "start_date DATE, end_date DATE, last_generated_date DATE, creator VARCHAR(64), timestamp DATETIME, "
+    "PRIMARY KEY (id))",
+    "reminder (id INTEGER NOT NULL, date DATE NOT NULL, time VARCHAR(5), title VARCHAR(256) NOT NULL, "
+    "description TEXT, creator VARCHAR(64), timestamp DATETIME, category VARCHAR(64), color VARCHAR(16), "
+    "updated_at DATETIME, duration INTEGER, PRIMARY KEY (id))",
+    "shopping_item (id INTEGER NOT NULL, item VARCHAR(256) NOT NULL, checked BOOLEAN, creator VARCHAR(64), "
+    "timestamp DATETIME, PRIMARY KEY (id))",
+    "short_url (id INTEGER NOT NULL, original_url VARCHAR(512) NOT NULL, short_code VARCHAR(16) NOT NULL, "
+    "creator VARCHAR(64), timestamp DATETIME, PRIMARY KEY (id), UNIQUE (short_code))",
+    "user (id INTEGER NOT NULL, username VARCHAR(64) NOT NULL, password_hash VARCHAR(256) NOT NULL, "
+    "caldav_password_hash VARCHAR(256), is_admin BOOLEAN, password_set BOOLEAN, calendar_write_enabled BOOLEAN, "
+    "created_at DATETIME, last_login DATETIME, PRIMARY KEY (id), UNIQUE (username))",
+    "expense_entry (id INTEGER NOT NULL, date DATE NOT NULL, title VARCHAR(256) NOT NULL, category VARCHAR(64), "
+    "unit_price FLOAT, quantity FLOAT, amount FLOAT NOT NULL, payer VARCHAR(64), recurring_id INTEGER, "
+    "timestamp DATETIME, PRIMARY KEY (id), FOREIGN KEY(recurring_id) REFERENCES recurring_expense (id))",
+    "pet_care_event (id INTEGER NOT NULL, pet_id INTEGER NOT NULL, event_type VARCHAR(64) NOT NULL, "
+    "description TEXT, event_date DATE NOT NULL, next_due DATE, creator VARCHAR(64), timestamp DATETIME, "
+    "PRIMARY KEY (id), FOREIGN KEY(pet_id) REFERENCES pet (id))",
+)
+
+
+def _m001_baseline(conn):
+    """Model tables plus the columns older installs were missing (formerly done ad hoc in create_app)."""
+    for table in _M001_TABLES:
+        conn.exec_driver_sql(f"CREATE TABLE IF NOT EXISTS {table}")
+    _add_column(conn, 'chore', 'done', 'INTEGER DEFAULT 0')
+    _add_column(conn, 'media', 'status', "TEXT DEFAULT 'done'")
+    _add_column(conn, 'media', 'progress', 'TEXT')
+    _add_column(conn, 'reminder', 'category', 'TEXT')
+    _add_column(conn, 'reminder', 'color', 'TEXT')
+    _add_column(conn, 'reminder', 'updated_at', 'TIMESTAMP')
+    _add_column(conn, 'reminder', 'time', 'TEXT')
+    _add_column(conn, 'reminder', 'duration', 'INTEGER')
+    _add_column(conn, 'recurring_expense', 'monthly_mode', 'TEXT', 'day_of_month')
+    _add_column(conn, 'recurring_expense', 'category', 'TEXT')
+    _add_column(conn, 'user', 'caldav_password_hash', 'TEXT')
+    # Key/value settings (currency, expense categories); not an ORM model
+    conn.exec_driver_sql("CREATE TABLE IF NOT EXISTS app_setting (key TEXT PRIMARY KEY, value TEXT)")
+
+
+def _m002_calendar_write_permission(conn):
+    """Add user.calendar_write_enabled and grant it to admins (was migrations/add_calendar_write_permission.py)."""
+    _add_column(conn, 'user', 'calendar_write_enabled', 'INTEGER', 0)
+    conn.exec_driver_sql("UPDATE user SET calendar_write_enabled=1 WHERE is_admin=1")
+
+
+def _m003_secondary_indexes(conn):
+    """Indexes for the hot date/name/foreign-key filters (names match the model declarations)."""
+    for name, table, columns in (
+        ('ix_reminder_date', 'reminder', 'date'),
+        ('ix_expense_entry_date', 'expense_entry', 'date'),
+        ('ix_expense_entry_recurring_id_date', 'expense_entry', 'recurring_id, date'),
+        ('ix_grocery_history_timestamp', 'grocery_history', 'timestamp'),
+        ('ix_home_status_name', 'home_status', 'name'),
+        ('ix_member_status_name', 'member_status', 'name'),
+        ('ix_pet_care_event_pet_id', 'pet_care_event', 'pet_id'),
+        ('ix_photo_upload_time', 'photo', 'upload_time'),
+        ('ix_photo_album', 'photo', 'album'),
+    ):
+        conn.exec_driver_sql(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})")
+    conn.exec_driver_sql("ANALYZE")
+
+
+def _m004_unique_recurring_occurrence(conn):
+    """Make (recurring_id, date) unique, dropping duplicate occurrences older versions could create."""
+    conn.exec_driver_sql(
+        "DELETE FROM expense_entry WHERE recurring_id IS NOT NULL AND id NOT IN "
+        "(SELECT MIN(id) FROM expense_entry WHERE recurring_id IS NOT NULL GROUP BY recurring_id, date)"
+    )
+    conn.exec_driver_sql("DROP INDEX IF EXISTS ix_expense_entry_recurring_id_date")
+    conn.exec_driver_sql(
+        "CREATE UNIQUE INDEX ix_expense_entry_recurring_id_date ON expense_entry (recurring_id, date)"
+    )
+
+
+_M005_HALF_LIFE_DAYS = 30.0  # app/grocery.py HALF_LIFE_DAYS and MIN_SCORE as of migration 5
+_M005_MIN_SCORE = 0.05
+
+
+def _m005_grocery_frequency(conn):
+    """Maintained grocery_frequency table for shopping suggestions, backfilled from grocery_history."""
+    conn.exec_driver_sql(
+        'CREATE TABLE IF NOT EXISTS grocery_frequency ("key" VARCHAR(256) NOT NULL, item VARCHAR(256) NOT NULL, '
+        'score FLOAT NOT NULL, last_seen DATETIME, PRIMARY KEY ("key"))'
+    )
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_grocery_frequency_score ON grocery_frequency (score)")
+    now = datetime.utcnow()
+    totals = {}  # key -> [item, score, last_seen]; rows come oldest first so item/last_seen end up newest
+    rows = conn.execute(text("SELECT item, timestamp FROM grocery_history ORDER BY timestamp").columns(timestamp=DateTime))
+    for item, ts in rows:
+        key = ' '.join((item or '').split()).lower()
+        if not key:
+            continue
+        ts = ts or now
+        entry = totals.setdefault(key, [item, 0.0, ts])
+        entry[0], entry[2] = item.strip(), ts
+        entry[1] += 0.5 ** (max((now - ts).total_seconds() / 86400.0, 0.0) / _M005_HALF_LIFE_DAYS)
+    conn.exec_driver_sql("DELETE FROM grocery_frequency")
+    live = [{'k': k, 'i': i, 's': sc, 't': ts} for k, (i, sc, ts) in totals.items() if sc >= _M005_MIN_SCORE]
+    if live:
+        conn.execute(text(
+            "INSERT INTO grocery_frequency (key, item, score, last_seen) VALUES (:k, :i, :s, :t)"
+        ).bindparams(bindparam('t', type_=DateTime)), live)
+    conn.execute(text("REPLACE INTO app_setting (key, value) VALUES ('grocery_decayed_at', :v)"), {'v': now.isoformat()})
+
+
+def _m006_host(url):
+    """downloads.host_of() as of migration 6."""
+    host = (urlsplit(url).hostname or '').lower()
+    return host[4:] if host.startswith('www.') else host
+
+
+def _m006_download_jobs(conn):
+    """download_job queue; media rows stuck in 'pending' by the old thread-per-request downloader get a job."""
+    conn.exec_driver_sql(
+        "CREATE TABLE IF NOT EXISTS download_job (id INTEGER NOT NULL, media_id INTEGER, url VARCHAR(512) NOT NULL, "
+        "host VARCHAR(255), fmt VARCHAR(16), quality VARCHAR(128), output_base VARCHAR(128), priority INTEGER, "
+        "status VARCHAR(16), attempts INTEGER, error TEXT, created_at DATETIME, started_at DATETIME, "
+        "finished_at DATETIME, PRIMARY KEY (id), FOREIGN KEY(media_id) REFERENCES media (id))"
+    )
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_download_job_media_id ON download_job (media_id)")
+    conn.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_download_job_status_priority ON download_job (status, priority, id)"
+    )
+    stuck = conn.exec_driver_sql(
+        "SELECT id, url FROM media WHERE status = 'pending' "
+        "AND id NOT IN (SELECT media_id FROM download_job WHERE media_id IS NOT NULL)"
+    ).fetchall()
+    now = datetime.utcnow()
+    for media_id, url in stuck:
+        if not url:
+            conn.execute(text("UPDATE media SET status = 'error', progress = NULL WHERE id = :id"), {'id': media_id})
+            continue
+        conn.execute(text(
+            "INSERT INTO download_job (media_id, url, host, fmt, quality, output_base, priority, status, attempts, created_at) "
+            "VALUES (:id, :url, :host, 'mp4', 'best', :base, 0, 'queued', 0, :now)"
+        ), {'id': media_id, 'url': url, 'host': _m006_host(url), 'base': f"media_{int(now.timestamp())}_{media_id}", 'now': now})
+        conn.execute(text("UPDATE media SET progress = 'Queued' WHERE id = :id"), {'id': media_id})
+
+
+def _m007_media_index(conn):
+    """media_file library index; the finished downloads are indexed by the app/backfill.py media_file job."""
+    conn.exec_driver_sql(
+        "CREATE TABLE IF NOT EXISTS media_file (id INTEGER NOT NULL, source_key VARCHAR(512) NOT NULL, "
+        "variant VARCHAR(255) NOT NULL, video_id VARCHAR(255), filepath VARCHAR(512) NOT NULL, size INTEGER, "
+        "checksum VARCHAR(64), hits INTEGER, created_at DATETIME, PRIMARY KEY (id))"
+    )
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_media_file_filepath ON media_file (filepath)")
+    conn.exec_driver_sql(
+        "CREATE UNIQUE INDEX IF NOT EXISTS ix_media_file_source_key_variant ON media_file (source_key, variant)"
+    )
+    _schedule_backfill(conn, 'media_file', 'download_job')
+
+
+def _m008_pdf_jobs(conn):
+    """PDF compression job columns; existing rows are finished jobs, sized from the files on disk."""
+    from .pdf_jobs import PDF_FOLDER
+    _add_column(conn, 'pdf', 'preset', 'TEXT', 'ebook')
+    _add_column(conn, 'pdf', 'status', "TEXT DEFAULT 'done'", 'done')
+    _add_column(conn, 'pdf', 'original_size', 'INTEGER')
+    _add_column(conn, 'pdf', 'compressed_size', 'INTEGER')
+    _add_column(conn, 'pdf', 'elapsed', 'FLOAT')
+    _add_column(conn, 'pdf', 'error', 'TEXT')
+    _add_column(conn, 'pdf', 'finished_at', 'TIMESTAMP')
+    rows = conn.exec_driver_sql("SELECT id, filename, compressed_path FROM pdf WHERE original_size IS NULL").fetchall()
+    for pdf_id, filename, compressed_path in rows:
+        sizes = {}
+        for key, name in (('o', filename), ('c', compressed_path)):
+            try:
+                sizes[key] = os.path.getsize(os.path.join(PDF_FOLDER, name)) if name else None
+            except OSError:
+                sizes[key] = None
+        conn.execute(text("UPDATE pdf SET original_size = :o, compressed_size = :c WHERE id = :id"), {**sizes, 'id': pdf_id})
+
+
+def _m009_pdf_hashes(conn):
+    """Content hash and hash-named storage for PDFs. Old rows stay unhashed: their originals may have been overwritten."""
+    _add_column(conn, 'pdf', 'stored_path', 'TEXT')
+    _add_column(conn, 'pdf', 'sha256', 'TEXT')
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_pdf_sha256_preset ON pdf (sha256, preset)")
+
+
+def _m010_photo_variants(conn):
+    """photo_variant table and photo.thumb_status; existing photos are queued for the thumbnail pipeline."""
+    conn.exec_driver_sql(
+        "CREATE TABLE IF NOT EXISTS photo_variant (id INTEGER NOT NULL, photo_id INTEGER NOT NULL, box INTEGER NOT NULL, "
+        "fmt VARCHAR(8) NOT NULL, filename VARCHAR(300) NOT NULL, width INTEGER, height INTEGER, bytes INTEGER, "
+        "PRIMARY KEY (id), FOREIGN KEY(photo_id) REFERENCES photo (id))"
+    )
+    conn.exec_driver_sql(
+        "CREATE UNIQUE INDEX IF NOT EXISTS ix_photo_variant_photo_id_box_fmt ON photo_variant (photo_id, box, fmt)"
+    )
+    _add_column(conn, 'photo', 'thumb_status', 'TEXT')
+    conn.exec_driver_sql("UPDATE photo SET thumb_status = 'pending' WHERE thumb_status IS NULL")
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_photo_filename ON photo (filename)")
+
+
+def _m011_photo_timeline(conn):
+    """EXIF columns, sort_time and the photo_bucket table.
+
+    Existing photos sort by upload time until the app/backfill.py photo_metadata job has read their
+    EXIF headers and moved them to the month they were taken.
+    """
+    for column, spec in (('taken_at', 'TIMESTAMP'), ('camera', 'TEXT'), ('width', 'INTEGER'), ('height', 'INTEGER'),
+                         ('has_gps', 'INTEGER DEFAULT 0'), ('sort_time', 'TIMESTAMP')):
+        _add_column(conn, 'photo', column, spec)
+    conn.exec_driver_sql(
+        "CREATE TABLE IF NOT EXISTS photo_bucket (album VARCHAR(128) NOT NULL, ym VARCHAR(7) NOT NULL, "
+        "count INTEGER NOT NULL, PRIMARY KEY (album, ym))"
+    )
+    conn.exec_driver_sql("UPDATE photo SET sort_time = COALESCE(upload_time, CURRENT_TIMESTAMP) WHERE sort_time IS NULL")
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_photo_sort_time_id ON photo (sort_time, id)")
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_photo_album_sort_time ON photo (album, sort_time, id)")
+    conn.exec_driver_sql("DELETE FROM photo_bucket")
+    conn.exec_driver_sql(
+        "INSERT INTO photo_bucket (album, ym, count) "
+        "SELECT COALESCE(album, ''), strftime('%Y-%m', sort_time), COUNT(*) FROM photo "
+        "WHERE sort_time IS NOT NULL GROUP BY COALESCE(album, ''), strftime('%Y-%m', sort_time)"
+    )
+    _schedule_backfill(conn, 'photo_metadata', 'photo')
+
+
+def _m012_photo_hashes(conn):
+    """photo.phash; existing photos are hashed by thumbnails.rescan_hashes() in the background."""
+    _add_column(conn, 'photo', 'phash', 'TEXT')
+
+
+def _m013_photo_checksums(conn):
+    """photo.crc32, filled in by album exports as they read each photo."""
+    _add_column(conn, 'photo', 'crc32', 'INTEGER')
+
+
+def _m014_list_page_indexes(conn):
+    """(sort column, id) indexes for the keyset-paginated list pages (app/pagination.py)."""
+    for table, column in (('note', 'timestamp'), ('file', 'upload_time'), ('media', 'download_time'),
+                          ('pdf', 'upload_time'), ('qr_code', 'timestamp'), ('short_url', 'timestamp'),
+                          ('recipe', 'timestamp'), ('chore', 'timestamp'), ('expiry_item', 'expiry_date')):
+        conn.exec_driver_sql(f"CREATE INDEX IF NOT EXISTS ix_{table}_{column}_id ON {table} ({column}, id)")
+
+
+# search_index sources as of migration 15 (app/search.py SOURCES): code, table, the columns whose
+# edits re-index a row, and the title and body SQL over the row alias {r}. The rowid is id * 8 + code.
+_M015_SOURCES = (
+    (1, 'note', ('content',), "''", '{r}.content'),
+    (2, 'recipe', ('title', 'ingredients', 'instructions'), '{r}.title',
+     "coalesce({r}.ingredients, '') || char(10) || coalesce({r}.instructions, '')"),
+    (3, 'reminder', ('title', 'description'), '{r}.title', '{r}.description'),
+    (4, 'expense_entry', ('title',), '{r}.title', "''"),
+    (5, 'shopping_item', ('item',), '{r}.item', "''"),
+    (6, 'favorite_meal', ('name', 'ingredients'), '{r}.name', '{r}.ingredients'),
+    (7, 'countdown', ('event_name', 'description'), '{r}.event_name', '{r}.description'),
+)
+
+
+def _m015_search_index(conn):
+    """FTS5 search_index with the triggers that keep it current, filled from existing rows (app/search.py)."""
+    conn.exec_driver_sql(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5("
+        "title, body, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+    )
+    conn.exec_driver_sql("INSERT INTO search_index (search_index, rank) VALUES ('rank', 'bm25(10.0, 1.0)')")
+    conn.exec_driver_sql("DELETE FROM search_index")
+    for code, table, columns, title, body in _M015_SOURCES:
+        def document(alias):
+            return f"{alias}.id * 8 + {code}, {title.format(r=alias)}, {body.format(r=alias)}"
+        conn.exec_driver_sql(
+            f"CREATE TRIGGER IF NOT EXISTS search_{table}_ai AFTER INSERT ON {table} BEGIN "
+            f"INSERT INTO search_index (rowid, title, body) VALUES ({document('new')}); END"
+        )
+        conn.exec_driver_sql(
+            f"CREATE TRIGGER IF NOT EXISTS search_{table}_ad AFTER DELETE ON {table} BEGIN "
+            f"DELETE FROM search_index WHERE rowid = old.id * 8 + {code}; END"
+        )
+        conn.exec_driver_sql(
+            f"CREATE TRIGGER IF NOT EXISTS search_{table}_au AFTER UPDATE OF {', '.join(columns)} ON {table} BEGIN "
+            f"DELETE FROM search_index WHERE rowid = old.id * 8 + {code}; "
+            f"INSERT INTO search_index (rowid, title, body) VALUES ({document('new')}); END"
+        )
+        conn.exec_driver_sql(f"INSERT INTO search_index (rowid, title, body) SELECT {document('r')} FROM {table} AS r")
+    conn.exec_driver_sql("INSERT INTO search_index (search_index) VALUES ('optimize')")
+
+
+# app/ingredients.py words() as of migration 16: letters-only words, minus units and preparation words
+_M016_TAG = re.compile(r'<[^>]*>')
+_M016_WORD = re.compile(r'[^\W\d_]+')
+_M016_MAX_WORD = 64
+_M016_SKIP = {
+    'g', 'gr', 'gram', 'kg', 'kilogram', 'mg', 'ml', 'cl', 'dl', 'l', 'liter', 'litre', 'oz', 'ounce', 'lb', 'pound',
+    'cup', 'tbsp', 'tbs', 'tablespoon', 'tsp', 'teaspoon', 'pinch', 'dash', 'handful', 'bunch', 'sprig', 'slice',
+    'piece', 'can', 'tin', 'jar', 'pack', 'package', 'packet', 'bottle', 'box', 'bag', 'pint', 'quart', 'stick',
+    'a', 'an', 'the', 'of', 'and', 'or', 'to', 'for', 'with', 'without', 'in', 'into', 'on', 'about', 'plus', 'some',
+    'few', 'more', 'extra', 'optional', 'taste', 'needed', 'serve', 'serving', 'garnish', 'x',
+    'fresh', 'freshly', 'chopped', 'diced', 'minced', 'sliced', 'grated', 'shredded', 'crushed', 'cubed', 'halved',
+    'quartered', 'peeled', 'seeded', 'beaten', 'melted', 'softened', 'cooked', 'boiled', 'roasted', 'toasted',
+    'dried', 'frozen', 'thawed', 'drained', 'rinsed', 'packed', 'heaping', 'level', 'finely', 'roughly', 'thinly',
+    'large', 'medium', 'small', 'big', 'whole', 'half', 'cold', 'warm', 'hot', 'room', 'temperature', 'ripe',
+}
+
+
+def _m016_singular(word):
+    if len(word) > 4 and word.endswith('ies'):
+        return word[:-3] + 'y'
+    if len(word) > 4 and word.endswith(('oes', 'ches', 'shes', 'sses', 'xes')):
+        return word[:-2]
+    if len(word) > 3 and word.endswith('s') and not word.endswith(('ss', 'us', 'is')):
+        return word[:-1]
+    return word
+
+
+def _m016_words(value):
+    plain = unicodedata.normalize('NFKD', html.unescape(_M016_TAG.sub(' ', value or '')).casefold())
+    plain = ''.join(c for c in plain if not unicodedata.combining(c))
+    seen = {}
+    for raw in _M016_WORD.findall(plain):
+        word = _m016_singular(raw)
+        if 2 <= len(word) <= _M016_MAX_WORD and word not in _M016_SKIP:
+            seen.setdefault(word, None)
+    return list(seen)
+
+
+def _m016_recipe_ingredients(conn):
+    """recipe_ingredient inverted index, filled from existing recipes and favorite meals (app/ingredients.py)."""
+    conn.exec_driver_sql(
+        "CREATE TABLE IF NOT EXISTS recipe_ingredient (ingredient VARCHAR(64) NOT NULL, kind VARCHAR(8) NOT NULL, "
+        "ref_id INTEGER NOT NULL, total INTEGER NOT NULL, PRIMARY KEY (ingredient, kind, ref_id)) WITHOUT ROWID"
+    )
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_recipe_ingredient_ref ON recipe_ingredient (kind, ref_id)")
+    conn.exec_driver_sql("DELETE FROM recipe_ingredient")
+    for kind, table in (('recipe', 'recipe'), ('meal', 'favorite_meal')):
+        for ref_id, ingredients in conn.exec_driver_sql(f"SELECT id, ingredients FROM {table}").fetchall():
+            found = _m016_words(ingredients)
+            if found:
+                conn.execute(text(
+                    "INSERT INTO recipe_ingredient (ingredient, kind, ref_id, total) VALUES (:w, :k, :r, :t)"
+                ), [{'w': w, 'k': kind, 'r': ref_id, 't': len(found)} for w in found])
+
+
+def _m017_pdf_job_owner(conn):
+    """pdf.worker, the web process a compression job belongs to; resume() leaves jobs of live workers alone."""
+    _add_column(conn, 'pdf', 'worker', 'INTEGER')
+
+
+def _m018_drop_photo_album_index(conn):
+    """Drop ix_photo_album (migration 3): ix_photo_album_sort_time (album, sort_time, id) serves every album filter."""
+    conn.exec_driver_sql("DROP INDEX IF EXISTS ix_photo_album")
+
+
+def _m019_expense_month_versions(conn):
+    """expense_month_version, bumped by triggers on every expense_entry write (app/expense_cache.py).
+
+    The month snapshot cache compares it on each lookup, so entries written by another process
+    (sync/recurring_expenses.py) show up at once instead of after the cache TTL.
+    """
+    conn.exec_driver_sql(
+        "CREATE TABLE IF NOT EXISTS expense_month_version (month TEXT PRIMARY KEY, version INTEGER NOT NULL)"
+    )
+    bump = ("INSERT INTO expense_month_version (month, version) VALUES (substr({r}.date, 1, 7), 1) "
+            "ON CONFLICT (month) DO UPDATE SET version = version + 1;")
+    for name, event, rows in (('ai', 'INSERT', ('new',)), ('ad', 'DELETE', ('old',)), ('au', 'UPDATE', ('old', 'new'))):
+        conn.exec_driver_sql(
+            f"CREATE TRIGGER IF NOT EXISTS expense_month_{name} AFTER {event} ON expense_entry BEGIN "
+            f"{' '.join(bump.format(r=r) for r in rows)} END"
+        )
+
+
+def _m020_pdf_job_boot_token(conn):
+    """pdf.owner, the boot token of the web process holding a compression job; replaces the pid in pdf.worker."""
+    _add_column(conn, 'pdf', 'owner', 'TEXT')
+    # DROP COLUMN needs SQLite 3.35; older builds keep the unused column
+    version = tuple(int(part) for part in conn.exec_driver_sql("SELECT sqlite_version()").scalar().split('.'))
+    if 'worker' in _columns(conn, 'pdf') and version >= (3, 35):
+        conn.exec_driver_sql("ALTER TABLE pdf DROP COLUMN worker")
+
+
+def _m021_backfill_queue(conn):
+    """backfill, the file-reading jobs migrations 7 and 11 leave to app/backfill.py (older installs ran them inline)."""
+    conn.exec_driver_sql(_BACKFILL_TABLE)
+
+
+MIGRATIONS = [
+    (1, 'baseline tables and legacy columns', _m001_baseline),
+    (2, 'calendar write permission', _m002_calendar_write_permission),
+    (3, 'secondary indexes for hot filters', _m003_secondary_indexes),
+    (4, 'unique recurring expense occurrence', _m004_unique_recurring_occurrence),
+    (5, 'grocery frequency table', _m005_grocery_frequency),
+    (6, 'media download queue', _m006_download_jobs),
+    (7, 'media library index', _m007_media_index),
+    (8, 'pdf compression jobs', _m008_pdf_jobs),
+    (9, 'pdf content hashes', _m009_pdf_hashes),
+    (10, 'photo thumbnail variants', _m010_photo_variants),
+    (11, 'photo timeline buckets', _m011_photo_timeline),
+    (12, 'photo perceptual hashes', _m012_photo_hashes),
+    (13, 'photo checksums for album export', _m013_photo_checksums),
+    (14, 'list page indexes', _m014_list_page_indexes),
+    (15, 'full-text search index', _m015_search_index),
+    (16, 'recipe ingredient index', _m016_recipe_ingredients),
+    (17, 'pdf job owner', _m017_pdf_job_owner),
+    (18, 'drop redundant photo album index', _m018_drop_photo_album_index),
+    (19, 'expense month versions', _m019_expense_month_versions),
+    (20, 'pdf job boot token', _m020_pdf_job_boot_token),
+    (21, 'backfill queue', _m021_backfill_queue),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+# ---------------------- Runner ----------------------
+
+def current_version(conn):
+    """Highest applied migration version, or 0 for an unversioned database."""
+    try:
+        return conn.exec_driver_sql("SELECT MAX(version) FROM schema_version").scalar() or 0
+    except OperationalError:
+        return 0
+
+
+@contextmanager
+def _migration_lock(lock_path):
+    if fcntl is None:
+        yield
+        return
+    os.makedirs(os.path.dirname(lock_path), exist_ok=True)
+    with open(lock_path, 'w') as fh:
+        fcntl.flock(fh, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+def upgrade(engine, lock_path):
+    """Apply pending migrations. Returns (version_before, version_after)."""
+    with _migration_lock(lock_path):
+        with engine.connect() as conn:
+            before = current_version(conn)
+        if before >= SCHEMA_VERSION:
+            return before, before
+        with engine.begin() as conn:
+            conn.exec_driver_sql(
+                "CREATE TABLE IF NOT EXISTS schema_version "
+                "(version INTEGER PRIMARY KEY, name TEXT, applied_at TIMESTAMP)"
+            )
+        for version, name, step in MIGRATIONS:
+            if version <= before:
+                continue
+            logger.info("Applying schema migration %s: %s", version, name)
+            with engine.begin() as conn:
+                step(conn)
+                conn.execute(
+                    text("INSERT INTO schema_version (version, name, applied_at) VALUES (:v, :n, :t)"),
+                    {'v': version, 'n': name, 't': datetime.utcnow()},
+                )
+        return before, SCHEMA_VERSION
+
+
+def ensure_schema(app):
+    """Boot-time check: one query when current, otherwise run upgrade(). Needs an app context."""
+    engine = db.engine
+    with engine.connect() as conn:
+        if current_version(conn) >= SCHEMA_VERSION:
+            return
+    lock_path = os.path.join(app.config['HOMEHUB_DATA_DIR'], 'schema.lock')
+    before, after = upgrade(engine, lock_path)
+    if after != before:
+        logger.info("Database schema upgraded from version %s to %s", before, after)
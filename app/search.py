@@ -0,0 +1,189 @@
+"""Global full-text search over notes, recipes, reminders, expenses, the
+shopping list, favorite meals and countdowns.
+
+Every searchable row has one document in the search_index FTS5 table: a title
+and a body column. The document's rowid is id * KIND_SLOTS + the kind's code,
+so the kind and the source row come back from the rowid alone, and a row's
+document is found by rowid instead of scanning the index.
+
+SQLite triggers on the source tables (created by schema migration 15) keep
+the index current on every INSERT, DELETE and UPDATE of an indexed column,
+whichever code path wrote the row. A change to SOURCES needs a migration that
+replaces those triggers and calls rebuild(). rebuild() refills the index from
+scratch:  python sync/search_index.py
+
+Results are ranked by bm25 with title matches weighted TITLE_WEIGHT times
+higher than body matches. Scoring costs a few microseconds per matching
+document, so only the RANK_WINDOW matches with the highest ids of each kind
+are scored. Ids of one table grow with insertion order, so that is the newest
+rows of every kind; rowids alone are not comparable across kinds. A selective
+query is ranked exactly, and one that matches a large share of the index
+stays fast and favours recent rows. The title and snippet are returned as
+HTML with the matched terms in <mark>.
+"""
+import re
+import unicodedata
+
+from markupsafe import escape
+from sqlalchemy import bindparam, text
+
+KIND_SLOTS = 8  # rowid = id * KIND_SLOTS + code; codes 1..7 are taken
+TITLE_WEIGHT = 10.0
+MAX_TERMS = 8
+MAX_RESULTS = 50
+SNIPPET_TOKENS = 16
+RANK_WINDOW = 100  # newest matches of each kind scored by bm25; bounds the cost of words that are everywhere
+
+_WORD = re.compile(r'[^\W_]+')  # a word, as unicode61 splits text
+
+
+class Source:
+    """One searchable table: title and body are SQL expressions over the row alias {r}."""
+
+    def __init__(self, kind, code, table, columns, title, body, url, toggle=None):
+        self.kind = kind
+        self.code = code
+        self.table = table
+        self.columns = columns  # edits to these re-index the row
+        self.title = title
+        self.body = body
+        self.url = url
+        self.toggle = toggle  # feature_toggles key that hides the kind when off
+
+
+SOURCES = [
+    Source('note', 1, 'note', ('content',), "''", '{r}.content', '/notes', 'notes'),
+    Source('recipe', 2, 'recipe', ('title', 'ingredients', 'instructions'), '{r}.title',
+           "coalesce({r}.ingredients, '') || char(10) || coalesce({r}.instructions, '')", '/recipes', 'recipes'),
+    Source('reminder', 3, 'reminder', ('title', 'description'), '{r}.title', '{r}.description', '/'),
+    Source('expense', 4, 'expense_entry', ('title',), '{r}.title', "''", '/expenses', 'expense_tracker'),
+    Source('shopping', 5, 'shopping_item', ('item',), '{r}.item', "''", '/shopping', 'shopping_list'),
+    Source('meal', 6, 'favorite_meal', ('name', 'ingredients'), '{r}.name', '{r}.ingredients', '/meals',
+           'meal_planner'),
+    Source('countdown', 7, 'countdown', ('event_name', 'description'), '{r}.event_name', '{r}.description',
+           '/countdowns', 'countdown_timers'),
+]
+BY_KIND = {s.kind: s for s in SOURCES}
+BY_CODE = {s.code: s for s in SOURCES}
+
+
+def _document(source, alias):
+    return (f"{alias}.id * {KIND_SLOTS} + {source.code}, "
+            f"{source.title.format(r=alias)}, {source.body.format(r=alias)}")
+
+
+def rebuild(conn):
+    """Refill search_index from the source tables and merge it into a single b-tree."""
+    conn.exec_driver_sql("DELETE FROM search_index")
+    for s in SOURCES:
+        conn.exec_driver_sql(
+            f"INSERT INTO search_index (rowid, title, body) SELECT {_document(s, 'r')} FROM {s.table} AS r"
+        )
+    conn.exec_driver_sql("INSERT INTO search_index (search_index) VALUES ('optimize')")
+
+
+def _fold(word):
+    """Lowercase without diacritics, as the unicode61 tokenizer indexes words."""
+    return ''.join(c for c in unicodedata.normalize('NFKD', word.casefold()) if not unicodedata.combining(c))
+
+
+def parse_query(query):
+    """(words, prefix) of free-text input; prefix means the last word is still being typed."""
+    words = _WORD.findall(query or '')[:MAX_TERMS]
+    prefix = bool(words) and query == query.rstrip() and len(words[-1]) >= 2
+    return words, prefix
+
+
+def match_expression(words, prefix):
+    """FTS5 MATCH expression that requires every word, the last one as a prefix if prefix.
+
+    Words are quoted, so FTS5 syntax in the input (AND, NEAR, column filters)
+    is searched for literally instead of raising a syntax error.
+    """
+    phrases = [f'"{w}"' for w in words]
+    if prefix:
+        phrases[-1] += '*'
+    return ' '.join(phrases)
+
+
+def mark(value, words, prefix, window=None):
+    """value as HTML with the query words in <mark>.
+
+    With window, only the `window` words around the densest run of matches
+    are kept, like FTS5's snippet() but without a second MATCH query (that
+    would merge the prefix term's doclists again for every row).
+    """
+    value = value or ''
+    folded = [_fold(w) for w in words]
+    last = folded[-1] if prefix else None
+    exact = set(folded[:-1] if prefix else folded)
+
+    def matches(token):
+        token = _fold(token)
+        return token in exact or (last is not None and token.startswith(last))
+
+    tokens = list(_WORD.finditer(value))
+    hits = [i for i, m in enumerate(tokens) if matches(m.group())]
+    first, stop = 0, len(tokens)
+    if window and len(tokens) > window:
+        if hits:
+            best = max(hits, key=lambda i: sum(1 for h in hits if i <= h < i + window))
+            first = max(0, min(best - 2, len(tokens) - window))
+        stop = first + window
+    begin = tokens[first].start() if first else 0
+    end = tokens[stop - 1].end() if stop < len(tokens) else len(value)
+    out = ['…'] if first else []
+    pos = begin
+    for i in hits:
+        if first <= i < stop:
+            m = tokens[i]
+            out += [str(escape(value[pos:m.start()])), '<mark>', str(escape(m.group())), '</mark>']
+            pos = m.end()
+    out.append(str(escape(value[pos:end])))
+    if stop < len(tokens):
+        out.append('…')
+    return ''.join(out).strip()
+
+
+# One window per kind: FTS5 walks a MATCH by descending rowid, and within a kind that is descending id
+_WINDOW = (
+    "SELECT * FROM (SELECT rowid, rank FROM search_index WHERE search_index MATCH :q "
+    "AND rowid % {slots} = {code} ORDER BY rowid DESC LIMIT :window)"
+)
+_RANK = "SELECT rowid FROM ({windows}) ORDER BY rank LIMIT :limit"
+_CONTENT = text("SELECT rowid, title, body FROM search_index WHERE rowid IN :ids").bindparams(
+    bindparam('ids', expanding=True))
+
+
+def search(conn, query, kinds=None, limit=20):
+    """Ranked hits for query as dicts (kind, id, title, snippet, url); kinds limits the sources searched."""
+    words, prefix = parse_query(query)
+    if not words:
+        return []
+    codes = sorted({BY_KIND[k].code for k in (BY_KIND if kinds is None else kinds) if k in BY_KIND})
+    if not codes:
+        return []
+    windows = ' UNION ALL '.join(_WINDOW.format(slots=KIND_SLOTS, code=code) for code in codes)
+    params = {'q': match_expression(words, prefix), 'window': RANK_WINDOW, 'limit': max(1, min(limit, MAX_RESULTS))}
+    ranked = [row[0] for row in conn.execute(text(_RANK.format(windows=windows)), params)]
+    if not ranked:
+        return []
+    content = {row[0]: row[1:] for row in conn.execute(_CONTENT, {'ids': ranked})}
+    hits = []
+    for rowid in ranked:
+        source = BY_CODE[rowid % KIND_SLOTS]
+        title, body = content.get(rowid, ('', ''))
+        hits.append({
+            'kind': source.kind,
+            'id': rowid // KIND_SLOTS,
+            'title': mark(title, words, prefix),
+            'snippet': mark(body, words, prefix, SNIPPET_TOKENS),
+            'url': source.url,
+        })
+    return hits
+
+
+def enabled_kinds(config):
+    """Kinds whose feature is switched on in config.yml's feature_toggles."""
+    toggles = (config or {}).get('feature_toggles') or {}
+    return [s.kind for s in SOURCES if s.toggle is None or toggles.get(s.toggle)]
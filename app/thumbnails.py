@@ -0,0 +1,326 @@
+"""Photo thumbnail pipeline.
+
+Uploads only save the original. The Photo row is committed with
+thumb_status 'pending' and handed to submit(). A process pool decodes each
+original once and writes every size in SIZES, in every format in FORMATS, to
+photos/thumbs/. JPEG originals are decoded in draft mode, so only the DCT scale
+the largest size needs is decoded, and EXIF orientation is applied before
+resizing. The variants are recorded as PhotoVariant rows:
+
+    photo_thumbnails:
+      max_workers: 2      # originals processed at once
+
+render_variants() is the pool worker: it is pure PIL and touches neither the
+app nor the database. The job also hashes the smallest variant for duplicate
+detection (app/photo_dedupe.py). Photos left pending by a restart are
+resubmitted by resume() on the first gallery request, which also starts
+rescan_hashes() for photos that have no hash yet.
+
+pick_variant() serves the photo routes. It takes the smallest box that covers
+the requested width and the best format the browser accepts: AVIF if Pillow
+can write it, then WebP, then JPEG. Variants the pipeline did not produce
+(AVIF, the 2048 px box, photos still pending) are rendered on demand into
+photos/cache/. VariantCache keeps that folder under `cache_mb`, evicting the
+least recently served files first:
+
+    photo_thumbnails:
+      cache_mb: 512       # on-demand variants kept on disk
+"""
+import logging
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+from .config import get_config
+from .models import db, Photo, PhotoVariant
+from .photo_dedupe import hash_file, remember
+
+logger = logging.getLogger('homehub.thumbnails')
+
+PHOTOS_FOLDER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'photos')
+THUMBS_FOLDER = os.path.join(PHOTOS_FOLDER, 'thumbs')
+CACHE_FOLDER = os.path.join(PHOTOS_FOLDER, 'cache')
+
+SIZES = (200, 400, 1200)  # longest side in pixels
+FORMATS = ('webp', 'jpeg')
+BOXES = SIZES + (2048,)  # sizes the photo routes serve; wider requests get the original
+GRID_SIZE = 400  # the gallery grid's thumbnails
+QUALITY = {'avif': 60, 'webp': 80, 'jpeg': 82}
+EXTENSIONS = {'avif': 'avif', 'webp': 'webp', 'jpeg': 'jpg'}
+DEFAULT_WORKERS = 2
+DEFAULT_CACHE_MB = 512
+
+_lock = threading.Lock()
+_executor = None
+_resumed = False
+_hashing = set()  # photo ids with a rescan_hashes() job in flight
+
+
+def variant_name(filename, box, fmt):
+    return f"{os.path.splitext(filename)[0]}_{box}.{EXTENSIONS[fmt]}"
+
+
+def render_variants(src, dest_dir, filename, sizes=SIZES, formats=FORMATS):
+    """Decode src once and write each size and format to dest_dir. Returns one dict per file written."""
+    from PIL import Image, ImageOps
+
+    written = []
+    with Image.open(src) as original:
+        if original.format == 'JPEG':
+            largest = max(sizes)
+            original.draft('RGB', (largest, largest))
+        img = ImageOps.exif_transpose(original)
+        if img.mode not in ('RGB', 'RGBA'):
+            img = img.convert('RGBA' if 'transparency' in img.info or img.mode in ('LA', 'PA') else 'RGB')
+        # Largest first, each size resized from the previous one
+        for box in sorted(sizes, reverse=True):
+            img = img.copy()
+            img.thumbnail((box, box), Image.LANCZOS)
+            for fmt in formats:
+                name = variant_name(filename, box, fmt)
+                path = os.path.join(dest_dir, name)
+                frame = img.convert('RGB') if fmt == 'jpeg' and img.mode != 'RGB' else img
+                tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+                frame.save(tmp, format=fmt.upper(), quality=QUALITY[fmt])
+                os.replace(tmp, path)
+                written.append({'box': box, 'fmt': fmt, 'filename': name, 'width': img.width,
+                                'height': img.height, 'bytes': os.path.getsize(path)})
+    return written
+
+
+def render_and_hash(src, dest_dir, filename):
+    """Pool job for an upload: (variants, hex dHash of the smallest variant)."""
+    variants = render_variants(src, dest_dir, filename)
+    smallest = min(variants, key=lambda v: v['box'])
+    return variants, hash_file(os.path.join(dest_dir, smallest['filename']))
+
+
+def hash_photo(paths):
+    """Pool job for rescan_hashes(): hex dHash of the first of paths that exists."""
+    for path in paths:
+        if os.path.exists(path):
+            return hash_file(path)
+    raise FileNotFoundError(paths[-1])
+
+
+def _setting(key, default):
+    try:
+        return max(1, int(((get_config() or {}).get('photo_thumbnails') or {}).get(key, default)))
+    except (AttributeError, TypeError, ValueError):
+        return default
+
+
+def _pool():
+    global _executor
+    with _lock:
+        if _executor is None:
+            workers = _setting('max_workers', DEFAULT_WORKERS)
+            # spawn: the web process runs threads, and forking a threaded process can deadlock the child
+            _executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        return _executor
+
+
+def submit(app, photo_id, filename):
+    """Render variants for a committed Photo in the background."""
+    future = _pool().submit(render_and_hash, os.path.join(PHOTOS_FOLDER, filename), THUMBS_FOLDER, filename)
+    future.add_done_callback(lambda f: _record(app, photo_id, f))
+
+
+def resume(app):
+    """Once per process: resubmit photos a previous process left pending."""
+    global _resumed
+    with _lock:
+        if _resumed:
+            return
+        _resumed = True
+    for photo_id, filename in db.session.query(Photo.id, Photo.filename).filter(Photo.thumb_status == 'pending'):
+        submit(app, photo_id, filename)
+    rescan_hashes(app)
+
+
+def rescan_hashes(app, everything=False):
+    """Hash photos in the pool: those without a hash, or all of them. Returns how many were queued.
+
+    Pending photos are left to submit(), which hashes them anyway. The 200 px
+    variant is hashed when it exists, the original otherwise.
+    """
+    q = db.session.query(Photo.id, Photo.filename).filter(Photo.thumb_status != 'pending')
+    if not everything:
+        q = q.filter(Photo.phash.is_(None))
+    queued = 0
+    for photo_id, filename in q.all():
+        with _lock:
+            if photo_id in _hashing:
+                continue
+            _hashing.add(photo_id)
+        paths = [os.path.join(THUMBS_FOLDER, variant_name(filename, SIZES[0], fmt)) for fmt in FORMATS]
+        future = _pool().submit(hash_photo, paths + [os.path.join(PHOTOS_FOLDER, filename)])
+        future.add_done_callback(lambda f, pid=photo_id: _record_hash(app, pid, f))
+        queued += 1
+    return queued
+
+
+def _record(app, photo_id, future):
+    with app.app_context():
+        try:
+            variants, phash = future.result()
+            if db.session.get(Photo, photo_id) is None:
+                remove_variants([v['filename'] for v in variants])
+                return
+            replace_variants(photo_id, variants)
+            Photo.query.filter_by(id=photo_id).update({Photo.thumb_status: 'done', Photo.phash: phash},
+                                                      synchronize_session=False)
+            db.session.commit()
+            remember(photo_id, phash)
+        except Exception as e:
+            logger.error(f"Thumbnails for photo {photo_id} failed: {e}", exc_info=True)
+            db.session.rollback()
+            Photo.query.filter_by(id=photo_id).update({Photo.thumb_status: 'error'}, synchronize_session=False)
+            db.session.commit()
+        finally:
+            db.session.remove()
+
+
+def _record_hash(app, photo_id, future):
+    with app.app_context():
+        try:
+            phash = future.result()
+            Photo.query.filter_by(id=photo_id).update({Photo.phash: phash}, synchronize_session=False)
+            db.session.commit()
+            remember(photo_id, phash)
+        except Exception as e:
+            logger.warning(f"Hashing photo {photo_id} failed: {e}")
+            db.session.rollback()
+        finally:
+            db.session.remove()
+            with _lock:
+                _hashing.discard(photo_id)
+
+
+def replace_variants(photo_id, variants):
+    """Store the rendered variants of a photo, replacing any earlier set (caller commits)."""
+    PhotoVariant.query.filter_by(photo_id=photo_id).delete(synchronize_session=False)
+    db.session.add_all(PhotoVariant(photo_id=photo_id, **v) for v in variants)
+
+
+def remove_variants(filenames, folder=THUMBS_FOLDER):
+    for name in filenames:
+        try:
+            os.remove(os.path.join(folder, name))
+        except OSError:
+            pass
+
+
+def purge_photo(photo):
+    """Delete every derived file of photo: pipeline variants, the legacy thumbnail and cached variants."""
+    remove_variants([v.filename for v in PhotoVariant.query.filter_by(photo_id=photo.id)] + [photo.filename])
+    remove_variants([variant_name(photo.filename, box, fmt) for box in BOXES for fmt in EXTENSIONS], CACHE_FOLDER)
+
+
+class VariantCache:
+    """Size-capped folder of on-demand variants; the least recently served files go first."""
+
+    def __init__(self, folder, max_bytes):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._total = None  # bytes on disk, counted on first use
+
+    def get(self, name):
+        """True if name is cached; marks it as recently used."""
+        path = os.path.join(self.folder, name)
+        try:
+            # Recency lives in atime; mtime stays put because it feeds the response ETag
+            os.utime(path, (time.time(), os.stat(path).st_mtime))
+            return True
+        except OSError:
+            return False
+
+    def add(self, name):
+        """Account for a file just written to the folder and evict if over the cap."""
+        size = os.path.getsize(os.path.join(self.folder, name))
+        with self._lock:
+            if self._total is None:
+                self._total = self._scan_total()
+            else:
+                self._total += size
+            if self._total > self.max_bytes:
+                self._evict(keep=name)
+
+    def _scan_total(self):
+        return sum(e.stat().st_size for e in os.scandir(self.folder) if e.is_file())
+
+    def _evict(self, keep=None):
+        # Re-read the folder: other processes share it
+        entries = []
+        for e in os.scandir(self.folder):
+            if e.is_file() and e.name != keep:
+                st = e.stat()
+                entries.append((st.st_atime, st.st_size, e.path))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        if keep:
+            total += os.path.getsize(os.path.join(self.folder, keep))
+        target = self.max_bytes * 0.9  # headroom, so the next few adds do not evict again
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                continue
+        self._total = total
+
+
+_cache = None
+
+
+def variant_cache():
+    global _cache
+    with _lock:
+        if _cache is None:
+            os.makedirs(CACHE_FOLDER, exist_ok=True)
+            _cache = VariantCache(CACHE_FOLDER, _setting('cache_mb', DEFAULT_CACHE_MB) * 1024 * 1024)
+        return _cache
+
+
+def _can_write(fmt):
+    from PIL import features
+    return fmt != 'avif' or bool(features.check('avif'))
+
+
+def negotiate_format(accept):
+    """Best variant format for a request's parsed Accept header (request.accept_mimetypes).
+
+    AVIF and WebP are only offered when the client names them with q > 0, so
+    a bare */* or image/* still gets JPEG. Between the offered types the
+    client's q-values decide.
+    """
+    named = {value.lower() for value, quality in accept if quality > 0}
+    offers = [mime for fmt, mime in (('avif', 'image/avif'), ('webp', 'image/webp'))
+              if mime in named and (fmt != 'avif' or _can_write('avif'))]
+    best = accept.best_match(offers + ['image/jpeg'])
+    return {'image/avif': 'avif', 'image/webp': 'webp'}.get(best, 'jpeg')
+
+
+def box_for(width):
+    """Smallest box covering width pixels, or None when only the original is large enough."""
+    return next((b for b in BOXES if b >= width), None)
+
+
+def pick_variant(photo, box, fmt):
+    """(folder, file name) of photo at box in fmt, rendering into the cache if the pipeline has not made it."""
+    variant = PhotoVariant.query.filter_by(photo_id=photo.id, box=box, fmt=fmt).first()
+    if variant and os.path.exists(os.path.join(THUMBS_FOLDER, variant.filename)):
+        return THUMBS_FOLDER, variant.filename
+    cache = variant_cache()
+    name = variant_name(photo.filename, box, fmt)
+    if not cache.get(name):
+        render_variants(os.path.join(PHOTOS_FOLDER, photo.filename), CACHE_FOLDER, photo.filename,
+                        sizes=(box,), formats=(fmt,))
+        cache.add(name)
+    return CACHE_FOLDER, name
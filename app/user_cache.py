@@ -0,0 +1,91 @@
+"""In-process cache of immutable User snapshots for the per-request auth check.
+
+The before-request hook and the calendar permission checks only need a handful
+of User fields, so they read them from here instead of hitting SQLite on every
+request. Routes that change those fields must call invalidate_user() after
+committing. Entries also expire after USER_CACHE_TTL seconds so that other
+processes (extra gunicorn workers, the sync daemon) can never serve stale
+permissions for long.
+"""
+import threading
+import time
+from collections import namedtuple
+
+from .models import User
+
+USER_CACHE_TTL = 60.0  # seconds
+
+UserSnapshot = namedtuple('UserSnapshot', ['id', 'username', 'is_admin', 'password_set', 'calendar_write_enabled'])
+
+_lock = threading.Lock()
+_by_id = {}  # id -> (snapshot, expires_at)
+_id_by_name = {}  # username -> id
+
+
+def _snapshot(user):
+    return UserSnapshot(
+        id=user.id,
+        username=user.username,
+        is_admin=bool(user.is_admin),
+        password_set=bool(user.password_set),
+        calendar_write_enabled=bool(user.calendar_write_enabled),
+    )
+
+
+def _store(user):
+    snap = _snapshot(user)
+    with _lock:
+        _by_id[snap.id] = (snap, time.monotonic() + USER_CACHE_TTL)
+        _id_by_name[snap.username] = snap.id
+    return snap
+
+
+def _cached(user_id):
+    entry = _by_id.get(user_id)
+    if entry and entry[1] > time.monotonic():
+        return entry[0]
+    return None
+
+
+def get_user(user_id):
+    """Return a UserSnapshot for user_id, or None if the user does not exist."""
+    if not user_id:
+        return None
+    snap = _cached(user_id)
+    if snap is not None:
+        return snap
+    user = User.query.get(user_id)
+    return _store(user) if user else None
+
+
+def get_user_by_name(username):
+    """Return a UserSnapshot for username, or None if no such user exists."""
+    if not username:
+        return None
+    user_id = _id_by_name.get(username)
+    if user_id is not None:
+        snap = _cached(user_id)
+        if snap is not None and snap.username == username:
+            return snap
+    user = User.query.filter_by(username=username).first()
+    return _store(user) if user else None
+
+
+def can_write_calendar(username):
+    """True if username exists and is an admin or has calendar write permission."""
+    user = get_user_by_name(username)
+    return bool(user and (user.is_admin or user.calendar_write_enabled))
+
+
+def invalidate_user(user_id):
+    """Drop the cached snapshot for user_id (call after committing changes to that user)."""
+    with _lock:
+        entry = _by_id.pop(user_id, None)
+        if entry:
+            _id_by_name.pop(entry[0].username, None)
+
+
+def clear_user_cache():
+    with _lock:
+        _by_id.clear()
+        _id_by_name.clear()
@@ -1,7 +1,33 @@
+import importlib.util
 import random
 import string
+import sys
 
 def generate_short_code(length=6):
     return ''.join(random.choices(string.ascii_letters + string.digits, k=length))
 
+def lazy_import(name):
+    """Return module `name`, deferring its actual import until first attribute access.
+
+    Keeps heavy optional dependencies (requests, bleach, ...) off the worker boot path.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ImportError(f'No module named {name!r}')
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+def human_size(n):
+    """Byte count as a short human-readable string (1000 B, 1.5 KB, 2.0 MB, ...)."""
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if n < 1024 or unit == 'GB':
+            return f"{n:.0f} {unit}" if unit == 'B' else f"{n:.1f} {unit}"
+        n /= 1024.0
+
 # Add more utility functions as needed
@@ -0,0 +1,298 @@
+"""Weather widget backed by the Open-Meteo API. requests is loaded on first fetch."""
+from flask import render_template, request, jsonify, current_app
+from datetime import datetime
+
+from .routes import main_bp
+from .utils import lazy_import
+
+requests = lazy_import('requests')
+
+def get_weather_data(location=None, lat=None, lon=None):
+    """Fetch weather data from Open-Meteo API (free, no API key needed)"""
+    print(f"[DEBUG] get_weather_data called with location={location}, lat={lat}, lon={lon}")
+    try:
+        # Default to ZIP 47725 (Evansville, IN area)
+        if not location and not (lat and lon):
+            location = "47725"
+            print(f"[DEBUG] Using default location: {location}")
+
+        # If location is provided, try to geocode it
+        if location:
+            # Use OpenWeatherMap geocoding (can also work without API key for basic lookups)
+            # Or use Open-Meteo's geocoding
+            geo_url = f"https://geocoding-api.open-meteo.com/v1/search?name={location}&count=1&language=en&format=json"
+            print(f"[DEBUG] Geocoding URL: {geo_url}")
+            geo_response = requests.get(geo_url, timeout=5)
+            print(f"[DEBUG] Geocoding response status: {geo_response.status_code}")
+            if geo_response.ok:
+                geo_data = geo_response.json()
+                print(f"[DEBUG] Geocoding data: {geo_data}")
+                if geo_data.get('results'):
+                    result = geo_data['results'][0]
+                    lat = result['latitude']
+                    lon = result['longitude']
+                    location_name = result.get('name', location)
+                    country = result.get('country', '')
+                    admin1 = result.get('admin1', '')
+                    location_display = f"{location_name}, {admin1}, {country}" if admin1 else f"{location_name}, {country}"
+                    print(f"[DEBUG] Geocoded: {location_display} at {lat}, {lon}")
+                else:
+                    print("[DEBUG] No geocoding results")
+                    return None
+            else:
+                print(f"[DEBUG] Geocoding failed with status {geo_response.status_code}")
+                return None
+
+        if not (lat and lon):
+            print("[DEBUG] No lat/lon available")
+            return None
+
+        # Fetch comprehensive weather from Open-Meteo (all free data)
+        weather_url = (
+            f"https://api.open-meteo.com/v1/forecast?"
+            f"latitude={lat}&longitude={lon}&"
+            f"current=temperature_2m,relative_humidity_2m,apparent_temperature,precipitation,weather_code,"
+            f"wind_speed_10m,wind_direction_10m,wind_gusts_10m,pressure_msl,cloud_cover,visibility,uv_index,is_day&"
+            f"hourly=temperature_2m,precipitation_probability,weather_code,wind_speed_10m,relative_humidity_2m&"
+            f"daily=weather_code,temperature_2m_max,temperature_2m_min,sunrise,sunset,uv_index_max,"
+            f"precipitation_probability_max,precipitation_sum,wind_speed_10m_max,wind_gusts_10m_max&"
+            f"temperature_unit=fahrenheit&wind_speed_unit=mph&precipitation_unit=inch&timezone=auto&forecast_days=7"
+        )
+        print(f"[DEBUG] Weather URL: {weather_url}")
+
+        weather_response = requests.get(weather_url, timeout=10)
+        print(f"[DEBUG] Weather response status: {weather_response.status_code}")
+        if not weather_response.ok:
+            print("[DEBUG] Weather API request failed")
+            return None
+
+        data = weather_response.json()
+        current = data.get('current', {})
+        hourly = data.get('hourly', {})
+        daily = data.get('daily', {})
+        print(f"[DEBUG] Weather data: {current}")
+        print(f"[DEBUG] Daily forecast data keys: {daily.keys() if daily else 'None'}")
+
+        # Map weather codes to descriptions and icons
+        weather_code = current.get('weather_code', 0)
+        weather_desc, weather_icon = map_weather_code(weather_code)
+
+        # Wind direction to compass
+        def wind_direction_to_compass(degrees):
+            if degrees is None:
+                return "N/A"
+            directions = ["N", "NNE", "NE", "ENE", "E", "ESE", "SE", "SSE",
+                         "S", "SSW", "SW", "WSW", "W", "WNW", "NW", "NNW"]
+            idx = round(degrees / 22.5) % 16
+            return directions[idx]
+
+        # Process hourly forecast (next 24 hours)
+        hourly_list = []
+        if hourly:
+            h_times = hourly.get('time', [])
+            h_temps = hourly.get('temperature_2m', [])
+            h_precip_prob = hourly.get('precipitation_probability', [])
+            h_weather_codes = hourly.get('weather_code', [])
+            h_wind_speeds = hourly.get('wind_speed_10m', [])
+            h_humidity = hourly.get('relative_humidity_2m', [])
+
+            # Get next 24 hours
+            for i in range(min(24, len(h_times))):
+                try:
+                    time_obj = datetime.fromisoformat(h_times[i].replace('Z', '+00:00'))
+                    hour_display = time_obj.strftime('%I %p')  # 12-hour format
+                    h_code = h_weather_codes[i] if i < len(h_weather_codes) else 0
+                    h_desc, h_icon = map_weather_code(h_code)
+
+                    hourly_list.append({
+                        'hour': hour_display,
+                        'temperature': round(h_temps[i]) if i < len(h_temps) else 0,
+                        'precipitation_prob': h_precip_prob[i] if i < len(h_precip_prob) else 0,
+                        'weather_code': h_code,
+                        'icon': h_icon,
+                        'description': h_desc,
+                        'wind_speed': round(h_wind_speeds[i], 1) if i < len(h_wind_speeds) else 0,
+                        'humidity': h_humidity[i] if i < len(h_humidity) else 0
+                    })
+                except (IndexError, ValueError) as e:
+                    print(f"[DEBUG] Error processing hourly {i}: {e}")
+                    continue
+
+        # Process 5-day forecast (skip today, take next 5 days)
+        forecast_list = []
+        if daily:
+            dates = daily.get('time', [])
+            weather_codes = daily.get('weather_code', [])
+            temp_max = daily.get('temperature_2m_max', [])
+            temp_min = daily.get('temperature_2m_min', [])
+            sunrise = daily.get('sunrise', [])
+            sunset = daily.get('sunset', [])
+            uv_max = daily.get('uv_index_max', [])
+            precip_prob = daily.get('precipitation_probability_max', [])
+            precip_sum = daily.get('precipitation_sum', [])
+            wind_max = daily.get('wind_speed_10m_max', [])
+            gust_max = daily.get('wind_gusts_10m_max', [])
+
+            # Skip first day (today), take next 5
+            for i in range(1, min(6, len(dates))):
+                try:
+                    date_obj = datetime.strptime(dates[i], '%Y-%m-%d')
+                    day_name = date_obj.strftime('%a')  # Mon, Tue, etc.
+                    fc_code = weather_codes[i] if i < len(weather_codes) else 0
+                    fc_desc, fc_icon = map_weather_code(fc_code)
+
+                    # Parse sunrise/sunset
+                    sunrise_time = datetime.fromisoformat(sunrise[i].replace('Z', '+00:00')).strftime('%I:%M %p') if i < len(sunrise) and sunrise[i] else 'N/A'
+                    sunset_time = datetime.fromisoformat(sunset[i].replace('Z', '+00:00')).strftime('%I:%M %p') if i < len(sunset) and sunset[i] else 'N/A'
+
+                    forecast_list.append({
+                        'day': day_name,
+                        'date': dates[i],
+                        'weather_code': fc_code,
+                        'icon': fc_icon,
+                        'description': fc_desc,
+                        'high': round(temp_max[i]),
+                        'low': round(temp_min[i]),
+                        'sunrise': sunrise_time,
+                        'sunset': sunset_time,
+                        'uv_max': round(uv_max[i], 1) if i < len(uv_max) and uv_max[i] else 0,
+                        'precipitation_prob': precip_prob[i] if i < len(precip_prob) else 0,
+                        'precipitation_sum': round(precip_sum[i], 2) if i < len(precip_sum) else 0,
+                        'wind_max': round(wind_max[i], 1) if i < len(wind_max) else 0,
+                        'wind_gusts_max': round(gust_max[i], 1) if i < len(gust_max) else 0
+                    })
+                except (IndexError, ValueError) as e:
+                    print(f"[DEBUG] Error processing forecast day {i}: {e}")
+                    continue
+
+        # Today's detailed data from daily[0]
+        today_data = {}
+        if daily and len(daily.get('time', [])) > 0:
+            try:
+                sunrise_today = datetime.fromisoformat(daily['sunrise'][0].replace('Z', '+00:00')).strftime('%I:%M %p') if daily.get('sunrise') else 'N/A'
+                sunset_today = datetime.fromisoformat(daily['sunset'][0].replace('Z', '+00:00')).strftime('%I:%M %p') if daily.get('sunset') else 'N/A'
+                today_data = {
+                    'sunrise': sunrise_today,
+                    'sunset': sunset_today,
+                    'uv_index': round(daily['uv_index_max'][0], 1) if daily.get('uv_index_max') else 0,
+                    'precip_prob': daily['precipitation_probability_max'][0] if daily.get('precipitation_probability_max') else 0,
+                    'precip_sum': round(daily['precipitation_sum'][0], 2) if daily.get('precipitation_sum') else 0
+                }
+            except (IndexError, ValueError, KeyError) as e:
+                print(f"[DEBUG] Error processing today's data: {e}")
+
+        # Add high/low from today's daily data
+        today_high = round(daily['temperature_2m_max'][0]) if daily and daily.get('temperature_2m_max') and len(daily['temperature_2m_max']) > 0 else 0
+        today_low = round(daily['temperature_2m_min'][0]) if daily and daily.get('temperature_2m_min') and len(daily['temperature_2m_min']) > 0 else 0
+
+        result = {
+            'location': location_display if location else f"{lat}, {lon}",
+            'current': {
+                'temperature': round(current.get('temperature_2m', 0)),
+                'feels_like': round(current.get('apparent_temperature', 0)),
+                'humidity': current.get('relative_humidity_2m', 0),
+                'wind_speed': round(current.get('wind_speed_10m', 0), 1),
+                'wind_direction': wind_direction_to_compass(current.get('wind_direction_10m')),
+                'wind_direction_degrees': current.get('wind_direction_10m', 0),
+                'wind_gusts': round(current.get('wind_gusts_10m', 0), 1),
+                'pressure': round(current.get('pressure_msl', 0)),
+                'cloud_cover': current.get('cloud_cover', 0),
+                'visibility': round(current.get('visibility', 0) / 1609.34, 1),  # meters to miles
+                'uv_index': round(current.get('uv_index', 0), 1),
+                'is_day': current.get('is_day', 1),
+                'weather_code': weather_code,
+                'description': weather_desc,
+                'icon': weather_icon
+            },
+            'today': {
+                'high': today_high,
+                'low': today_low,
+                'sunrise': today_data.get('sunrise', 'N/A'),
+                'sunset': today_data.get('sunset', 'N/A'),
+                'uv_index': today_data.get('uv_index', 0),
+                'precip_prob': today_data.get('precip_prob', 0),
+                'precip_sum': today_data.get('precip_sum', 0)
+            },
+            'forecast': forecast_list,
+            'hourly': hourly_list
+        }
+        print(f"[DEBUG] Returning weather result with {len(forecast_list)} forecast days and {len(hourly_list)} hourly entries")
+        return result
+    except Exception as e:
+        print(f"[ERROR] Weather fetch error: {e}")
+        import traceback
+        traceback.print_exc()
+        return None
+
+def map_weather_code(code):
+    """Map WMO weather codes to descriptions and Font Awesome icons"""
+    weather_map = {
+        0: ("Clear sky", "fa-sun"),
+        1: ("Mainly clear", "fa-sun"),
+        2: ("Partly cloudy", "fa-cloud-sun"),
+        3: ("Overcast", "fa-cloud"),
+        45: ("Foggy", "fa-smog"),
+        48: ("Foggy", "fa-smog"),
+        51: ("Light drizzle", "fa-cloud-rain"),
+        53: ("Moderate drizzle", "fa-cloud-rain"),
+        55: ("Dense drizzle", "fa-cloud-rain"),
+        61: ("Slight rain", "fa-cloud-rain"),
+        63: ("Moderate rain", "fa-cloud-showers-heavy"),
+        65: ("Heavy rain", "fa-cloud-showers-heavy"),
+        71: ("Slight snow", "fa-snowflake"),
+        73: ("Moderate snow", "fa-snowflake"),
+        75: ("Heavy snow", "fa-snowflake"),
+        77: ("Snow grains", "fa-snowflake"),
+        80: ("Slight rain showers", "fa-cloud-rain"),
+        81: ("Moderate rain showers", "fa-cloud-showers-heavy"),
+        82: ("Violent rain showers", "fa-cloud-showers-heavy"),
+        85: ("Slight snow showers", "fa-snowflake"),
+        86: ("Heavy snow showers", "fa-snowflake"),
+        95: ("Thunderstorm", "fa-cloud-bolt"),
+        96: ("Thunderstorm with hail", "fa-cloud-bolt"),
+        99: ("Thunderstorm with heavy hail", "fa-cloud-bolt"),
+    }
+    return weather_map.get(code, ("Unknown", "fa-cloud"))
+
+@main_bp.route('/weather')
+def weather():
+    print("[DEBUG] /weather route called")
+    config = current_app.config['HOMEHUB_CONFIG']
+    # Default to ZIP 47725
+    weather_data = get_weather_data(location="47725")
+    print(f"[DEBUG] Weather page rendering with data: {weather_data}")
+    return render_template('weather.html', config=config, is_authed=True, weather=weather_data, location="47725")
+
+@main_bp.route('/weather/update', methods=['POST'])
+def weather_update():
+    print("[DEBUG] /weather/update route called")
+    data = request.get_json()
+    print(f"[DEBUG] Request data: {data}")
+    location = data.get('location')
+    lat = data.get('lat')
+    lon = data.get('lon')
+
+    weather_data = get_weather_data(location=location, lat=lat, lon=lon)
+    print(f"[DEBUG] Weather update result: {weather_data}")
+
+    if weather_data:
+        response = jsonify({'success': True, 'weather': weather_data})
+        print(f"[DEBUG] Returning success response")
+        return response
+    else:
+        print("[DEBUG] Returning error response")
+        return jsonify({'success': False, 'error': 'Could not fetch weather data'})
+
+@main_bp.route('/api/weather', methods=['GET'])
+def api_weather():
+    """API endpoint for weather data (used by widget)"""
+    location = request.args.get('zip')
+    lat = request.args.get('lat')
+    lon = request.args.get('lon')
+
+    weather_data = get_weather_data(location=location, lat=lat, lon=lon)
+
+    if weather_data:
+        return jsonify(weather_data)
+    else:
+        return jsonify({'error': 'Could not fetch weather data'}), 400
@@ -0,0 +1,162 @@
+"""ZIP archives streamed straight from the files on disk.
+
+ZipStream lays out an archive of stored (uncompressed) entries from names,
+sizes and timestamps alone. Photos are already compressed, so deflating them
+would only cost CPU. Because nothing in the layout depends on the data, the
+archive has a fixed length and every byte has a fixed offset before anything is
+read. That gives Content-Length up front and lets stream(start, stop) serve any
+byte range, so browsers can resume an interrupted download.
+
+The CRC-32 of each file goes in its local header, so entries need no data
+descriptors and strict streaming readers unpack the archive too. CRCs the
+caller already knows are passed in. The rest are computed from the file just
+before it is streamed, and handed to on_crc so the caller can store them for
+the next download. Files are read CHUNK_SIZE bytes at a time, so memory use
+does not grow with the archive. ZIP64 records are added only when an offset or
+size needs them.
+"""
+import hashlib
+import struct
+import zlib
+
+CHUNK_SIZE = 1 << 20
+ZIP64_LIMIT = 0xFFFFFFFF  # sizes and offsets from here on need ZIP64 records
+_ZIP64_MARKER = 0xFFFFFFFF  # 32-bit field value meaning "see the ZIP64 record"
+_UTF8_FLAG = 0x0800
+
+
+class ZipEntry:
+    """One file of the archive: its name inside it, path on disk, size, datetime and CRC-32 if known."""
+
+    def __init__(self, name, path, size, modified, crc=None, key=None):
+        self.name = name
+        self.path = path
+        self.size = size
+        self.modified = modified
+        self.crc = crc
+        self.key = key  # caller's id for the file, for on_crc
+        self.offset = 0  # of the local header, set by ZipStream
+
+
+def file_crc32(path):
+    crc = 0
+    with open(path, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(CHUNK_SIZE), b''):
+            crc = zlib.crc32(chunk, crc)
+    return crc
+
+
+def _dos_time(when):
+    if when.year < 1980:
+        return 0, (1 << 5) | 1  # 1980-01-01 00:00
+    return ((when.hour << 11) | (when.minute << 5) | (when.second // 2),
+            ((when.year - 1980) << 9) | (when.month << 5) | when.day)
+
+
+class ZipStream:
+    """Stored-entry archive of entries; its size and the offset of every byte are known before any file is read."""
+
+    def __init__(self, entries, on_crc=None):
+        self.entries = list(entries)
+        self.on_crc = on_crc
+        # (offset, length, producer); producer(lo, hi) yields bytes lo:hi of the segment
+        self._segments = []
+        offset = 0
+        for entry in self.entries:
+            entry.offset = offset
+            name = entry.name.encode('utf-8')
+            header_len = 30 + len(name) + (20 if entry.size >= ZIP64_LIMIT else 0)
+            self._segments.append((offset, header_len, self._local_header_producer(entry)))
+            offset += header_len
+            self._segments.append((offset, entry.size, self._data_producer(entry)))
+            offset += entry.size
+        self._cd_start = offset
+        for entry in self.entries:
+            length = len(self._central_record(entry, crc=0))
+            self._segments.append((offset, length, self._central_producer(entry)))
+            offset += length
+        tail = self._end_records(offset)
+        self._segments.append((offset, len(tail), lambda lo, hi, tail=tail: iter((tail[lo:hi],))))
+        self.size = offset + len(tail)
+
+    @property
+    def etag(self):
+        """Changes whenever the layout would: entry names, sizes or times."""
+        digest = hashlib.sha1()
+        for e in self.entries:
+            digest.update(f"{e.name}\0{e.size}\0{e.modified.isoformat()}\n".encode('utf-8'))
+        return digest.hexdigest()
+
+    def stream(self, start=0, stop=None):
+        """Yield archive bytes start:stop."""
+        stop = self.size if stop is None else stop
+        for offset, length, producer in self._segments:
+            if offset + length <= start or length == 0:
+                continue
+            if offset >= stop:
+                break
+            yield from producer(max(start - offset, 0), min(stop - offset, length))
+
+    def _crc(self, entry):
+        if entry.crc is None:
+            entry.crc = file_crc32(entry.path)
+            if self.on_crc:
+                self.on_crc(entry)
+        return entry.crc
+
+    def _local_header_producer(self, entry):
+        def produce(lo, hi):
+            name = entry.name.encode('utf-8')
+            zip64 = entry.size >= ZIP64_LIMIT
+            time, date = _dos_time(entry.modified)
+            size = _ZIP64_MARKER if zip64 else entry.size
+            extra = struct.pack('<HHQQ', 0x0001, 16, entry.size, entry.size) if zip64 else b''
+            header = struct.pack('<IHHHHHIIIHH', 0x04034B50, 45 if zip64 else 20, _UTF8_FLAG, 0, time, date,
+                                 self._crc(entry), size, size, len(name), len(extra)) + name + extra
+            yield header[lo:hi]
+        return produce
+
+    def _data_producer(self, entry):
+        def produce(lo, hi):
+            with open(entry.path, 'rb') as fh:
+                fh.seek(lo)
+                remaining = hi - lo
+                while remaining:
+                    chunk = fh.read(min(CHUNK_SIZE, remaining))
+                    if not chunk:
+                        raise IOError(f"{entry.path} is shorter than when the archive was laid out")
+                    remaining -= len(chunk)
+                    yield chunk
+        return produce
+
+    def _central_record(self, entry, crc):
+        name = entry.name.encode('utf-8')
+        big_size = entry.size >= ZIP64_LIMIT
+        big_offset = entry.offset >= ZIP64_LIMIT
+        fields = ([entry.size, entry.size] if big_size else []) + ([entry.offset] if big_offset else [])
+        extra = struct.pack(f'<HH{len(fields)}Q', 0x0001, 8 * len(fields), *fields) if fields else b''
+        time, date = _dos_time(entry.modified)
+        size = _ZIP64_MARKER if big_size else entry.size
+        offset = _ZIP64_MARKER if big_offset else entry.offset
+        return struct.pack(
+            '<IHHHHHHIIIHHHHHII', 0x02014B50, (3 << 8) | 45, 45 if fields else 20, _UTF8_FLAG, 0, time, date,
+            crc, size, size, len(name), len(extra), 0, 0, 0, 0o100644 << 16, offset
+        ) + name + extra
+
+    def _central_producer(self, entry):
+        def produce(lo, hi):
+            yield self._central_record(entry, self._crc(entry))[lo:hi]
+        return produce
+
+    def _end_records(self, cd_end):
+        count = len(self.entries)
+        cd_size = cd_end - self._cd_start
+        tail = b''
+        if count >= 0xFFFF or cd_size >= ZIP64_LIMIT or self._cd_start >= ZIP64_LIMIT:
+            tail += struct.pack('<IQHHIIQQQQ', 0x06064B50, 44, 45, 45, 0, 0, count, count, cd_size, self._cd_start)
+            tail += struct.pack('<IIQI', 0x07064B50, 0, cd_end, 1)
+        zip64 = bool(tail)
+        short_count = 0xFFFF if zip64 else count
+        tail += struct.pack('<IHHHHIIH', 0x06054B50, 0, 0, short_count, short_count,
+                            _ZIP64_MARKER if zip64 else cd_size, _ZIP64_MARKER if zip64 else self._cd_start, 0)
+        return tail
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Dashboard latency versus the size of the reminders table.
+
+For each table size a throwaway database is created (HOMEHUB_DATA_DIR points
+create_app() at a temp dir) and seeded with reminders, then GET / is timed
+through the Flask test client as a logged-in admin. --recent reminders fall within a few weeks of today and
+the rest are spread over --years of history and future. Only the
+reminders.dashboard_window_months window is embedded in the page, so latency
+and page size should stay flat as the table grows.
+
+Usage:
+    python benchmarks/dashboard.py [--sizes 300,5000,50000] [--recent 300] [--years 10] [--runs 20]
+
+Needs a config.yml in the project root (copy config.yml.example).
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+
+CATEGORIES = [None, 'health', 'school', 'work']
+RECENT_DAYS = 25   # inside the default window (last/this/next month)
+FAR_DAYS = 400     # outside any window of up to 12 months
+
+
+def seed(app, count, recent, years):
+    from app import db
+    from app.models import User
+
+    with app.app_context():
+        admin = User.query.filter_by(is_admin=True).first()
+        admin.password_set = True
+        db.session.commit()
+        admin_id = admin.id
+        today = date.today()
+        half_span = int(365 * years) // 2
+        rnd = random.Random(42)
+        rows = []
+        for i in range(count):
+            if i < recent:
+                offset = rnd.randint(-RECENT_DAYS, RECENT_DAYS)
+            else:
+                # Older history and far-future entries, outside any embedded window
+                offset = rnd.choice((-1, 1)) * rnd.randint(FAR_DAYS, max(FAR_DAYS, half_span))
+            rows.append({
+                'title': f'Reminder {i}',
+                'description': 'Seeded by benchmarks/dashboard.py',
+                'date': (today + timedelta(days=offset)).isoformat(),
+                'time': rnd.choice([None, '08:00', '12:30', '18:15']),
+                'category': rnd.choice(CATEGORIES),
+            })
+        with db.engine.begin() as conn:
+            if rows:
+                conn.execute(text(
+                    "INSERT INTO reminder (title, description, creator, date, time, category) "
+                    "VALUES (:title, :description, 'bench', :date, :time, :category)"
+                ), rows)
+            conn.exec_driver_sql("ANALYZE")
+    return admin_id
+
+
+def measure(count, recent, years, runs):
+    from app import create_app
+    from app.user_cache import clear_user_cache
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['HOMEHUB_DATA_DIR'] = tmp
+        clear_user_cache()
+        app = create_app()
+        admin_id = seed(app, count, recent, years)
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['user_id'] = admin_id
+        resp = client.get('/')  # warm-up (template compile, caches)
+        assert resp.status_code == 200, resp.status_code
+        timings = []
+        for _ in range(runs):
+            t0 = time.perf_counter()
+            resp = client.get('/')
+            timings.append((time.perf_counter() - t0) * 1000)
+        with app.app_context():
+            from app import db
+            db.engine.dispose()
+        return statistics.median(timings), min(timings), len(resp.data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='300,5000,50000', help='comma-separated reminder counts')
+    parser.add_argument('--recent', type=int, default=300, help='reminders within a few weeks of today')
+    parser.add_argument('--years', type=float, default=10, help='years the remaining reminders span')
+    parser.add_argument('--runs', type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'reminders':>10}  {'median ms':>10}  {'min ms':>8}  {'page KiB':>9}")
+    for count in (int(s) for s in args.sizes.split(',') if s.strip()):
+        median, best, size = measure(count, args.recent, args.years, args.runs)
+        print(f"{count:>10}  {median:>10.1f}  {best:>8.1f}  {size / 1024:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Full-text search latency (app/search.py) versus the number of documents.
+
+A throwaway database (HOMEHUB_DATA_DIR points create_app() at a temp dir) is
+seeded through the triggers with notes, recipes, reminders, expenses,
+shopping items, favorite meals and countdowns. Their text is drawn from a
+Zipf-distributed vocabulary of filler words with the real words in WORDS
+spread from common (in a third of the documents) to rare ranks. Each query in QUERIES is then timed through app.search.search()
+(the query itself) and GET /api/search (with the request overhead).
+
+Usage:
+    python benchmarks/search.py [--docs 100000] [--runs 20]
+
+Needs a config.yml in the project root (copy config.yml.example).
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+
+WORDS = ('tomato basil garlic onion pasta chicken rice lemon butter flour sugar milk eggs cheese pepper salt '
+         'dentist school soccer piano birthday holiday insurance rent electricity internet car repair garden '
+         'paint window roof plumber vacation passport grandma visit concert library homework laundry recycling '
+         'bakery pharmacy vitamins shampoo batteries lightbulb curtains blanket pillow sunscreen umbrella').split()
+
+SYLLABLES = 'ba be bi bo bu da de di do du ka ke ki ko ku la le li lo lu ma me mi mo mu na ne ni no nu'.split()
+
+QUERIES = ['tomato', 'tomato basil', 'garl', 'pas', 'dentist appointment', 'umbrella sunscreen vacation', 'zzzz']
+
+TABLES = {
+    'note': "INSERT INTO note (content, creator, timestamp) VALUES (:body, 'bench', :ts)",
+    'recipe': "INSERT INTO recipe (title, ingredients, instructions, creator, timestamp) "
+              "VALUES (:title, :body, :extra, 'bench', :ts)",
+    'reminder': "INSERT INTO reminder (date, title, description, creator, timestamp) "
+                "VALUES (:day, :title, :body, 'bench', :ts)",
+    'expense_entry': "INSERT INTO expense_entry (date, title, amount, timestamp) VALUES (:day, :title, 9.5, :ts)",
+    'shopping_item': "INSERT INTO shopping_item (item, checked, creator, timestamp) VALUES (:title, 0, 'bench', :ts)",
+    'favorite_meal': "INSERT INTO favorite_meal (name, ingredients, creator, timestamp) "
+                     "VALUES (:title, :body, 'bench', :ts)",
+    'countdown': "INSERT INTO countdown (event_name, event_date, description, creator, timestamp) "
+                 "VALUES (:title, :day, :body, 'bench', :ts)",
+}
+
+
+def seed(app, docs):
+    from app import db
+    from app.models import User
+
+    rnd = random.Random(42)
+    vocabulary = [a + b for a in SYLLABLES for b in SYLLABLES] + [a + b + a for a in SYLLABLES for b in SYLLABLES]
+    for i, word in enumerate(WORDS):
+        vocabulary.insert(5 + 8 * i, word)
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+
+    def words(n):
+        return ' '.join(rnd.choices(vocabulary, weights, k=n))
+
+    with app.app_context():
+        admin = User.query.filter_by(is_admin=True).first()
+        admin.password_set = True
+        db.session.commit()
+        admin_id = admin.id
+        today = date.today()
+        with db.engine.begin() as conn:
+            for i, sql in enumerate(TABLES.values()):
+                count = docs // len(TABLES) + (1 if i < docs % len(TABLES) else 0)
+                conn.execute(text(sql), [{
+                    'title': words(3), 'body': words(25), 'extra': words(40),
+                    'day': (today + timedelta(days=rnd.randint(-900, 900))).isoformat(),
+                    'ts': '2024-01-01 12:00:00',
+                } for _ in range(count)])
+            conn.exec_driver_sql("INSERT INTO search_index (search_index) VALUES ('optimize')")
+    return admin_id
+
+
+def timed(fn, runs):
+    fn()  # warm-up
+    timings = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        result = fn()
+        timings.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(timings), max(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--docs', type=int, default=100000, help='documents spread over the searchable tables')
+    parser.add_argument('--runs', type=int, default=20)
+    args = parser.parse_args()
+
+    from app import create_app, db
+    from app.search import match_expression, parse_query, search
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['HOMEHUB_DATA_DIR'] = tmp
+        app = create_app()
+        t0 = time.perf_counter()
+        admin_id = seed(app, args.docs)
+        print(f"Seeded {args.docs} documents through the triggers in {time.perf_counter() - t0:.1f}s")
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['user_id'] = admin_id
+
+        print(f"{'query':<30}  {'matches':>7}  {'hits':>4}  {'search ms':>9}  {'max ms':>7}  {'GET ms':>7}")
+        with app.app_context():
+            conn = db.session.connection()
+            for query in QUERIES:
+                matches = conn.execute(text("SELECT count(*) FROM search_index WHERE search_index MATCH :q"),
+                                       {'q': match_expression(*parse_query(query))}).scalar()
+                median, worst, hits = timed(lambda: search(conn, query), args.runs)
+                http, _, _ = timed(lambda: client.get('/api/search', query_string={'q': query}), args.runs)
+                print(f"{query:<30}  {matches:>7}  {len(hits):>4}  {median:>9.2f}  {worst:>7.2f}  {http:>7.2f}")
+            db.session.rollback()
+            db.engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
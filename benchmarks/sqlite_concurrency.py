@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Concurrent read/write throughput on SQLite, default settings vs app/db_pragmas.py.
+
+Mimics the production mix: writer processes committing small transactions
+(web requests, the sync service, media progress updates) while reader processes
+run reminder-style range queries. Each scenario runs against a fresh database
+file and reports operations per second and "database is locked" errors.
+
+Usage:
+    python benchmarks/sqlite_concurrency.py [--seconds 5] [--readers 3] [--writers 2]
+"""
+
+import argparse
+import multiprocessing as mp
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.db_pragmas import DEFAULT_PRAGMAS, apply_pragmas
+
+SEED_ROWS = 20000
+
+
+def connect(path, pragmas):
+    conn = sqlite3.connect(path, timeout=5)
+    if pragmas:
+        apply_pragmas(conn, pragmas)
+    return conn
+
+
+def seed(path, pragmas):
+    conn = connect(path, pragmas)
+    conn.execute("CREATE TABLE reminder (id INTEGER PRIMARY KEY, date DATE NOT NULL, title TEXT, description TEXT)")
+    start = date(2020, 1, 1)
+    conn.executemany(
+        "INSERT INTO reminder (date, title, description) VALUES (?, ?, ?)",
+        [((start + timedelta(days=i % 2000)).isoformat(), f"Reminder {i}", "x" * 80) for i in range(SEED_ROWS)],
+    )
+    conn.commit()
+    conn.close()
+
+
+def writer(path, pragmas, seconds, out):
+    conn = connect(path, pragmas)
+    ops = errors = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        try:
+            conn.execute("INSERT INTO reminder (date, title, description) VALUES (?, ?, ?)",
+                         ('2024-06-01', 'new', 'y' * 80))
+            conn.commit()
+            ops += 1
+        except sqlite3.OperationalError:
+            conn.rollback()
+            errors += 1
+    out.put(('write', ops, errors))
+
+
+def reader(path, pragmas, seconds, out):
+    conn = connect(path, pragmas)
+    ops = errors = 0
+    deadline = time.monotonic() + seconds
+    i = 0
+    while time.monotonic() < deadline:
+        month_start = date(2020, 1, 1) + timedelta(days=(i * 31) % 2000)
+        try:
+            conn.execute("SELECT id, title, date FROM reminder WHERE date >= ? AND date < ?",
+                         (month_start.isoformat(), (month_start + timedelta(days=31)).isoformat())).fetchall()
+            ops += 1
+        except sqlite3.OperationalError:
+            errors += 1
+        i += 1
+    out.put(('read', ops, errors))
+
+
+def run(label, pragmas, args):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        seed(path, pragmas)
+        out = mp.Queue()
+        procs = [mp.Process(target=writer, args=(path, pragmas, args.seconds, out)) for _ in range(args.writers)]
+        procs += [mp.Process(target=reader, args=(path, pragmas, args.seconds, out)) for _ in range(args.readers)]
+        for p in procs:
+            p.start()
+        totals = {'read': [0, 0], 'write': [0, 0]}
+        for _ in procs:
+            kind, ops, errors = out.get()
+            totals[kind][0] += ops
+            totals[kind][1] += errors
+        for p in procs:
+            p.join()
+    print(f"{label:>8}: reads {totals['read'][0] / args.seconds:9.0f}/s ({totals['read'][1]} locked)   "
+          f"writes {totals['write'][0] / args.seconds:7.0f}/s ({totals['write'][1]} locked)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--readers', type=int, default=3)
+    parser.add_argument('--writers', type=int, default=2)
+    args = parser.parse_args()
+    print(f"{args.readers} reader + {args.writers} writer processes, {args.seconds:g}s each, {SEED_ROWS} seeded rows")
+    run('default', None, args)
+    run('tuned', DEFAULT_PRAGMAS, args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Startup budget benchmark for the web app and the sync service.
+
+Reports, from fresh interpreter processes:
+  - the heaviest imports while importing wsgi (python -X importtime, cumulative us)
+  - import time of `wsgi` and of the sync service module
+  - time to first response: interpreter start -> create_app() -> first GET /login
+
+Usage:
+    python benchmarks/startup.py [--runs 5] [--top 15]
+
+Needs a config.yml in the project root (copy config.yml.example).
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FIRST_RESPONSE_SNIPPET = """
+import time
+t0 = time.perf_counter()
+import wsgi
+t1 = time.perf_counter()
+client = wsgi.app.test_client()
+resp = client.get('/login')
+t2 = time.perf_counter()
+assert resp.status_code == 200, resp.status_code
+print(f"{t1 - t0:.6f} {t2 - t0:.6f}")
+"""
+
+SYNC_IMPORT_SNIPPET = """
+import time
+t0 = time.perf_counter()
+import app, app.models
+from app import create_app
+create_app()
+print(f"{time.perf_counter() - t0:.6f}")
+"""
+
+
+def run_python(args):
+    env = dict(os.environ, PYTHONPATH=BASE_DIR)
+    return subprocess.run([sys.executable, *args], cwd=BASE_DIR, env=env,
+                          capture_output=True, text=True, check=True)
+
+
+def importtime_report(top):
+    """Parse `python -X importtime -c 'import wsgi'` and return the top-N modules by cumulative time"""
+    proc = run_python(['-X', 'importtime', '-c', 'import wsgi'])
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cum_us, name = line[len('import time:'):].split('|')
+        rows.append((int(cum_us), int(self_us), name.strip()))
+    rows.sort(reverse=True)
+    return rows[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15)
+    args = parser.parse_args()
+
+    # Warm the bytecode cache so we measure imports, not compilation
+    run_python(['-c', 'import wsgi'])
+
+    print(f"Top {args.top} imports by cumulative time (import wsgi):")
+    print(f"  {'cumulative ms':>13}  {'self ms':>8}  module")
+    for cum_us, self_us, name in importtime_report(args.top):
+        print(f"  {cum_us / 1000:13.1f}  {self_us / 1000:8.1f}  {name}")
+
+    imports, firsts, syncs = [], [], []
+    for _ in range(args.runs):
+        imp, first = run_python(['-c', FIRST_RESPONSE_SNIPPET]).stdout.split()
+        imports.append(float(imp))
+        firsts.append(float(first))
+        syncs.append(float(run_python(['-c', SYNC_IMPORT_SNIPPET]).stdout.strip()))
+
+    def fmt(samples):
+        return f"median {statistics.median(samples) * 1000:7.1f} ms  (min {min(samples) * 1000:.1f}, max {max(samples) * 1000:.1f})"
+
+    print(f"\nOver {args.runs} fresh processes:")
+    print(f"  import wsgi (incl. create_app): {fmt(imports)}")
+    print(f"  time to first response:         {fmt(firsts)}")
+    print(f"  sync service app boot:          {fmt(syncs)}")
+
+
+if __name__ == '__main__':
+    main()
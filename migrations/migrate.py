@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Run HomeHub schema migrations ahead of boot.
+
+Applies every pending step from app/schema.py and records it in the
+schema_version table, so gunicorn workers and the sync service only run the
+one-query "already current" check when they start.
+
+Usage:
+    python migrations/migrate.py           # apply pending migrations
+    python migrations/migrate.py --status  # show current and target version
+"""
+
+import logging
+import os
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, data_dir_path, db
+from app.schema import MIGRATIONS, SCHEMA_VERSION, current_version
+
+
+def status():
+    """Print applied/pending state of each migration without touching the schema"""
+    from flask import Flask
+    db_path = os.path.join(data_dir_path(), 'app.db')
+    version = 0
+    if os.path.exists(db_path):
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + db_path
+        db.init_app(app)
+        with app.app_context():
+            with db.engine.connect() as conn:
+                version = current_version(conn)
+    print(f"Schema version: {version} (target {SCHEMA_VERSION})")
+    for v, name, _ in MIGRATIONS:
+        print(f"  {'✓' if v <= version else '·'} {v:03d} {name}")
+
+
+def migrate():
+    """Apply pending migrations (create_app() runs the upgrade under the migration lock)"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    app = create_app()
+    with app.app_context():
+        with db.engine.connect() as conn:
+            version = current_version(conn)
+    print(f"✓ Schema is at version {version}")
+
+
+if __name__ == '__main__':
+    if '--status' in sys.argv[1:]:
+        status()
+    else:
+        migrate()
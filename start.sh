@@ -2,11 +2,35 @@
 # Startup script for HomeHub
 # Runs both the web app and the Radicale sync service
 
+# Apply database migrations once, before the sync service and web workers start
+echo "Applying database migrations..."
+python3 /app/migrations/migrate.py || exit 1
+
+# Fill in existing rows the migrations left to background jobs (hashes, EXIF dates); exits when done
+echo "Starting migration backfills..."
+python3 /app/sync/backfill.py &
+
 # Start the sync service in the background
 echo "Starting Radicale sync service..."
 python3 /app/sync/radicale_sync.py &
 SYNC_PID=$!
 
+# Generate due recurring expense entries (hourly by default)
+echo "Starting recurring expenses job..."
+python3 /app/sync/recurring_expenses.py --loop &
+
+# Run queued media downloads
+echo "Starting media download scheduler..."
+python3 /app/sync/media_downloader.py &
+
+# Decay shopping suggestion scores (every 6 hours by default)
+echo "Starting grocery frequency job..."
+python3 /app/sync/grocery_frequency.py --loop &
+
 # Start the web app in the foreground
+# Thread budget: each open /media/events stream holds one of the 8 threads for up to
+# SSE_MAX_AGE seconds, and app/media.py caps them at SSE_MAX_STREAMS (2), so at least
+# 6 threads are left for page loads, exports and uploads. Keep the cap below --threads.
+# Keep -w 1: the PDF compression pool (app/pdf_jobs.py) resumes every job it did not queue itself
 echo "Starting HomeHub web application..."
-exec gunicorn wsgi:app -w 1 -k sync -b 0.0.0.0:5000 --timeout 120 --access-logfile - --error-logfile -
+exec gunicorn wsgi:app -w 1 -k gthread --threads 8 -b 0.0.0.0:5000 --timeout 120 --access-logfile - --error-logfile -
@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Backfill runner
+
+Runs the backfills that schema migrations scheduled (app/backfill.py): the
+media library index of downloads made before it existed, and the EXIF dates
+of photos uploaded before the timeline. Each job commits after every batch
+and picks up where it stopped, so the script can be interrupted and rerun.
+start.sh runs it once after the migrations; it exits when nothing is left.
+
+Usage:
+    python sync/backfill.py
+"""
+
+import os
+import sys
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from app.backfill import run_pending
+
+
+def main():
+    app = create_app()
+    with app.app_context():
+        done = run_pending()
+    for name, rows in done.items():
+        print(f"✓ Backfill {name}: {rows} rows")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Grocery frequency job
+
+Applies the exponential decay to grocery_frequency scores and drops items that
+have not been bought for months (see app/grocery.py). Shopping suggestions read
+that table, so this replaces the old fixed 90-day window. start.sh keeps it
+running with --loop.
+
+Usage:
+    python sync/grocery_frequency.py            # decay and compact once, then exit
+    python sync/grocery_frequency.py --rebuild  # recompute the table from the full grocery history
+    python sync/grocery_frequency.py --loop     # repeat every GROCERY_DECAY_INTERVAL seconds (default 21600)
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from app.grocery import decay, rebuild
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger('grocery_frequency')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Decay and compact grocery suggestion scores')
+    parser.add_argument('--rebuild', action='store_true', help='recompute scores from grocery_history')
+    parser.add_argument('--loop', action='store_true', help='keep running and decay periodically')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        if args.rebuild:
+            with db.engine.begin() as conn:
+                rebuild(conn)
+            print("✓ Rebuilt grocery frequency table")
+            return
+        if not args.loop:
+            print(f"✓ Decayed grocery scores, removed {decay()} stale item(s)")
+            return
+
+        interval = int(os.environ.get('GROCERY_DECAY_INTERVAL', '21600'))
+        logger.info(f"Grocery frequency job running every {interval} seconds")
+        while True:
+            try:
+                removed = decay()
+                if removed:
+                    logger.info(f"Removed {removed} stale grocery item(s)")
+                time.sleep(interval)
+            except KeyboardInterrupt:
+                logger.info("Shutting down grocery frequency job...")
+                break
+            except Exception as e:
+                logger.error(f"Grocery frequency error: {e}", exc_info=True)
+                time.sleep(60)  # Wait a minute before retrying
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Media download scheduler
+
+Runs the yt-dlp downloads queued from the Media page (see app/downloads.py),
+with the concurrency limits from the `media_downloads:` section of config.yml.
+start.sh runs it in the background; stop it with SIGTERM/Ctrl-C and running
+downloads are re-queued for the next start.
+
+Usage:
+    python sync/media_downloader.py
+"""
+
+import logging
+import os
+import sys
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from app.downloads import DownloadScheduler
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger('media_downloader')
+
+
+def main():
+    logger.info("Starting media download scheduler...")
+    app = create_app()
+    DownloadScheduler(app).run()
+
+
+if __name__ == '__main__':
+    main()
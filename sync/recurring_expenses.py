@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Recurring expenses job
+
+Materializes the ExpenseEntry rows that RecurringExpense rules are due for
+(see app/recurring.py). The expense pages only read entries, so something has
+to run this: start.sh keeps it running with --loop, and it can be run by hand
+or from cron.
+
+Usage:
+    python sync/recurring_expenses.py                     # generate up to today, then exit
+    python sync/recurring_expenses.py --until 2025-12-31  # generate up to a given day
+    python sync/recurring_expenses.py --loop              # repeat every RECURRING_EXPENSES_INTERVAL seconds (default 3600)
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+from datetime import datetime
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from app.recurring import materialize
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger('recurring_expenses')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate due recurring expense entries')
+    parser.add_argument('--until', help='last day to generate (YYYY-MM-DD, default today)')
+    parser.add_argument('--loop', action='store_true', help='keep running and generate periodically')
+    args = parser.parse_args()
+    until = datetime.strptime(args.until, '%Y-%m-%d').date() if args.until else None
+
+    app = create_app()
+    with app.app_context():
+        if not args.loop:
+            print(f"✓ Inserted {materialize(until=until)} recurring expense entries")
+            return
+
+        interval = int(os.environ.get('RECURRING_EXPENSES_INTERVAL', '3600'))
+        logger.info(f"Recurring expenses job running every {interval} seconds")
+        while True:
+            try:
+                # until=None so a long-running loop picks up each new day
+                materialize(until=until)
+                time.sleep(interval)
+            except KeyboardInterrupt:
+                logger.info("Shutting down recurring expenses job...")
+                break
+            except Exception as e:
+                logger.error(f"Recurring expenses error: {e}", exc_info=True)
+                time.sleep(60)  # Wait a minute before retrying
+
+
+if __name__ == '__main__':
+    main()
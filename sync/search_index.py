@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Search index rebuild
+
+Refills the full-text search index (app/search.py) from the notes, recipes,
+reminders, expenses, shopping list, favorite meals and countdowns. Triggers
+keep the index current on their own, so this is only needed after restoring a
+database backup, editing rows with the triggers dropped, or to compact the
+index.
+
+Usage:
+    python sync/search_index.py              # rebuild the index, then exit
+    python sync/search_index.py --optimize   # only merge the index segments
+"""
+
+import argparse
+import os
+import sys
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from app.search import rebuild
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Rebuild the full-text search index')
+    parser.add_argument('--optimize', action='store_true', help='merge index segments without rebuilding')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        with db.engine.begin() as conn:
+            if args.optimize:
+                conn.exec_driver_sql("INSERT INTO search_index (search_index) VALUES ('optimize')")
+                print("✓ Optimized search index")
+                return
+            rebuild(conn)
+            count = conn.exec_driver_sql("SELECT count(*) FROM search_index").scalar()
+        print(f"✓ Rebuilt search index ({count} documents)")
+
+
+if __name__ == '__main__':
+    main()
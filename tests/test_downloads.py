@@ -0,0 +1,10 @@
+"""File ownership of yt-dlp outputs (app/downloads.py is_output)."""
+from app.downloads import is_output
+
+
+def test_is_output_matches_only_the_job_base():
+    base = 'media_1700000000_1'
+    for name in ('media_1700000000_1.mp4', 'media_1700000000_1.mp4.part', 'media_1700000000_1.f137.webm'):
+        assert is_output(name, base)
+    for name in ('media_1700000000_17.mp4', 'media_1700000000_10.mp4.part', 'media_1700000000_2.mp4'):
+        assert not is_output(name, base)
@@ -0,0 +1,56 @@
+"""Keyset pagination over sort values that may be NULL (app/pagination.py)."""
+from datetime import date, datetime, timedelta
+
+import pytest
+from flask import Flask
+
+from app import db
+from app.models import ExpiryItem, Note
+from app.pagination import decode_cursor, encode_cursor, keyset_page
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+
+
+def pages(query, column, id_column, limit, descending=True):
+    seen, cursor = [], None
+    while True:
+        rows, cursor = keyset_page(query, column, id_column, cursor, limit, descending)
+        seen.append([r.id for r in rows])
+        if cursor is None:
+            return seen
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor(date(2024, 5, 1), 7), ExpiryItem.expiry_date) == (date(2024, 5, 1), 7)
+    assert decode_cursor(encode_cursor(None, 7), ExpiryItem.expiry_date) == (None, 7)
+    assert decode_cursor('garbage', ExpiryItem.expiry_date) is None
+
+
+def test_ascending_pages_include_null_values(app):
+    start = date(2024, 5, 1)
+    for i in range(7):
+        db.session.add(ExpiryItem(name=f'item{i}', expiry_date=None if i % 3 == 0 else start + timedelta(days=i % 2)))
+    db.session.commit()
+    got = pages(ExpiryItem.query, ExpiryItem.expiry_date, ExpiryItem.id, 2, descending=False)
+    # NULL first (by id), then by (date, id)
+    assert got == [[1, 4], [7, 3], [5, 2], [6]]
+
+
+def test_descending_pages_end_with_null_values(app):
+    now = datetime(2024, 6, 1)
+    for i in range(6):
+        db.session.add(Note(content=f'n{i}', creator='a', timestamp=now + timedelta(hours=i)))
+    db.session.commit()
+    db.session.execute(db.text("UPDATE note SET timestamp = NULL WHERE id IN (2, 5)"))
+    db.session.commit()
+    got = pages(Note.query, Note.timestamp, Note.id, 2)
+    assert [i for page in got for i in page] == [6, 4, 3, 1, 5, 2]
@@ -0,0 +1,182 @@
+"""Query plans of the hot queries: each must be answered through an index.
+
+The app comes from create_app() over a throwaway data directory, so the schema
+is the one the migrations (app/schema.py) build. Every case drives the route,
+or for side-effect-heavy routes the helper it calls, that issues a hot query,
+and records the SQL actually sent. Each recorded statement on the case's table
+that filters or orders its rows is run through EXPLAIN QUERY PLAN and fails on
+a full table scan, i.e. a "SCAN <table>" step without an index. Reads of a
+whole table (no WHERE or ORDER BY) scan by design and are not checked.
+"""
+import re
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from app import config as app_config
+from app import create_app, db
+from app.expense_cache import clear_expense_cache
+from app.pdf_jobs import find_compressed
+from app.photo_timeline import albums, rebuild_buckets
+
+SEED_ROWS = 2000
+FULL_SCAN = re.compile(r'^SCAN (TABLE )?\w+$')  # "SCAN TABLE x" on SQLite < 3.36
+FILTERS = re.compile(r'\b(WHERE|ORDER BY)\b')
+
+CONFIG = """
+admin_name: Administrator
+family_members: [member7, member8]
+feature_toggles: {recipes: true, meal_planner: true}
+"""
+
+
+def seed(conn):
+    start = date(2023, 1, 1)
+    now = datetime(2024, 6, 1)
+    rows = range(SEED_ROWS)
+    conn.exec_driver_sql("INSERT INTO pet (id, name) VALUES (1, 'a'), (2, 'b'), (3, 'c')")
+    conn.exec_driver_sql("INSERT INTO recurring_expense (id, title, unit_price, frequency, start_date, creator) "
+                         "VALUES (1, 'a', 1, 'monthly', '2023-01-01', 'x'), (2, 'b', 1, 'monthly', '2023-01-01', 'x'), "
+                         "(3, 'c', 1, 'monthly', '2023-01-01', 'x')")
+    conn.execute(db.text("INSERT INTO reminder (date, title) VALUES (:d, 'r')"),
+                 [{'d': start + timedelta(days=i % 700)} for i in rows])
+    conn.execute(db.text("INSERT INTO expense_entry (date, title, amount, recurring_id) VALUES (:d, 'e', 1, :r)"),
+                 [{'d': start + timedelta(days=i // 2), 'r': (i % 4) or None} for i in rows])
+    conn.execute(db.text("INSERT INTO grocery_history (item, timestamp) VALUES (:i, :t)"),
+                 [{'i': f'item{i % 150}', 't': now - timedelta(hours=i * 7)} for i in rows])
+    conn.execute(db.text("INSERT INTO grocery_frequency (key, item, score) VALUES (:k, :k, :s)"),
+                 [{'k': f'item{i}', 's': (i * 37) % 101 / 7} for i in rows])
+    conn.execute(db.text("INSERT INTO pdf (filename, sha256, preset, status, upload_time) "
+                         "VALUES ('f.pdf', :h, 'ebook', 'done', :t)"),
+                 [{'h': f"h{i}", 't': now - timedelta(hours=i)} for i in rows])
+    list_rows = [{'i': i, 't': now - timedelta(hours=i), 'd': start + timedelta(days=i % 700)} for i in rows]
+    for sql in ("INSERT INTO note (content, creator, timestamp) VALUES ('n', 'a', :t)",
+                "INSERT INTO file (filename, creator, upload_time) VALUES ('f', 'a', :t)",
+                "INSERT INTO media (title, download_time) VALUES ('m', :t)",
+                "INSERT INTO qr_code (text, filename, timestamp) VALUES ('q', 'q.png', :t)",
+                "INSERT INTO short_url (original_url, short_code, timestamp) VALUES ('u', 'c' || :i, :t)",
+                "INSERT INTO recipe (title, timestamp) VALUES ('r', :t)",
+                "INSERT INTO chore (description, timestamp) VALUES ('c', :t)",
+                "INSERT INTO expiry_item (name, expiry_date, timestamp) VALUES ('e', :d, :t)"):
+        conn.execute(db.text(sql), list_rows)
+    conn.execute(db.text("INSERT INTO home_status (name, status) VALUES (:n, 'Home')"),
+                 [{'n': f'member{i}'} for i in rows])
+    conn.execute(db.text("INSERT INTO member_status (name, text) VALUES (:n, 'hi')"),
+                 [{'n': f'member{i}'} for i in rows])
+    conn.execute(db.text("INSERT INTO pet_care_event (pet_id, event_type, event_date) VALUES (:p, 'vet', :d)"),
+                 [{'p': i % 3 + 1, 'd': start + timedelta(days=i)} for i in rows])
+    conn.execute(db.text("INSERT INTO photo (filename, album, upload_time, sort_time) VALUES (:f, :a, :t, :t)"),
+                 [{'f': f'{i}.jpg', 'a': f'album{i % 20}', 't': now - timedelta(hours=i)} for i in rows])
+    rebuild_buckets(conn)
+    pantry_words = ['egg', 'tomato', 'milk', 'flour', 'onion', 'garlic', 'rice', 'butter']
+    conn.execute(db.text("INSERT INTO recipe_ingredient (ingredient, kind, ref_id, total) VALUES (:w, 'recipe', :r, 3)"),
+                 [{'w': f'{pantry_words[(i + k) % 8]}{i % 50 if k else ""}', 'r': i} for i in rows for k in range(3)])
+    conn.execute(db.text("INSERT INTO shopping_item (item, timestamp) VALUES (:i, :t)"),
+                 [{'i': item, 't': now} for item in ('Eggs', 'tomatoes', 'milk')])
+    conn.execute(db.text("INSERT INTO bitwarden_vault (username, bitwarden_email) VALUES (:u, 'x@y')"),
+                 [{'u': f'member{i}'} for i in rows])
+    conn.exec_driver_sql("UPDATE user SET password_set = 1")
+    conn.exec_driver_sql("ANALYZE")
+
+
+@pytest.fixture(scope='module')
+def app(tmp_path_factory):
+    tmp = tmp_path_factory.mktemp('plans')
+    (tmp / 'config.yml').write_text(CONFIG)
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(app_config, 'CONFIG_PATH', str(tmp / 'config.yml'))
+        mp.setenv('HOMEHUB_DATA_DIR', str(tmp))
+        app = create_app()
+        with app.app_context():
+            with db.engine.begin() as conn:
+                seed(conn)
+            clear_expense_cache()
+            yield app
+            db.session.remove()
+            db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    client = app.test_client()
+    user_id = db.session.execute(db.text("SELECT id FROM user WHERE username = 'member7'")).scalar()
+    with client.session_transaction() as session:
+        session['user_id'] = user_id
+        session['username'] = 'member7'
+    return client
+
+
+@contextmanager
+def recorded():
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+
+
+def get(path):
+    return lambda client: client.get(path)
+
+
+def post(path, **form):
+    return lambda client: client.post(path, data=form, headers={'X-Requested-With': 'fetch'})
+
+
+def call(helper, *args):
+    return lambda client: helper(*args)
+
+
+CURSOR = '2024-01-01T00:00:00|500'
+LIST_PAGES = [('note', '/api/notes/page'), ('file', '/api/upload/page'), ('media', '/api/media/page'),
+              ('pdf', '/api/pdfs/page'), ('qr_code', '/api/qr/page'), ('short_url', '/api/shorten/page'),
+              ('recipe', '/api/recipes/page'), ('chore', '/api/chores/page')]
+
+# (label, table whose statements are checked, request or helper call issuing them)
+HOT_PATHS = [
+    ('dashboard: reminders around today', 'reminder', get('/')),
+    ('reminders: month', 'reminder', get('/api/reminders?scope=month&date=2024-05-04')),
+    ('reminders: single day', 'reminder', get('/api/reminders?scope=day&date=2024-05-04')),
+    ('expenses: month snapshot', 'expense_entry', get('/api/expenses/month?year=2024&month=5')),
+    ('expenses: edit a rule and fill its occurrences', 'expense_entry',
+     post('/expenses/recurring/edit/3', user='Administrator', frequency='monthly', start_date='2023-06-01')),
+    ('shopping: top suggestions', 'grocery_frequency', get('/shopping')),
+    ('pdfs: compressed copy of an upload', 'pdf', call(find_compressed, 'h7', 'ebook')),
+    ('who is home: by name', 'home_status', post('/whoishome', name='member7', status='Home')),
+    ('member status: by name', 'member_status', post('/status/update', name='member7', text='hi')),
+    ('pet care: events of a pet', 'pet_care_event', get('/petcare/events/3')),
+    ('photos: timeline page', 'photo', get('/api/photos/page?cursor=2024-01-01T00:00:00|100')),
+    ('photos: album month', 'photo', get('/api/photos/page?album=album3&ym=2023-12')),
+    ('photos: album list', 'photo_bucket', call(albums)),
+    ('bitwarden: vault of the user', 'bitwarden_vault', get('/bitwarden')),
+    ('recipes: what can I cook', 'recipe_ingredient', get('/api/recipes/cook?from=shopping')),
+    ('recipes: unindex a deleted recipe', 'recipe_ingredient', post('/recipes/delete/7', user='Administrator')),
+] + [
+    (f'{table}: list page', table, get(f'{path}?cursor={CURSOR}')) for table, path in LIST_PAGES
+] + [
+    (f'{table}: list page without sort value', table, get(f'{path}?cursor=|500')) for table, path in LIST_PAGES
+] + [
+    ('expiry_item: list page', 'expiry_item', get('/api/expiry/page?cursor=2024-01-01|500')),
+    ('expiry_item: list page without expiry date', 'expiry_item', get('/api/expiry/page?cursor=|500')),
+]
+
+
+@pytest.mark.parametrize('label, table, action', HOT_PATHS, ids=[label for label, _, _ in HOT_PATHS])
+def test_hot_query_uses_an_index(app, client, label, table, action):
+    names_table = re.compile(rf'\b(FROM|UPDATE|JOIN) {table}\b')
+    with recorded() as statements:
+        response = action(client)
+    assert getattr(response, 'status_code', 200) < 400
+    checked = [(sql, params) for sql, params in statements if names_table.search(sql) and FILTERS.search(sql)]
+    assert checked, f"no filtered query on {table} was issued"
+    with db.engine.connect() as conn:
+        for sql, params in checked:
+            plan = [row[-1] for row in conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + sql, params)]
+            assert not [step for step in plan if FULL_SCAN.match(step.strip())], f"{sql}\n" + '\n'.join(plan)
@@ -0,0 +1,61 @@
+"""Schema migrations (app/schema.py) and the backfills they schedule (app/backfill.py)."""
+import hashlib
+from datetime import datetime
+
+import pytest
+from PIL import Image
+from sqlalchemy import create_engine, text
+
+from app import backfill, db, downloads, models, thumbnails  # noqa: F401 models registers the tables
+from app.schema import upgrade
+
+
+def shape(engine, tables):
+    """{table: (column names, index names)} as SQLite reports them."""
+    with engine.connect() as conn:
+        return {t: ({r[1] for r in conn.exec_driver_sql(f"PRAGMA table_info({t})")},
+                    {r[1] for r in conn.exec_driver_sql(f"PRAGMA index_list({t})") if not r[1].startswith('sqlite_')})
+                for t in tables}
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    upgrade(engine, str(tmp_path / 'schema.lock'))
+    return engine
+
+
+def test_fresh_database_matches_models(engine, tmp_path):
+    reference = create_engine(f"sqlite:///{tmp_path / 'models.db'}")
+    db.metadata.create_all(reference)
+    tables = sorted(db.metadata.tables)
+    assert shape(engine, tables) == shape(reference, tables)
+
+
+def test_backfills_read_files_outside_the_migration(engine, tmp_path, monkeypatch):
+    monkeypatch.setattr(downloads, 'MEDIA_FOLDER', str(tmp_path))
+    monkeypatch.setattr(thumbnails, 'PHOTOS_FOLDER', str(tmp_path))
+    (tmp_path / 'clip.mp4').write_bytes(b'video')
+    exif = Image.Exif()
+    exif[0x0132] = '2019:07:04 12:00:00'  # DateTime
+    Image.new('RGB', (40, 30)).save(tmp_path / 'beach.jpg', exif=exif)
+    uploaded = datetime(2024, 5, 1)
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO media (id, url, status, filepath) VALUES (1, :u, 'done', 'clip.mp4')"),
+                     {'u': 'https://youtu.be/dQw4w9WgXcQ'})
+        conn.execute(text("INSERT INTO download_job (media_id, url, fmt, quality, status, finished_at) "
+                          "VALUES (1, :u, 'mp4', 'best', 'done', :t)"), {'u': 'https://youtu.be/dQw4w9WgXcQ', 't': uploaded})
+        conn.execute(text("INSERT INTO photo (filename, upload_time, sort_time) VALUES ('beach.jpg', :t, :t)"),
+                     {'t': uploaded})
+        conn.execute(text("INSERT INTO photo_bucket (album, ym, count) VALUES ('', '2024-05', 1)"))
+        # What migrations 7 and 11 leave behind on a database that already had these rows
+        conn.execute(text("INSERT INTO backfill (name, until_id, scheduled_at) VALUES "
+                          "('media_file', 1, :t), ('photo_metadata', 1, :t)"), {'t': uploaded})
+
+    assert backfill.run_pending(engine) == {'media_file': 1, 'photo_metadata': 1}
+    assert backfill.run_pending(engine) == {}
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT source_key, variant, size, checksum FROM media_file")).all() == [
+            ('youtube:dQw4w9WgXcQ', 'mp4:best', 5, hashlib.sha256(b'video').hexdigest())]
+        assert conn.execute(text("SELECT width, height, substr(sort_time, 1, 10) FROM photo")).one() == (40, 30, '2019-07-04')
+        assert conn.execute(text("SELECT album, ym, count FROM photo_bucket")).all() == [('', '2019-07', 1)]
@@ -0,0 +1,37 @@
+"""Accept negotiation for photo variants (app/thumbnails.py negotiate_format)."""
+import pytest
+from werkzeug.datastructures import MIMEAccept
+from werkzeug.http import parse_accept_header
+
+from app import thumbnails
+
+
+def accept(value):
+    return parse_accept_header(value, MIMEAccept)
+
+
+@pytest.fixture(autouse=True)
+def avif_available(monkeypatch):
+    monkeypatch.setattr(thumbnails, '_can_write', lambda fmt: True)
+
+
+@pytest.mark.parametrize('header, expected', [
+    ('image/webp;q=0.9,*/*;q=0.8', 'webp'),
+    ('image/webp;q=0.5, image/avif;q=0.9', 'avif'),
+    ('image/avif;q=0.4, image/webp;q=0.6', 'webp'),
+    ('image/avif,image/webp,image/apng,image/*,*/*;q=0.8', 'avif'),
+    ('image/jpeg,image/webp;q=0.1', 'jpeg'),
+    ('image/webp;q=0,*/*', 'jpeg'),
+    ('image/avif;q=0,image/webp', 'webp'),
+    ('image/avif;q=0.0,image/webp;q=0', 'jpeg'),
+    ('*/*', 'jpeg'),
+    ('image/*', 'jpeg'),
+    ('', 'jpeg'),
+])
+def test_negotiate_format(header, expected):
+    assert thumbnails.negotiate_format(accept(header)) == expected
+
+
+def test_avif_skipped_without_encoder(monkeypatch):
+    monkeypatch.setattr(thumbnails, '_can_write', lambda fmt: fmt != 'avif')
+    assert thumbnails.negotiate_format(accept('image/avif,image/webp;q=0.9')) == 'webp'